@@ -0,0 +1,246 @@
+"""
+Analytics charts for KindWords Telegram Bot
+Draws daily activity, mood popularity and weekly retention charts from
+aggregated data. The data is collected in the caller's process; rendering
+happens in a process pool, so matplotlib and seaborn are only ever imported
+by the workers. Each image is named after a fingerprint of the data it
+shows, so a chart whose data hasn't changed is never drawn twice.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from analytics_report import has_rollups
+
+DEFAULT_CHART_DIR = "telegram_bot/charts"
+
+# Bump when the drawing code changes, so cached images are redrawn
+CHART_STYLE_VERSION = 1
+
+
+class ChartResult(NamedTuple):
+    name: str
+    path: Optional[str]     # None when there was no data to draw
+    cached: bool
+    seconds: float
+
+
+def collect_chart_data(conn: sqlite3.Connection, days: int = 30, weeks: int = 8,
+                       source: str = 'auto') -> Dict[str, Any]:
+    """Aggregates behind each chart, from 'rollups', a 'scan', or whichever is available ('auto')
+
+    Values are plain lists and dicts so they can be fingerprinted and
+    handed to a worker process as they are.
+    """
+    if source == 'auto':
+        source = 'rollups' if has_rollups(conn) else 'scan'
+    if source not in ('rollups', 'scan'):
+        raise ValueError(f"Unknown chart source: {source}")
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    if conn.in_transaction:
+        conn.commit()
+    # One read transaction, so all charts show the same snapshot
+    conn.execute("BEGIN")
+    try:
+        if source == 'rollups':
+            daily = conn.execute('''
+                SELECT date, unique_users, total_interactions, total_messages
+                FROM daily_stats WHERE date >= ? AND total_interactions > 0
+                ORDER BY date
+            ''', (since,)).fetchall()
+            moods = conn.execute(
+                "SELECT mood, count FROM mood_stats WHERE count > 0 ORDER BY count DESC, mood").fetchall()
+        else:
+            daily = conn.execute('''
+                SELECT day, COUNT(DISTINCT user_id), COUNT(*), SUM(message_generated = 1)
+                FROM user_interactions WHERE day >= ?
+                GROUP BY day ORDER BY day
+            ''', (since,)).fetchall()
+            moods = conn.execute('''
+                SELECT mood_choice, COUNT(*) AS count FROM user_interactions
+                WHERE mood_choice IS NOT NULL
+                GROUP BY mood_choice ORDER BY count DESC, mood_choice
+            ''').fetchall()
+        retention = _weekly_retention(conn, source, weeks)
+    finally:
+        conn.rollback()
+
+    return {
+        'daily_activity': {
+            'days': days,
+            'dates': [row[0] for row in daily],
+            'users': [row[1] for row in daily],
+            'interactions': [row[2] for row in daily],
+            'messages': [row[3] for row in daily]
+        },
+        'mood_popularity': {
+            'moods': [row[0] for row in moods],
+            'counts': [row[1] for row in moods]
+        },
+        'retention': retention
+    }
+
+
+def _week(column: str) -> str:
+    """SQL for the Monday starting the week of a date or timestamp column"""
+    return f"date({column}, 'weekday 0', '-6 days')"
+
+
+# Users first seen in the window, counted again in each later week they were
+# active. Only the window's days are read: rollups keep every user's first
+# visit in user_stats, a scan finds it with one pass over the user index.
+RETENTION_SQL = {
+    'rollups': (
+        "SELECT MAX(day) FROM daily_users",
+        f'''
+        SELECT {_week('u.first_interaction')} AS cohort, {_week('d.day')} AS week, COUNT(DISTINCT d.user_id)
+        FROM daily_users d JOIN user_stats u ON u.user_id = d.user_id
+        WHERE d.day >= :since AND u.first_interaction >= :since
+        GROUP BY cohort, week
+        '''
+    ),
+    'scan': (
+        "SELECT MAX(day) FROM user_interactions",
+        f'''
+        WITH firsts AS (
+            SELECT user_id, {_week('MIN(timestamp)')} AS cohort
+            FROM user_interactions GROUP BY user_id HAVING MIN(timestamp) >= :since
+        )
+        SELECT f.cohort, {_week('i.day')} AS week, COUNT(DISTINCT i.user_id)
+        FROM user_interactions i JOIN firsts f ON f.user_id = i.user_id
+        WHERE i.day >= :since
+        GROUP BY f.cohort, week
+        '''
+    )
+}
+
+
+def _weekly_retention(conn: sqlite3.Connection, source: str, weeks: int) -> Dict[str, list]:
+    """Share of each of the last ``weeks`` weekly cohorts active N weeks after their first visit"""
+    latest_sql, retention_sql = RETENTION_SQL[source]
+    latest_day = conn.execute(latest_sql).fetchone()[0]
+    if latest_day is None:
+        return {'cohorts': [], 'sizes': [], 'matrix': []}
+    latest = date.fromisoformat(latest_day)
+    latest -= timedelta(days=latest.weekday())
+    since = latest - timedelta(weeks=weeks - 1)
+
+    active: Dict[tuple, int] = {}        # (cohort week, weeks later) -> users
+    for cohort, week, users in conn.execute(retention_sql, {'since': since.isoformat()}):
+        cohort = date.fromisoformat(cohort)
+        active[(cohort, (date.fromisoformat(week) - cohort).days // 7)] = users
+
+    cohorts = sorted(cohort for cohort, offset in active if offset == 0)
+    matrix = []
+    for cohort in cohorts:
+        size = active[(cohort, 0)]
+        # Weeks that haven't happened yet are left empty rather than shown as 0%
+        elapsed = (latest - cohort).days // 7
+        matrix.append([round(active.get((cohort, offset), 0) / size * 100, 1) if offset <= elapsed else None
+                       for offset in range(weeks)])
+    return {
+        'cohorts': [cohort.isoformat() for cohort in cohorts],
+        'sizes': [active[(cohort, 0)] for cohort in cohorts],
+        'matrix': matrix
+    }
+
+
+def fingerprint(name: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps({'chart': name, 'style': CHART_STYLE_VERSION, 'data': data},
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _is_empty(name: str, data: Dict[str, Any]) -> bool:
+    key = {'daily_activity': 'dates', 'mood_popularity': 'moods', 'retention': 'cohorts'}[name]
+    return not data[key]
+
+
+def render_charts(chart_data: Dict[str, Any], chart_dir: str = DEFAULT_CHART_DIR,
+                  workers: Optional[int] = None, force: bool = False) -> List[ChartResult]:
+    """Draw every chart whose image isn't cached yet, in parallel
+
+    Images are saved as ``<chart>_<fingerprint>.png``; older images of the
+    same chart are removed once a new one is written. The pool is only
+    started when something needs drawing.
+    """
+    os.makedirs(chart_dir, exist_ok=True)
+    results = {}
+    pending = {}
+    for name, data in chart_data.items():
+        if _is_empty(name, data):
+            results[name] = ChartResult(name, None, False, 0.0)
+            continue
+        path = os.path.join(chart_dir, f"{name}_{fingerprint(name, data)}.png")
+        if os.path.exists(path) and not force:
+            results[name] = ChartResult(name, path, True, 0.0)
+        else:
+            pending[name] = path
+
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers or len(pending), len(pending))) as pool:
+            futures = {name: pool.submit(render_chart, name, chart_data[name], path)
+                       for name, path in pending.items()}
+            for name, future in futures.items():
+                results[name] = ChartResult(name, pending[name], False, future.result())
+                _remove_stale(chart_dir, name, pending[name])
+
+    return [results[name] for name in chart_data]
+
+
+def _remove_stale(chart_dir: str, name: str, keep: str):
+    for path in glob.glob(os.path.join(chart_dir, f"{name}_*.png")):
+        if path != keep:
+            os.remove(path)
+
+
+def render_chart(name: str, data: Dict[str, Any], path: str) -> float:
+    """Draw one chart to ``path`` (runs in a worker process); returns seconds taken"""
+    start = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_theme(style='whitegrid')
+    if name == 'daily_activity':
+        fig, ax = plt.subplots(figsize=(10, 5))
+        ax.plot(data['dates'], data['interactions'], marker='o', label='Interactions')
+        ax.plot(data['dates'], data['messages'], marker='o', label='Messages generated')
+        ax.plot(data['dates'], data['users'], marker='o', label='Unique users')
+        ax.set_title(f"Daily Activity (last {data['days']} days)")
+        ax.set_ylabel('Count')
+        ax.legend()
+        fig.autofmt_xdate()
+    elif name == 'mood_popularity':
+        fig, ax = plt.subplots(figsize=(8, 5))
+        sns.barplot(x=data['moods'], y=data['counts'], hue=data['moods'], palette='pastel', legend=False, ax=ax)
+        ax.set_title('Mood Theme Popularity')
+        ax.set_ylabel('Selections')
+    elif name == 'retention':
+        fig, ax = plt.subplots(figsize=(10, 0.5 * len(data['cohorts']) + 2))
+        matrix = [[float('nan') if value is None else value for value in row] for row in data['matrix']]
+        sns.heatmap(matrix, annot=True, fmt='.0f', cmap='Blues', vmin=0, vmax=100,
+                    cbar_kws={'label': '% of cohort active'}, ax=ax,
+                    xticklabels=[f"W{offset}" for offset in range(len(matrix[0]))],
+                    yticklabels=[f"{cohort} ({size})" for cohort, size in zip(data['cohorts'], data['sizes'])])
+        ax.grid(False)
+        ax.set_title('Weekly Retention by First-Visit Week')
+        ax.set_xlabel('Weeks since first visit')
+        ax.set_ylabel('Cohort (users)')
+    else:
+        raise ValueError(f"Unknown chart: {name}")
+
+    fig.tight_layout()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fig.savefig(tmp_path, format='png', dpi=100)
+    plt.close(fig)
+    os.replace(tmp_path, path)
+    return time.perf_counter() - start
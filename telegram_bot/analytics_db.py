@@ -0,0 +1,143 @@
+"""
+SQLite connection management for KindWords Telegram Bot analytics
+Keeps one long-lived writer connection and a small pool of reader connections
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every connection. WAL lets readers (the bot's /stats and
+# analytics_viewer.py) run while the writer commits; NORMAL sync is safe with
+# WAL and only fsyncs on checkpoint.
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,        # ~20 MB page cache (negative = KiB)
+    'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000         # ms to wait on a locked database
+}
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: dict = None):
+    """Apply performance pragmas to a connection"""
+    for name, value in (pragmas or DEFAULT_PRAGMAS).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def connect_readonly(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a read-only connection that never blocks a WAL writer"""
+    uri = Path(db_path).absolute().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+    apply_pragmas(conn)
+    return conn
+
+
+class SQLiteConnectionManager:
+    """Owns the analytics database connections
+
+    There is exactly one writer connection, serialised by a lock, and up to
+    ``max_readers`` reader connections handed out from a pool. Connections are
+    opened lazily and kept for the lifetime of the manager.
+    """
+
+    def __init__(self, db_path: str, max_readers: int = 4, pragmas: dict = None):
+        self.db_path = db_path
+        self.max_readers = max(1, max_readers)
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+
+        self._writer_conn = None
+        self._writer_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection with WAL journaling and tuned pragmas"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the writer connection inside a transaction
+
+        Commits when the block exits cleanly and rolls back on error.
+        """
+        with self._writer_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection manager is closed")
+            if self._writer_conn is None:
+                self._writer_conn = self._open()
+
+            conn = self._writer_conn
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled reader connection"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            # End any implicit read transaction so the WAL can checkpoint
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        """Take an idle reader, open a new one, or wait for one to be returned"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection manager is closed")
+
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if len(self._all_readers) < self.max_readers:
+                conn = self._open()
+                conn.execute("PRAGMA query_only = ON")
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
+    def close(self):
+        """Close every connection owned by the manager"""
+        self._closed = True
+
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                try:
+                    # Fold the WAL back into the main file on a clean shutdown
+                    self._writer_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error as e:
+                    logger.warning(f"WAL checkpoint on close failed: {e}")
+                self._writer_conn.close()
+                self._writer_conn = None
+
+        with self._readers_lock:
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._all_readers.clear()
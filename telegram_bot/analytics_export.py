@@ -0,0 +1,227 @@
+"""
+Streaming analytics export for KindWords Telegram Bot
+Pages through user_interactions by primary key and writes each page as it
+arrives, so an export uses the same memory for ten rows or ten million.
+Writes CSV and JSON Lines (optionally gzipped), and Parquet or Feather when
+pyarrow is installed. A saved high-water mark makes repeated exports
+incremental.
+"""
+
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+EXPORT_COLUMNS = ('user_id', 'username', 'first_name', 'last_name', 'timestamp', 'action',
+                  'recipient_name', 'mood_choice', 'message_generated')
+EXPORT_FORMATS = ('csv', 'csv.gz', 'jsonl', 'jsonl.gz', 'parquet', 'feather')
+DEFAULT_CHUNK_SIZE = 20000
+
+
+class ExportResult(NamedTuple):
+    path: str
+    format: str
+    rows: int
+    seconds: float
+    last_id: int        # High-water mark: the next incremental export starts after it
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def detect_format(path: str) -> str:
+    """Export format from the file name, defaulting to CSV"""
+    name = path.lower()
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if name.endswith('.' + fmt):
+            return fmt
+    if name.endswith('.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def parse_time_bound(value: Optional[str]) -> Optional[str]:
+    """'2024-05-01' or '2024-05-01 12:00' in the form timestamps are stored in"""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).isoformat(sep=' ')
+
+
+class _CSVWriter:
+    def __init__(self, path: str, compressed: bool):
+        self._file = (gzip.open(path, 'wt', encoding='utf-8', newline='') if compressed
+                      else open(path, 'w', encoding='utf-8', newline=''))
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows: List[Tuple]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JSONLWriter:
+    def __init__(self, path: str, compressed: bool):
+        self._file = (gzip.open(path, 'wt', encoding='utf-8') if compressed
+                      else open(path, 'w', encoding='utf-8'))
+
+    def write(self, rows: List[Tuple]):
+        self._file.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+                              for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowWriter:
+    """Parquet (a row group per chunk) or Feather (a record batch per chunk)"""
+
+    def __init__(self, path: str, fmt: str):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)") from None
+        self._pa = pa
+        self.schema = pa.schema([
+            ('user_id', pa.int64()), ('username', pa.string()), ('first_name', pa.string()),
+            ('last_name', pa.string()), ('timestamp', pa.string()), ('action', pa.string()),
+            ('recipient_name', pa.string()), ('mood_choice', pa.string()), ('message_generated', pa.bool_())
+        ])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def write(self, rows: List[Tuple]):
+        pa = self._pa
+        columns = list(zip(*rows))
+        arrays = [pa.array(column, type=field.type) if field.type != pa.bool_()
+                  else pa.array(column, type=pa.int8()).cast(pa.bool_())
+                  for column, field in zip(columns, self.schema)]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if hasattr(self._writer, 'write_batch'):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def _open_writer(path: str, fmt: str):
+    if fmt in ('csv', 'csv.gz'):
+        return _CSVWriter(path, fmt.endswith('.gz'))
+    if fmt in ('jsonl', 'jsonl.gz'):
+        return _JSONLWriter(path, fmt.endswith('.gz'))
+    if fmt in ('parquet', 'feather'):
+        return _ArrowWriter(path, fmt)
+    raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+
+def iter_pages(conn: sqlite3.Connection, after_id: int, max_id: int, since: Optional[str] = None,
+               until: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Tuple]]:
+    """Rows with after_id < id <= max_id, a page at a time in id order
+
+    Each page is its own short query keyed on the last id seen, so no read
+    transaction is held open between pages and the bot's WAL can still be
+    checkpointed during a long export. Rows are (id, *EXPORT_COLUMNS).
+    """
+    conditions = ["id > ?", "id <= ?"]
+    bounds: List[Any] = []
+    if since:
+        # The timestamp index finds where the range starts; pages then walk
+        # the table in id order ('+' keeps SQLite from sorting every page)
+        first_id = conn.execute("SELECT MIN(+id) FROM user_interactions WHERE timestamp >= ? AND +id > ?",
+                                (since, after_id)).fetchone()[0]
+        if first_id is None:
+            return
+        after_id = first_id - 1
+        conditions.append("+timestamp >= ?")
+        bounds.append(since)
+    if until:
+        conditions.append("+timestamp < ?")
+        bounds.append(until)
+    sql = f'''
+        SELECT id, {', '.join(EXPORT_COLUMNS)}
+        FROM user_interactions
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id LIMIT ?
+    '''
+    last_id = after_id
+    while last_id < max_id:
+        page = conn.execute(sql, (last_id, max_id, *bounds, chunk_size)).fetchall()
+        if not page:
+            break
+        yield page
+        if len(page) < chunk_size:
+            break
+        last_id = page[-1][0]
+
+
+def export_interactions(conn: sqlite3.Connection, path: str, fmt: Optional[str] = None,
+                        since: Optional[str] = None, until: Optional[str] = None, after_id: int = 0,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> ExportResult:
+    """Stream interactions after ``after_id`` (and within since/until) to ``path``
+
+    Only rows that existed when the export started are included; the
+    returned ``last_id`` marks where the next incremental export picks up.
+    With ``until``, the export (and the mark) stops just before the first
+    row at or after ``until``, so a later incremental export picks up
+    every row this one left out, and none that it already wrote.
+    The file is written next to ``path`` and renamed into place when done.
+    """
+    fmt = fmt or detect_format(path)
+    start = time.perf_counter()
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM user_interactions").fetchone()[0]
+    last_id = max_id
+    if until:
+        first_excluded = conn.execute(
+            "SELECT MIN(+id) FROM user_interactions WHERE timestamp >= ? AND +id > ? AND +id <= ?",
+            (until, after_id, max_id)).fetchone()[0]
+        if first_excluded is not None:
+            last_id = first_excluded - 1
+
+    tmp_path = f"{path}.tmp"
+    writer = _open_writer(tmp_path, fmt)
+    rows = 0
+    try:
+        for page in iter_pages(conn, after_id, last_id, since, until, chunk_size):
+            writer.write([row[1:] for row in page])
+            rows += len(page)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return ExportResult(path, fmt, rows, time.perf_counter() - start, max(last_id, after_id))
+
+
+def load_mark(mark_file: str) -> int:
+    """Last exported id from a high-water mark file, 0 if there is none yet"""
+    try:
+        with open(mark_file, 'r', encoding='utf-8') as f:
+            return int(json.load(f)['last_id'])
+    except FileNotFoundError:
+        return 0
+
+
+def save_mark(mark_file: str, result: ExportResult):
+    os.makedirs(os.path.dirname(mark_file) or '.', exist_ok=True)
+    tmp_path = f"{mark_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'last_id': result.last_id,
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'path': result.path,
+            'rows': result.rows
+        }, f, indent=2)
+    os.replace(tmp_path, mark_file)
@@ -0,0 +1,137 @@
+"""
+Schema migrations for the KindWords analytics database
+Each migration runs once, in order, tracked through PRAGMA user_version
+"""
+
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+from analytics_rollups import migrate_rollups
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> List[str]:
+    """List the column names of a table"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_base_tables(conn: sqlite3.Connection):
+    """Version 1: the original analytics tables"""
+    # User interactions table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            timestamp DATETIME NOT NULL,
+            action TEXT NOT NULL,
+            recipient_name TEXT,
+            mood_choice TEXT,
+            message_generated BOOLEAN DEFAULT FALSE,
+            session_data TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Daily stats table for quick analytics
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date DATE PRIMARY KEY,
+            total_users INTEGER DEFAULT 0,
+            total_messages INTEGER DEFAULT 0,
+            unique_users INTEGER DEFAULT 0,
+            most_popular_mood TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Mood popularity table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS mood_stats (
+            mood TEXT PRIMARY KEY,
+            count INTEGER DEFAULT 0,
+            last_used DATETIME,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _add_day_column_and_indexes(conn: sqlite3.Connection):
+    """Version 2: stored day column plus indexes for /stats and the viewer"""
+    if 'day' not in _column_names(conn, 'user_interactions'):
+        conn.execute("ALTER TABLE user_interactions ADD COLUMN day TEXT")
+
+    # Timestamps are stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]'
+    conn.execute("UPDATE user_interactions SET day = substr(timestamp, 1, 10) WHERE day IS NULL")
+
+    # Covers both per-user /stats queries (counts, first seen, favorite mood)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_interactions_user_mood
+        ON user_interactions (user_id, mood_choice, message_generated, timestamp)
+    ''')
+
+    # Covers get_daily_stats: totals, distinct users and the day's top mood
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_interactions_day
+        ON user_interactions (day, mood_choice, user_id, message_generated)
+    ''')
+
+    # Time-range scans (daily activity windows, exports)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_interactions_timestamp
+        ON user_interactions (timestamp)
+    ''')
+
+    # Mood popularity in the viewer
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_interactions_mood
+        ON user_interactions (mood_choice)
+    ''')
+
+
+# (version, description, migration) in the order they must be applied
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "create base analytics tables", _create_base_tables),
+    (2, "add day column and query indexes", _add_day_column_and_indexes),
+    (3, "create and backfill rollup tables", migrate_rollups),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Apply every migration newer than the database's version
+
+    Each migration runs in its own transaction together with the version
+    bump, so an interrupted startup resumes where it stopped. Safe to call
+    on every start. Returns the resulting schema version.
+    """
+    current = get_schema_version(conn)
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        logger.info(f"Applying analytics migration {version}: {description}")
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN")
+        try:
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        current = version
+
+    if conn.in_transaction:
+        conn.commit()
+    return current
@@ -0,0 +1,274 @@
+"""
+Analytics report engine for KindWords Telegram Bot
+Computes everything the viewer's report shows in one go: from the rollup
+tables when the database has them, otherwise in a single streaming pass over
+user_interactions. The result renders as the familiar text report or as JSON.
+"""
+
+import heapq
+import json
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from analytics_migrations import MIGRATIONS, get_schema_version
+from analytics_rollups import migrate_rollups
+
+# Schema version from which the rollup tables exist and are kept up to date
+ROLLUP_SCHEMA_VERSION = next(version for version, _, migration in MIGRATIONS if migration is migrate_rollups)
+
+SCAN_CHUNK_SIZE = 10000
+
+
+class DailyActivity(NamedTuple):
+    date: str
+    unique_users: int
+    total_interactions: int
+    messages_generated: int
+
+
+class UserActivity(NamedTuple):
+    user_id: int
+    first_name: Optional[str]
+    total_interactions: int
+    messages_created: int
+    first_seen: Optional[str]
+    last_seen: Optional[str]
+
+
+class AnalyticsReport(NamedTuple):
+    """Every aggregate in the viewer's report, computed together"""
+    generated_at: datetime
+    source: str                                   # 'rollups' or 'scan'
+    days: int
+    user_limit: int
+    total_users: int
+    total_interactions: int
+    total_messages: int
+    most_active_day: Optional[Tuple[str, int]]
+    moods: List[Tuple[str, int]]                  # Most popular first
+    daily: List[DailyActivity]                    # Oldest first
+    top_users: List[UserActivity]                 # Most active first
+
+    @property
+    def conversion_rate(self) -> Optional[float]:
+        if not self.total_interactions:
+            return None
+        return self.total_messages / self.total_interactions * 100
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'generated_at': self.generated_at.isoformat(timespec='seconds'),
+            'source': self.source,
+            'overview': {
+                'total_users': self.total_users,
+                'total_interactions': self.total_interactions,
+                'messages_generated': self.total_messages,
+                'most_active_day': dict(zip(('date', 'interactions'), self.most_active_day))
+                                   if self.most_active_day else None,
+                'conversion_rate': round(self.conversion_rate, 2) if self.conversion_rate is not None else None
+            },
+            'moods': [{'mood': mood, 'count': count} for mood, count in self.moods],
+            'daily_activity': {'days': self.days, 'rows': [row._asdict() for row in self.daily]},
+            'top_users': [user._asdict() for user in self.top_users]
+        }
+
+
+def has_rollups(conn: sqlite3.Connection) -> bool:
+    return get_schema_version(conn) >= ROLLUP_SCHEMA_VERSION
+
+
+def build_report(conn: sqlite3.Connection, days: int = 7, top_users: int = 5,
+                 source: str = 'auto') -> AnalyticsReport:
+    """Compute the report from 'rollups', a single 'scan', or whichever is available ('auto')"""
+    if source == 'auto':
+        source = 'rollups' if has_rollups(conn) else 'scan'
+    since = (date.today() - timedelta(days=days)).isoformat()
+    if conn.in_transaction:
+        conn.commit()
+    # One read transaction, so every aggregate comes from the same snapshot
+    conn.execute("BEGIN")
+    try:
+        if source == 'rollups':
+            fields = _from_rollups(conn, since, top_users)
+        elif source == 'scan':
+            fields = _from_scan(conn, since, top_users)
+        else:
+            raise ValueError(f"Unknown report source: {source}")
+    finally:
+        conn.rollback()
+    return AnalyticsReport(generated_at=datetime.now(), source=source, days=days, user_limit=top_users, **fields)
+
+
+def _latest_name(conn: sqlite3.Connection, user_id: int) -> Optional[str]:
+    """Names aren't aggregated; the user's latest row has the current one"""
+    row = conn.execute('''
+        SELECT first_name FROM user_interactions WHERE user_id = ?
+        ORDER BY timestamp DESC LIMIT 1
+    ''', (user_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _from_rollups(conn: sqlite3.Connection, since: str, top_users: int) -> Dict[str, Any]:
+    total_interactions, total_messages = conn.execute(
+        "SELECT COALESCE(SUM(total_interactions), 0), COALESCE(SUM(total_messages), 0) FROM daily_stats"
+    ).fetchone()
+    most_active_day = conn.execute('''
+        SELECT date, total_interactions FROM daily_stats
+        WHERE total_interactions > 0
+        ORDER BY total_interactions DESC, date LIMIT 1
+    ''').fetchone()
+    daily = [DailyActivity(*row) for row in conn.execute('''
+        SELECT date, unique_users, total_interactions, total_messages
+        FROM daily_stats WHERE date >= ? AND total_interactions > 0
+        ORDER BY date
+    ''', (since,))]
+
+    users = [UserActivity(user_id, _latest_name(conn, user_id), interactions, messages, first_seen, last_seen)
+             for user_id, interactions, messages, first_seen, last_seen in conn.execute('''
+                 SELECT user_id, total_interactions, messages_created, first_interaction, last_interaction
+                 FROM user_stats ORDER BY total_interactions DESC, user_id LIMIT ?
+             ''', (top_users,)).fetchall()]
+
+    return {
+        'total_users': conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0],
+        'total_interactions': total_interactions,
+        'total_messages': total_messages,
+        'most_active_day': tuple(most_active_day) if most_active_day else None,
+        'moods': [tuple(row) for row in conn.execute(
+            "SELECT mood, count FROM mood_stats WHERE count > 0 ORDER BY count DESC")],
+        'daily': daily,
+        'top_users': users
+    }
+
+
+def _from_scan(conn: sqlite3.Connection, since: str, top_users: int) -> Dict[str, Any]:
+    """Every aggregate from one pass over user_interactions
+
+    SQLite walks the (day, mood, user) covering index in order and hands
+    back one row per group rather than one per interaction; the per-day,
+    per-mood and per-user totals are all folded from that single stream.
+    First/last seen and names are then looked up for the top users only.
+    """
+    total_interactions = 0
+    total_messages = 0
+    day_counts: Dict[str, int] = {}
+    recent: Dict[str, list] = {}     # day -> [interactions, messages, {user_id}], only days >= since
+    moods: Dict[str, int] = {}
+    users: Dict[int, list] = {}      # user_id -> [interactions, messages]
+
+    cursor = conn.execute('''
+        SELECT day, mood_choice, user_id, COUNT(*), SUM(message_generated = 1)
+        FROM user_interactions
+        GROUP BY day, mood_choice, user_id
+    ''')
+    while True:
+        rows = cursor.fetchmany(SCAN_CHUNK_SIZE)
+        if not rows:
+            break
+        for day, mood, user_id, count, messages in rows:
+            total_interactions += count
+            total_messages += messages
+            day_counts[day] = day_counts.get(day, 0) + count
+            if day >= since:
+                entry = recent.get(day)
+                if entry is None:
+                    entry = recent[day] = [0, 0, set()]
+                entry[0] += count
+                entry[1] += messages
+                entry[2].add(user_id)
+            if mood is not None:
+                moods[mood] = moods.get(mood, 0) + count
+            user = users.get(user_id)
+            if user is None:
+                users[user_id] = [count, messages]
+            else:
+                user[0] += count
+                user[1] += messages
+
+    top = []
+    # Most interactions first, ties by user id, as the rollup query orders them
+    ranked = heapq.nsmallest(top_users, users.items(), key=lambda item: (-item[1][0], item[0]))
+    for user_id, (interactions, messages) in ranked:
+        first_seen, last_seen = conn.execute(
+            "SELECT MIN(timestamp), MAX(timestamp) FROM user_interactions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        top.append(UserActivity(user_id, _latest_name(conn, user_id), interactions, messages,
+                                first_seen, last_seen))
+
+    return {
+        'total_users': len(users),
+        'total_interactions': total_interactions,
+        'total_messages': total_messages,
+        'most_active_day': min(day_counts.items(), key=lambda item: (-item[1], item[0])) if day_counts else None,
+        'moods': sorted(moods.items(), key=lambda item: item[1], reverse=True),
+        'daily': [DailyActivity(day, len(entry[2]), entry[0], entry[1]) for day, entry in sorted(recent.items())],
+        'top_users': top
+    }
+
+
+def render_json(report: AnalyticsReport) -> str:
+    return json.dumps(report.to_dict(), indent=2, ensure_ascii=False)
+
+
+def render_text(report: AnalyticsReport) -> str:
+    """The report in the viewer's text layout"""
+    lines = [
+        "🤖 KindWords Telegram Bot Analytics Report",
+        "=" * 50,
+        f"Generated on: {report.generated_at.strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "📊 KindWords Bot Analytics Overview",
+        "=" * 40,
+        f"👥 Total Users: {report.total_users}",
+        f"💬 Total Interactions: {report.total_interactions}",
+        f"💌 Messages Generated: {report.total_messages}"
+    ]
+    if report.most_active_day:
+        lines.append(f"📈 Most Active Day: {report.most_active_day[0]} ({report.most_active_day[1]} interactions)")
+    else:
+        lines.append("📈 Most Active Day: None yet")
+    if report.moods:
+        lines.append(f"🎭 Most Popular Mood: {report.moods[0][0]} ({report.moods[0][1]} times)")
+    else:
+        lines.append("🎭 Most Popular Mood: None yet")
+    if report.conversion_rate is not None:
+        lines.append(f"📊 Message Conversion Rate: {report.conversion_rate:.1f}%")
+
+    if report.daily:
+        lines += [
+            f"\n📅 Daily Activity (Last {report.days} days)",
+            "=" * 60,
+            f"{'Date':<12} {'Users':<8} {'Interactions':<12} {'Messages':<10}",
+            "-" * 60
+        ]
+        lines += [f"{row.date:<12} {row.unique_users:<8} {row.total_interactions:<12} {row.messages_generated:<10}"
+                  for row in report.daily]
+    else:
+        lines.append(f"📅 No activity data for the last {report.days} days")
+
+    if report.moods:
+        lines += ["\n🎭 Mood Theme Popularity", "=" * 30]
+        total_mood_selections = sum(count for _, count in report.moods)
+        lines += [f"{mood:<15} {count:<5} ({count / total_mood_selections * 100:.1f}%)"
+                  for mood, count in report.moods]
+    else:
+        lines.append("\n🎭 No mood data available yet")
+
+    if report.top_users:
+        lines += [
+            f"\n👥 Most Active Users (Top {report.user_limit})",
+            "=" * 80,
+            f"{'User ID':<12} {'Name':<15} {'Interactions':<12} {'Messages':<10} {'First Seen':<12}",
+            "-" * 80
+        ]
+        for user in report.top_users:
+            first_date = user.first_seen[:10] if user.first_seen else "Unknown"
+            display_name = user.first_name[:14] if user.first_name else f"User{user.user_id}"
+            lines.append(f"{user.user_id:<12} {display_name:<15} {user.total_interactions:<12} "
+                         f"{user.messages_created:<10} {first_date:<12}")
+    else:
+        lines.append("\n👥 No user data available yet")
+
+    lines += ["\n" + "=" * 50, "💝 Thank you for spreading kindness with KindWords!"]
+    return "\n".join(lines)
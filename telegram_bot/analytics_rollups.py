@@ -0,0 +1,346 @@
+"""
+Incrementally maintained rollup tables for KindWords analytics
+The batch writer folds every batch of interactions into these tables so /stats
+reads a handful of rows by primary key instead of scanning user_interactions.
+"""
+
+import logging
+import sqlite3
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = ('daily_stats', 'daily_users', 'daily_mood_stats',
+                 'user_stats', 'user_mood_stats', 'mood_stats')
+
+
+def create_rollup_tables(conn: sqlite3.Connection):
+    """Create the rollup tables (daily_stats and mood_stats already exist)"""
+    daily_columns = [row[1] for row in conn.execute("PRAGMA table_info(daily_stats)")]
+    if 'total_interactions' not in daily_columns:
+        conn.execute("ALTER TABLE daily_stats ADD COLUMN total_interactions INTEGER DEFAULT 0")
+
+    # Exact per-day set of users; its row count per day is daily_stats.unique_users
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_users (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_mood_stats (
+            day TEXT NOT NULL,
+            mood TEXT NOT NULL,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (day, mood)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_interactions INTEGER DEFAULT 0,
+            messages_created INTEGER DEFAULT 0,
+            first_interaction DATETIME,
+            last_interaction DATETIME,
+            favorite_mood TEXT,
+            favorite_mood_count INTEGER DEFAULT 0
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_mood_stats (
+            user_id INTEGER NOT NULL,
+            mood TEXT NOT NULL,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, mood)
+        ) WITHOUT ROWID
+    ''')
+
+
+class _Aggregates:
+    """In-memory totals for a set of interactions, shaped like the rollup tables"""
+
+    def __init__(self):
+        self.daily = defaultdict(lambda: [0, 0])           # day -> [interactions, messages]
+        self.daily_users = defaultdict(set)                 # day -> {user_id}
+        self.daily_moods = defaultdict(int)                 # (day, mood) -> count
+        self.users = {}                                     # user_id -> [interactions, messages, first, last]
+        self.user_moods = defaultdict(int)                  # (user_id, mood) -> count
+        self.moods = {}                                     # mood -> [count, last_used]
+
+    def add(self, user_id: int, day: str, timestamp: Any, mood: Optional[str], generated: bool):
+        """Fold one interaction into the totals"""
+        generated = 1 if generated else 0
+
+        daily = self.daily[day]
+        daily[0] += 1
+        daily[1] += generated
+        self.daily_users[day].add(user_id)
+
+        user = self.users.get(user_id)
+        if user is None:
+            self.users[user_id] = [1, generated, timestamp, timestamp]
+        else:
+            user[0] += 1
+            user[1] += generated
+            if timestamp < user[2]:
+                user[2] = timestamp
+            if timestamp > user[3]:
+                user[3] = timestamp
+
+        if mood:
+            self.daily_moods[(day, mood)] += 1
+            self.user_moods[(user_id, mood)] += 1
+            entry = self.moods.get(mood)
+            if entry is None:
+                self.moods[mood] = [1, timestamp]
+            else:
+                entry[0] += 1
+                if timestamp > entry[1]:
+                    entry[1] = timestamp
+
+
+def apply_events(conn: sqlite3.Connection, events: Iterable[Any]):
+    """Fold a batch of interaction events into the rollup tables
+
+    Must run inside the writer's transaction so the raw rows and the rollups
+    commit together. Events need user_id, timestamp, mood_choice and
+    message_generated attributes.
+    """
+    agg = _Aggregates()
+    for event in events:
+        # Stored as text so comparisons match what sqlite3 writes for datetimes
+        timestamp = str(event.timestamp)
+        agg.add(event.user_id, timestamp[:10], timestamp, event.mood_choice, event.message_generated)
+
+    conn.executemany('''
+        INSERT INTO daily_stats (date, total_interactions, total_messages, unique_users)
+        VALUES (?, ?, ?, 0)
+        ON CONFLICT(date) DO UPDATE SET
+            total_interactions = total_interactions + excluded.total_interactions,
+            total_messages = total_messages + excluded.total_messages
+    ''', [(day, counts[0], counts[1]) for day, counts in agg.daily.items()])
+
+    new_users = []
+    for day, user_ids in agg.daily_users.items():
+        added = 0
+        for user_id in user_ids:
+            added += conn.execute(
+                "INSERT OR IGNORE INTO daily_users (day, user_id) VALUES (?, ?)", (day, user_id)
+            ).rowcount
+        if added:
+            new_users.append((added, day))
+    conn.executemany("UPDATE daily_stats SET unique_users = unique_users + ? WHERE date = ?", new_users)
+
+    if agg.daily_moods:
+        conn.executemany('''
+            INSERT INTO daily_mood_stats (day, mood, count) VALUES (?, ?, ?)
+            ON CONFLICT(day, mood) DO UPDATE SET count = count + excluded.count
+        ''', [(day, mood, count) for (day, mood), count in agg.daily_moods.items()])
+
+        conn.executemany('''
+            UPDATE daily_stats SET most_popular_mood = (
+                SELECT mood FROM daily_mood_stats WHERE day = ? ORDER BY count DESC LIMIT 1
+            ) WHERE date = ?
+        ''', [(day, day) for day in {day for day, _ in agg.daily_moods}])
+
+    conn.executemany('''
+        INSERT INTO user_stats (user_id, total_interactions, messages_created,
+                                first_interaction, last_interaction)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            total_interactions = total_interactions + excluded.total_interactions,
+            messages_created = messages_created + excluded.messages_created,
+            first_interaction = MIN(first_interaction, excluded.first_interaction),
+            last_interaction = MAX(last_interaction, excluded.last_interaction)
+    ''', [(user_id, *totals) for user_id, totals in agg.users.items()])
+
+    if agg.user_moods:
+        conn.executemany('''
+            INSERT INTO user_mood_stats (user_id, mood, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, mood) DO UPDATE SET count = count + excluded.count
+        ''', [(user_id, mood, count) for (user_id, mood), count in agg.user_moods.items()])
+
+        conn.executemany('''
+            UPDATE user_stats SET (favorite_mood, favorite_mood_count) = (
+                SELECT mood, count FROM user_mood_stats WHERE user_id = ?
+                ORDER BY count DESC LIMIT 1
+            ) WHERE user_id = ?
+        ''', [(user_id, user_id) for user_id in {user_id for user_id, _ in agg.user_moods}])
+
+
+def _scan_interactions(conn: sqlite3.Connection) -> _Aggregates:
+    """Aggregate user_interactions in a single streaming pass"""
+    agg = _Aggregates()
+    cursor = conn.execute('''
+        SELECT user_id, COALESCE(day, substr(timestamp, 1, 10)), timestamp,
+               mood_choice, message_generated
+        FROM user_interactions
+    ''')
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        for user_id, day, timestamp, mood, generated in rows:
+            agg.add(user_id, day, timestamp, mood, generated == 1)
+    return agg
+
+
+def _favorites(agg: _Aggregates) -> Dict[Any, tuple]:
+    """Pick each user's most used mood"""
+    favorites = {}
+    for (user_id, mood), count in agg.user_moods.items():
+        if user_id not in favorites or count > favorites[user_id][1]:
+            favorites[user_id] = (mood, count)
+    return favorites
+
+
+def _top_daily_moods(agg: _Aggregates) -> Dict[str, str]:
+    """Pick each day's most used mood"""
+    top = {}
+    for (day, mood), count in agg.daily_moods.items():
+        if day not in top or count > top[day][1]:
+            top[day] = (mood, count)
+    return {day: mood for day, (mood, _) in top.items()}
+
+
+def _write_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Replace every rollup table with totals from a fresh scan"""
+    agg = _scan_interactions(conn)
+    favorites = _favorites(agg)
+    top_moods = _top_daily_moods(agg)
+
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+
+    conn.executemany('''
+        INSERT INTO daily_stats (date, total_interactions, total_messages,
+                                 unique_users, most_popular_mood)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(day, counts[0], counts[1], len(agg.daily_users[day]), top_moods.get(day))
+          for day, counts in agg.daily.items()])
+    conn.executemany("INSERT INTO daily_users (day, user_id) VALUES (?, ?)",
+                     [(day, user_id) for day, users in agg.daily_users.items() for user_id in users])
+    conn.executemany("INSERT INTO daily_mood_stats (day, mood, count) VALUES (?, ?, ?)",
+                     [(day, mood, count) for (day, mood), count in agg.daily_moods.items()])
+    conn.executemany('''
+        INSERT INTO user_stats (user_id, total_interactions, messages_created, first_interaction,
+                                last_interaction, favorite_mood, favorite_mood_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(user_id, *totals, *favorites.get(user_id, (None, 0)))
+          for user_id, totals in agg.users.items()])
+    conn.executemany("INSERT INTO user_mood_stats (user_id, mood, count) VALUES (?, ?, ?)",
+                     [(user_id, mood, count) for (user_id, mood), count in agg.user_moods.items()])
+    conn.executemany('''
+        INSERT INTO mood_stats (mood, count, last_used, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ''', [(mood, count, last_used) for mood, (count, last_used) in agg.moods.items()])
+
+    return {
+        'daily_stats': len(agg.daily),
+        'daily_users': sum(len(users) for users in agg.daily_users.values()),
+        'daily_mood_stats': len(agg.daily_moods),
+        'user_stats': len(agg.users),
+        'user_mood_stats': len(agg.user_moods),
+        'mood_stats': len(agg.moods)
+    }
+
+
+def migrate_rollups(conn: sqlite3.Connection):
+    """Schema migration: create the rollup tables and backfill them"""
+    create_rollup_tables(conn)
+    _write_rollups(conn)
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Recompute every rollup table from the raw interactions
+
+    Holds the write lock for the whole pass, so the bot's writes wait until
+    it finishes. Returns the number of rows written per table.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        counts = _write_rollups(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    logger.info(f"Rebuilt rollups: {counts}")
+    return counts
+
+
+def verify_rollups(conn: sqlite3.Connection) -> List[str]:
+    """Compare the stored rollups against a fresh scan, returning mismatches"""
+    agg = _scan_interactions(conn)
+    problems = []
+
+    stored_daily = {row[0]: row[1:] for row in conn.execute(
+        "SELECT date, total_interactions, total_messages, unique_users FROM daily_stats")}
+    for day, counts in agg.daily.items():
+        expected = (counts[0], counts[1], len(agg.daily_users[day]))
+        if tuple(stored_daily.pop(day, ())) != expected:
+            problems.append(f"daily_stats {day}: expected {expected}")
+    problems.extend(f"daily_stats {day}: no interactions recorded" for day in stored_daily)
+
+    stored_daily_moods = {(day, mood): count for day, mood, count in conn.execute(
+        "SELECT day, mood, count FROM daily_mood_stats")}
+    if stored_daily_moods != dict(agg.daily_moods):
+        problems.append("daily_mood_stats: counts differ from raw interactions")
+
+    stored_users = {row[0]: row[1:] for row in conn.execute(
+        "SELECT user_id, total_interactions, messages_created FROM user_stats")}
+    for user_id, totals in agg.users.items():
+        if tuple(stored_users.pop(user_id, ())) != (totals[0], totals[1]):
+            problems.append(f"user_stats {user_id}: expected {(totals[0], totals[1])}")
+    problems.extend(f"user_stats {user_id}: no interactions recorded" for user_id in stored_users)
+
+    stored_user_moods = {(user_id, mood): count for user_id, mood, count in conn.execute(
+        "SELECT user_id, mood, count FROM user_mood_stats")}
+    if stored_user_moods != dict(agg.user_moods):
+        problems.append("user_mood_stats: counts differ from raw interactions")
+
+    stored_moods = dict(conn.execute("SELECT mood, count FROM mood_stats"))
+    if stored_moods != {mood: entry[0] for mood, entry in agg.moods.items()}:
+        problems.append("mood_stats: counts differ from raw interactions")
+
+    return problems
+
+
+def get_user_stats(conn: sqlite3.Connection, user_id: int) -> Optional[Dict[str, Any]]:
+    """Look up a user's rollup row"""
+    row = conn.execute('''
+        SELECT total_interactions, messages_created, first_interaction,
+               favorite_mood, favorite_mood_count
+        FROM user_stats WHERE user_id = ?
+    ''', (user_id,)).fetchone()
+    if not row:
+        return None
+    return {
+        'total_interactions': row[0],
+        'messages_created': row[1],
+        'first_interaction': row[2],
+        'favorite_mood': row[3],
+        'favorite_mood_count': row[4]
+    }
+
+
+def get_daily_stats(conn: sqlite3.Connection, day: str) -> Dict[str, Any]:
+    """Look up a day's rollup row"""
+    row = conn.execute('''
+        SELECT total_interactions, unique_users, total_messages, most_popular_mood
+        FROM daily_stats WHERE date = ?
+    ''', (day,)).fetchone()
+    return {
+        'date': day,
+        'total_interactions': row[0] if row else 0,
+        'unique_users': row[1] if row else 0,
+        'messages_generated': row[2] if row else 0,
+        'most_popular_mood': row[3] if row else None
+    }
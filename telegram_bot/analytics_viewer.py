@@ -4,14 +4,19 @@ Analytics Viewer for KindWords Telegram Bot
 View and analyze user interaction data
 """
 
-import sqlite3
-import csv
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
+from datetime import datetime
 import argparse
 import os
+import sqlite3
+
+import analytics_rollups
+from analytics_charts import DEFAULT_CHART_DIR, collect_chart_data, render_charts
+from analytics_db import apply_pragmas, connect_readonly
+from analytics_export import (DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_interactions, load_mark,
+                              parse_time_bound, save_mark)
+from analytics_report import build_report, render_json, render_text
+
+DEFAULT_MARK_FILE = "telegram_bot/exports/export_mark.json"
 
 class AnalyticsViewer:
     """View and analyze bot usage analytics"""
@@ -27,7 +32,7 @@ class AnalyticsViewer:
     def get_overview_stats(self):
         """Get overview statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect_readonly(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # Total users
@@ -44,9 +49,9 @@ class AnalyticsViewer:
                 
                 # Most active day
                 cursor.execute("""
-                    SELECT DATE(timestamp) as date, COUNT(*) as count
+                    SELECT day as date, COUNT(*) as count
                     FROM user_interactions 
-                    GROUP BY DATE(timestamp) 
+                    GROUP BY day 
                     ORDER BY count DESC 
                     LIMIT 1
                 """)
@@ -81,20 +86,23 @@ class AnalyticsViewer:
     def get_daily_activity(self, days: int = 7):
         """Get daily activity for the last N days"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query("""
+            with connect_readonly(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
                     SELECT 
-                        DATE(timestamp) as date,
+                        day as date,
                         COUNT(*) as total_interactions,
                         COUNT(DISTINCT user_id) as unique_users,
                         COUNT(CASE WHEN message_generated = 1 THEN 1 END) as messages_generated
                     FROM user_interactions 
-                    WHERE timestamp >= datetime('now', '-{} days')
-                    GROUP BY DATE(timestamp)
+                    WHERE day >= date('now', 'localtime', ?)
+                    GROUP BY day
                     ORDER BY date
-                """.format(days), conn)
+                """, (f'-{days} days',))
                 
-                if df.empty:
+                rows = cursor.fetchall()
+                
+                if not rows:
                     print(f"📅 No activity data for the last {days} days")
                     return
                 
@@ -103,8 +111,8 @@ class AnalyticsViewer:
                 print(f"{'Date':<12} {'Users':<8} {'Interactions':<12} {'Messages':<10}")
                 print("-" * 60)
                 
-                for _, row in df.iterrows():
-                    print(f"{row['date']:<12} {row['unique_users']:<8} {row['total_interactions']:<12} {row['messages_generated']:<10}")
+                for date, total_interactions, unique_users, messages_generated in rows:
+                    print(f"{date:<12} {unique_users:<8} {total_interactions:<12} {messages_generated:<10}")
                 
         except Exception as e:
             print(f"❌ Error getting daily activity: {e}")
@@ -112,7 +120,7 @@ class AnalyticsViewer:
     def get_mood_popularity(self):
         """Get mood theme popularity"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect_readonly(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT mood_choice, COUNT(*) as count
@@ -143,7 +151,7 @@ class AnalyticsViewer:
     def get_user_activity(self, limit: int = 10):
         """Get most active users"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connect_readonly(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT 
@@ -179,60 +187,119 @@ class AnalyticsViewer:
         except Exception as e:
             print(f"❌ Error getting user activity: {e}")
     
-    def export_to_csv(self, output_file: str = None):
-        """Export all data to CSV"""
+    def export_to_csv(self, output_file: str = None, export_format: str = None, since: str = None,
+                      until: str = None, incremental: bool = False, mark_file: str = DEFAULT_MARK_FILE,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Export interactions to CSV, or gzipped CSV, JSONL, Parquet or Feather
+        
+        Rows are streamed a page at a time, so memory use doesn't grow with the
+        table. With ``incremental``, only rows added since the last
+        incremental export (per ``mark_file``) are exported.
+        """
         if not output_file:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"telegram_bot/exports/analytics_export_{timestamp}.csv"
+            output_file = f"telegram_bot/exports/analytics_export_{timestamp}.{export_format or 'csv'}"
         
         # Ensure export directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query("""
-                    SELECT 
-                        user_id,
-                        username,
-                        first_name,
-                        last_name,
-                        timestamp,
-                        action,
-                        recipient_name,
-                        mood_choice,
-                        message_generated
-                    FROM user_interactions 
-                    ORDER BY timestamp
-                """, conn)
-                
-                df.to_csv(output_file, index=False)
-                print(f"✅ Data exported to {output_file}")
-                print(f"📊 Exported {len(df)} records")
+            after_id = load_mark(mark_file) if incremental else 0
+            conn = connect_readonly(self.db_path)
+            try:
+                result = export_interactions(conn, output_file, export_format, parse_time_bound(since),
+                                             parse_time_bound(until), after_id, chunk_size)
+            finally:
+                conn.close()
+            if incremental:
+                save_mark(mark_file, result)
+            
+            print(f"✅ Data exported to {output_file} ({result.format})")
+            print(f"📊 Exported {result.rows} records in {result.seconds:.1f}s "
+                  f"({result.rows_per_second:,.0f} rows/sec)")
+            if incremental:
+                print(f"🔖 Next incremental export starts after id {result.last_id}")
                 
         except Exception as e:
             print(f"❌ Error exporting data: {e}")
     
-    def generate_report(self):
-        """Generate a comprehensive analytics report"""
-        print("🤖 KindWords Telegram Bot Analytics Report")
-        print("=" * 50)
-        print(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print()
-        
-        # Overview stats
-        self.get_overview_stats()
-        
-        # Daily activity
-        self.get_daily_activity(7)
-        
-        # Mood popularity
-        self.get_mood_popularity()
+    def rebuild_rollups(self):
+        """Recompute the rollup tables from raw interactions"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            apply_pragmas(conn)
+            try:
+                counts = analytics_rollups.rebuild_rollups(conn)
+            finally:
+                conn.close()
+            
+            print("✅ Rollups rebuilt")
+            for table, rows in counts.items():
+                print(f"{table:<18} {rows} rows")
+                
+        except Exception as e:
+            print(f"❌ Error rebuilding rollups: {e}")
+    
+    def verify_rollups(self):
+        """Check the rollup tables against raw interactions"""
+        try:
+            with connect_readonly(self.db_path) as conn:
+                problems = analytics_rollups.verify_rollups(conn)
+            
+            if not problems:
+                print("✅ Rollups match raw interactions")
+                return
+            
+            print(f"❌ {len(problems)} rollup mismatches (run --rebuild-rollups to fix):")
+            for problem in problems[:20]:
+                print(f"  {problem}")
+                
+        except Exception as e:
+            print(f"❌ Error verifying rollups: {e}")
+    
+    def generate_report(self, days: int = 7, top_users: int = 5, output_format: str = 'text',
+                        source: str = 'auto'):
+        """Generate a comprehensive analytics report
         
-        # User activity
-        self.get_user_activity(5)
+        Everything is computed together, from the rollup tables when the
+        database has them or else in one pass over the raw interactions.
+        """
+        try:
+            conn = connect_readonly(self.db_path)
+            try:
+                report = build_report(conn, days, top_users, source)
+            finally:
+                conn.close()
+            
+            print(render_json(report) if output_format == 'json' else render_text(report))
+            
+        except Exception as e:
+            print(f"❌ Error generating report: {e}")
+
+    def generate_charts(self, days: int = 30, weeks: int = 8, chart_dir: str = DEFAULT_CHART_DIR,
+                        workers: int = None, force: bool = False, source: str = 'auto'):
+        """Render daily activity, mood popularity and retention charts
         
-        print("\n" + "=" * 50)
-        print("💝 Thank you for spreading kindness with KindWords!")
+        Charts are drawn in parallel worker processes; a chart whose data
+        hasn't changed since the last run is reused from ``chart_dir``.
+        """
+        try:
+            conn = connect_readonly(self.db_path)
+            try:
+                chart_data = collect_chart_data(conn, days, weeks, source)
+            finally:
+                conn.close()
+            
+            for chart in render_charts(chart_data, chart_dir, workers, force):
+                if chart.path is None:
+                    print(f"📉 {chart.name}: no data yet")
+                elif chart.cached:
+                    print(f"♻️  {chart.name}: unchanged, {chart.path}")
+                else:
+                    print(f"✅ {chart.name}: rendered in {chart.seconds:.1f}s, {chart.path}")
+                    
+        except Exception as e:
+            print(f"❌ Error generating charts: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description="KindWords Bot Analytics Viewer")
@@ -240,22 +307,49 @@ def main():
     parser.add_argument("--daily", type=int, default=7, help="Show daily activity for N days")
     parser.add_argument("--moods", action="store_true", help="Show mood popularity")
     parser.add_argument("--users", type=int, default=10, help="Show top N active users")
-    parser.add_argument("--export", type=str, help="Export data to CSV file")
+    parser.add_argument("--export", type=str, help="Export data to a file (format from its extension)")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, help="Export format, overriding the extension")
+    parser.add_argument("--since", type=str, help="Export interactions at or after this date/time")
+    parser.add_argument("--until", type=str, help="Export interactions before this date/time")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Export only interactions added since the last incremental export")
+    parser.add_argument("--mark-file", type=str, default=DEFAULT_MARK_FILE,
+                        help="Where --incremental keeps its high-water mark")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per export page")
     parser.add_argument("--report", action="store_true", help="Generate full report")
+    parser.add_argument("--format", choices=['text', 'json'], default='text', help="Report output format")
+    parser.add_argument("--source", choices=['auto', 'rollups', 'scan'], default='auto',
+                        help="Build the report or charts from rollup tables or a scan of raw interactions")
+    parser.add_argument("--charts", action="store_true", help="Render activity, mood and retention charts")
+    parser.add_argument("--chart-days", type=int, default=30, help="Days shown in the daily activity chart")
+    parser.add_argument("--chart-weeks", type=int, default=8, help="Cohorts and weeks shown in the retention chart")
+    parser.add_argument("--chart-dir", type=str, default=DEFAULT_CHART_DIR, help="Where rendered charts are kept")
+    parser.add_argument("--workers", type=int, help="Chart rendering processes (default: one per chart)")
+    parser.add_argument("--force", action="store_true", help="Redraw charts even if their data is unchanged")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute rollup tables from raw interactions")
+    parser.add_argument("--verify-rollups", action="store_true", help="Check rollup tables against raw interactions")
     parser.add_argument("--db", type=str, default="telegram_bot/data/analytics.db", help="Database path")
     
     args = parser.parse_args()
     
     viewer = AnalyticsViewer(args.db)
     
-    if args.report:
-        viewer.generate_report()
+    if args.rebuild_rollups:
+        viewer.rebuild_rollups()
+    elif args.verify_rollups:
+        viewer.verify_rollups()
+    elif args.report:
+        viewer.generate_report(output_format=args.format, source=args.source)
+    elif args.charts:
+        viewer.generate_charts(args.chart_days, args.chart_weeks, args.chart_dir, args.workers,
+                               args.force, args.source)
     elif args.overview:
         viewer.get_overview_stats()
     elif args.moods:
         viewer.get_mood_popularity()
-    elif args.export:
-        viewer.export_to_csv(args.export)
+    elif args.export or args.incremental:
+        viewer.export_to_csv(args.export, args.export_format, args.since, args.until,
+                             args.incremental, args.mark_file, args.chunk_size)
     else:
         # Default: show overview and recent activity
         viewer.get_overview_stats()
@@ -0,0 +1,160 @@
+"""
+Background batch writer for KindWords Telegram Bot
+Collects analytics events off the event loop and flushes them in batches
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Sentinel placed on the queue to ask the worker thread to drain and exit
+_STOP = object()
+
+
+class BackgroundBatchWriter:
+    """Runs a worker thread that hands queued events to a batch handler
+
+    Events are flushed once ``flush_size`` of them are pending or
+    ``flush_interval`` seconds have passed since the first one arrived.
+    When the queue is full, ``overflow='drop'`` (the default) drops the event
+    immediately and counts it. ``overflow='block'`` waits up to
+    ``put_timeout`` seconds for room first, which stalls the calling thread;
+    called from the event loop, that freezes every update, so only use it
+    where submit() runs off the loop. ``close()`` drains everything that
+    was accepted.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], None], flush_size: int = 100,
+                 flush_interval: float = 1.0, max_queue_size: int = 10000,
+                 overflow: str = 'drop', put_timeout: float = 0.5,
+                 name: str = 'analytics-writer'):
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.handler = handler
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the worker thread"""
+        self._thread.start()
+
+    def submit(self, event: Any) -> bool:
+        """Queue an event for writing, returns False if it was dropped"""
+        if self._closed:
+            logger.warning("Analytics writer is closed, dropping event")
+            self.dropped += 1
+            return False
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Analytics queue full, dropped event (total dropped: {self.dropped})")
+            return False
+
+        self.submitted += 1
+        return True
+
+    def close(self, timeout: float = None):
+        """Stop accepting events, flush everything queued and join the thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        if not self._thread.is_alive():
+            # Never started (or already dead): write what is left inline
+            self._write(self._drain())
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Analytics writer did not finish draining before timeout")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get writer counters for monitoring"""
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'queued': self._queue.qsize()
+        }
+
+    def _run(self):
+        """Worker loop: gather a batch, hand it to the handler, repeat"""
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+
+        # Anything still queued was accepted before close(), so write it too
+        self._write(self._drain())
+
+    def _drain(self) -> List[Any]:
+        """Pull every remaining event off the queue without blocking"""
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return remaining
+            if item is not _STOP:
+                remaining.append(item)
+
+    def _write(self, batch: List[Any]):
+        """Hand a batch to the handler in flush_size chunks"""
+        for start in range(0, len(batch), self.flush_size):
+            chunk = batch[start:start + self.flush_size]
+            try:
+                self.handler(chunk)
+                self.written += len(chunk)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(chunk)
+                logger.error(f"Error writing analytics batch of {len(chunk)} events: {e}")
@@ -0,0 +1,279 @@
+"""
+Daily compliment subscriptions for KindWords Telegram Bot
+Stores who wants a compliment at which hour and delivers them in batches.
+Each subscriber is claimed in the database before their message is sent,
+so a delivery run that crashes can simply be run again without anyone
+getting a second message.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from analytics_db import apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of one delivery attempt
+SENT = 'sent'
+FAILED = 'failed'        # Possibly delivered; not retried
+REMOVED = 'removed'      # Bot blocked or chat gone; subscription deleted
+RETRY = 'retry'          # Definitely not delivered; released for the next run
+
+SendFn = Callable[[int, int, Optional[str]], Awaitable[Any]]  # (user_id, chat_id, language_code)
+
+
+class SubscriptionStore:
+    """Subscriptions in SQLite, indexed by delivery hour
+
+    ``last_sent_day`` is the claim marker: a subscriber is due for an hour
+    when it is earlier than today. Claiming a batch moves it to today in the
+    same transaction that selects it.
+    """
+
+    def __init__(self, db_path: str = "telegram_bot/data/subscriptions.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        apply_pragmas(self._conn)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                user_id INTEGER PRIMARY KEY,
+                chat_id INTEGER NOT NULL,
+                hour INTEGER NOT NULL CHECK (hour BETWEEN 0 AND 23),
+                language_code TEXT,
+                created_at REAL NOT NULL,
+                last_sent_day TEXT NOT NULL DEFAULT ''
+            );
+            -- Time-bucket index: the subscribers still due today for one hour
+            CREATE INDEX IF NOT EXISTS idx_subscriptions_due ON subscriptions (hour, last_sent_day);
+            CREATE TABLE IF NOT EXISTS broadcast_runs (
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                removed INTEGER NOT NULL DEFAULT 0,
+                started_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (day, hour)
+            );
+        ''')
+
+    def subscribe(self, user_id: int, chat_id: int, hour: int, first_day: str = '',
+                  language_code: Optional[str] = None):
+        """Create or move a subscription; deliveries start after ``first_day``
+
+        ``language_code`` is the user's Telegram language, so daily
+        compliments come from the same set as their /compliment replies.
+        """
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO subscriptions (user_id, chat_id, hour, language_code, created_at, last_sent_day)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    chat_id = excluded.chat_id,
+                    hour = excluded.hour,
+                    language_code = excluded.language_code,
+                    last_sent_day = MAX(subscriptions.last_sent_day, excluded.last_sent_day)
+            ''', (user_id, chat_id, hour, language_code, time.time(), first_day))
+
+    def unsubscribe(self, user_id: int) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def get_hour(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT hour FROM subscriptions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim_batch(self, day: str, hour: int, limit: int) -> List[Tuple[int, int, Optional[str]]]:
+        """Atomically take up to ``limit`` (user_id, chat_id, language_code) due for this hour today"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT user_id, chat_id, language_code FROM subscriptions "
+                    "WHERE hour = ? AND last_sent_day < ? LIMIT ?",
+                    (hour, day, limit)
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE subscriptions SET last_sent_day = ? WHERE user_id = ?",
+                        [(day, row[0]) for row in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def release(self, user_ids: List[int], day: str):
+        """Undo claims for messages that were definitely not delivered"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE subscriptions SET last_sent_day = '' WHERE user_id = ? AND last_sent_day = ?",
+                [(user_id, day) for user_id in user_ids]
+            )
+
+    def remove(self, user_ids: List[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM subscriptions WHERE user_id = ?", [(u,) for u in user_ids])
+
+    def record_run(self, day: str, hour: int, sent: int, failed: int, removed: int):
+        """Add a batch's outcome to the run totals for this hour"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO broadcast_runs (day, hour, sent, failed, removed, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(day, hour) DO UPDATE SET
+                    sent = sent + excluded.sent,
+                    failed = failed + excluded.failed,
+                    removed = removed + excluded.removed,
+                    updated_at = excluded.updated_at
+            ''', (day, hour, sent, failed, removed, now, now))
+
+    def count(self, hour: Optional[int] = None) -> int:
+        with self._lock:
+            if hour is None:
+                return self._conn.execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM subscriptions WHERE hour = ?", (hour,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DailyBroadcaster:
+    """Delivers due subscriptions in batches through a caller-supplied sender
+
+    ``run_due`` handles the current hour and up to ``catchup_hours`` earlier
+    hours of the same day, so deliveries missed while the bot was down go
+    out when it comes back. Up to ``max_in_flight`` sends run at once;
+    pacing is left to the bot's rate limiter, and the cap keeps a batch from
+    filling the HTTP connection pool ahead of interactive replies.
+    """
+
+    def __init__(self, store: SubscriptionStore, batch_size: int = 500, catchup_hours: int = 3,
+                 max_in_flight: int = 32):
+        self.store = store
+        self.batch_size = batch_size
+        self.catchup_hours = catchup_hours
+        self._running = False
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+        self.sent = 0
+        self.failed = 0
+        self.removed = 0
+        self.released = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def _run(self, fn, *args):
+        """Run a blocking database call on the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    async def run_due(self, send: SendFn, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Deliver everything due up to ``now``; skipped if a run is in progress"""
+        if self._running:
+            return {}
+        self._running = True
+        started = time.monotonic()
+        now = now or datetime.now()
+        day = now.strftime('%Y-%m-%d')
+        totals = {SENT: 0, FAILED: 0, REMOVED: 0, RETRY: 0}
+        try:
+            for hour in range(max(0, now.hour - self.catchup_hours), now.hour + 1):
+                counts = await self.deliver_hour(send, day, hour)
+                for outcome, count in counts.items():
+                    totals[outcome] += count
+        finally:
+            self._running = False
+
+        if any(totals.values()):
+            self.last_run = dict(totals, day=day, hour=now.hour, seconds=round(time.monotonic() - started, 1))
+            logger.info(f"Daily compliments delivered: {self.last_run}")
+        return totals
+
+    async def deliver_hour(self, send: SendFn, day: str, hour: int) -> Dict[str, int]:
+        """Claim and send batches for one hour until none are due"""
+        totals = {SENT: 0, FAILED: 0, REMOVED: 0, RETRY: 0}
+        while True:
+            batch = await self._run(self.store.claim_batch, day, hour, self.batch_size)
+            if not batch:
+                return totals
+
+            not_started = {row[0] for row in batch}
+            try:
+                outcomes = await asyncio.gather(*(self._send_one(send, *row, not_started) for row in batch))
+            except asyncio.CancelledError:
+                # Shutting down: hand back claims whose sends never began. Shielded
+                # so a second cancellation can't abandon the release halfway
+                await asyncio.shield(self._run(self.store.release, list(not_started), day))
+                raise
+            by_outcome = {SENT: [], FAILED: [], REMOVED: [], RETRY: []}
+            for row, outcome in zip(batch, outcomes):
+                by_outcome[outcome].append(row[0])
+
+            if by_outcome[REMOVED]:
+                await self._run(self.store.remove, by_outcome[REMOVED])
+            if by_outcome[RETRY]:
+                await self._run(self.store.release, by_outcome[RETRY], day)
+            await self._run(self.store.record_run, day, hour, len(by_outcome[SENT]),
+                            len(by_outcome[FAILED]), len(by_outcome[REMOVED]))
+
+            self.sent += len(by_outcome[SENT])
+            self.failed += len(by_outcome[FAILED])
+            self.removed += len(by_outcome[REMOVED])
+            self.released += len(by_outcome[RETRY])
+            for outcome, user_ids in by_outcome.items():
+                totals[outcome] += len(user_ids)
+
+            if by_outcome[RETRY] and len(by_outcome[RETRY]) == len(batch):
+                return totals  # Flood-limited throughout; leave the rest for the next run
+
+    async def _send_one(self, send: SendFn, user_id: int, chat_id: int, language_code: Optional[str],
+                        not_started: set) -> str:
+        try:
+            async with self._in_flight:
+                not_started.discard(user_id)
+                await send(user_id, chat_id, language_code)
+            return SENT
+        except Forbidden:
+            return REMOVED  # User blocked the bot
+        except BadRequest as e:
+            if 'chat not found' in str(e).lower():
+                return REMOVED
+            logger.warning(f"Daily compliment to {chat_id} rejected: {e}")
+            return FAILED
+        except RetryAfter:
+            return RETRY
+        except TelegramError as e:
+            logger.warning(f"Daily compliment to {chat_id} failed: {e}")
+            return FAILED
+        except Exception as e:
+            # Anything else (network wrappers, catalog or sampler bugs) fails this
+            # send only; the rest of the batch still gets recorded
+            logger.error(f"Daily compliment to {chat_id} failed unexpectedly: {e!r}")
+            return FAILED
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get delivery counters for monitoring"""
+        return {
+            'running': self._running,
+            'sent': self.sent,
+            'failed': self.failed,
+            'removed': self.removed,
+            'released': self.released,
+            'last_run': self.last_run
+        }
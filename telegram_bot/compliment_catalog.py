@@ -0,0 +1,307 @@
+"""
+Compliment catalog for KindWords Telegram Bot
+Loads compliments tagged with a language, a category and any number of tags,
+and indexes them so picking one that matches a filter is a dictionary lookup
+plus a random offset, however large the catalog is. Large catalogs can be
+compiled to a binary file that is memory-mapped instead of parsed.
+"""
+
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = 'en'
+DEFAULT_CATEGORY = 'general'
+
+# Used when the catalog file is missing or unreadable
+FALLBACK_COMPLIMENTS = [
+    "You have an incredible ability to make others feel valued and appreciated.",
+    "Your kindness radiates warmth that brightens everyone's day.",
+    "The way you listen with such genuine care is truly a gift."
+]
+
+# Binary catalog layout: magic, header length, JSON header, then (8-byte
+# aligned) the offsets table, the index id arrays and the UTF-8 text blob.
+BINARY_MAGIC = b'KWCATv1\n'
+BINARY_SUFFIX = '.bin'
+
+IndexKey = Tuple[Optional[int], Optional[int], Optional[int]]  # (language, category, tag) codes
+
+
+class ComplimentCatalog:
+    """Immutable, indexed set of compliments
+
+    Facet values are interned to small integer codes, and every combination
+    of language, category and tag (each optional) maps to an ``array`` of
+    entry ids, at four bytes per id. ``select`` is therefore O(1) for any
+    filter. Reloading builds a new catalog, which is swapped in whole.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str, Sequence[str]]],
+                 default_language: str = DEFAULT_LANGUAGE):
+        self.default_language = default_language
+        self._texts: List[str] = []
+        self._codes: Dict[str, Dict[str, int]] = {'language': {}, 'category': {}, 'tag': {}}
+        self._index: Dict[IndexKey, array] = {}
+
+        texts = self._texts
+        # The arrays an entry is appended to depend only on its facet values,
+        # so they are looked up once per distinct combination
+        facet_arrays = {}
+        tag_arrays = {}
+        for entry_id, (text, language, category, entry_tags) in enumerate(entries):
+            texts.append(text)
+            arrays = facet_arrays.get((language, category))
+            if arrays is None:
+                arrays = facet_arrays[(language, category)] = self._arrays_for(language, category, None)
+            for ids in arrays:
+                ids.append(entry_id)
+            for tag in entry_tags:
+                arrays = tag_arrays.get((language, category, tag))
+                if arrays is None:
+                    arrays = tag_arrays[(language, category, tag)] = self._arrays_for(language, category, tag)
+                for ids in arrays:
+                    ids.append(entry_id)
+
+    def _code(self, facet: str, value: str) -> int:
+        codes = self._codes[facet]
+        return codes.setdefault(value, len(codes))
+
+    def _arrays_for(self, language: str, category: str, tag: Optional[str]) -> Tuple[array, ...]:
+        """Index arrays an entry with these facet values belongs to"""
+        lang, cat = self._code('language', language), self._code('category', category)
+        if tag is None:
+            keys = ((lang, None, None), (None, cat, None), (lang, cat, None))
+        else:
+            t = self._code('tag', tag)
+            keys = ((None, None, t), (lang, None, t), (None, cat, t), (lang, cat, t))
+        return tuple(self._index.setdefault(key, array('I')) for key in keys)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def text(self, entry_id: int) -> str:
+        return self._texts[entry_id]
+
+    def select(self, language: Optional[str] = None, category: Optional[str] = None,
+               tag: Optional[str] = None) -> Sequence[int]:
+        """Ids of the entries matching every given facet"""
+        if language is None and category is None and tag is None:
+            return range(len(self))
+        key = []
+        for facet, value in (('language', language), ('category', category), ('tag', tag)):
+            if value is None:
+                key.append(None)
+                continue
+            code = self._codes[facet].get(value)
+            if code is None:
+                return ()
+            key.append(code)
+        return self._index.get(tuple(key), ())
+
+    def sample(self, rng: random.Random, language: Optional[str] = None, category: Optional[str] = None,
+               tag: Optional[str] = None) -> Optional[str]:
+        """A random matching compliment, or None if nothing matches"""
+        ids = self.select(language, category, tag)
+        if not ids:
+            return None
+        return self.text(ids[rng.randrange(len(ids))])
+
+    def resolve_language(self, language_code: Optional[str]) -> str:
+        """Best catalog language for a Telegram language code like 'pt-br'"""
+        languages = self._codes['language']
+        if language_code:
+            code = language_code.lower()
+            if code in languages:
+                return code
+            base = code.split('-')[0]
+            if base in languages:
+                return base
+        return self.default_language
+
+    def values(self, facet: str) -> List[str]:
+        """Known values of 'language', 'category' or 'tag'"""
+        return list(self._codes[facet])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'compliments': len(self),
+            'languages': len(self._codes['language']),
+            'categories': len(self._codes['category']),
+            'tags': len(self._codes['tag']),
+            'indexes': len(self._index)
+        }
+
+
+class MappedCatalog(ComplimentCatalog):
+    """A compiled catalog read straight from a memory-mapped file
+
+    Opening it only parses the small JSON header: the offsets table and the
+    index arrays are zero-copy views of the mapping, and text is decoded
+    only when an entry is picked. The pages are the OS page cache, so every
+    bot process mapping the same file shares one copy. Compile files with
+    ``write_binary_catalog``, which replaces them atomically.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a compiled compliment catalog")
+        header_len, = struct.unpack_from('<I', self._mmap, len(BINARY_MAGIC))
+        header = json.loads(self._mmap[16:16 + header_len])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was compiled on a {header['byteorder']}-endian machine")
+
+        self.default_language = header['default_language']
+        self._codes = {facet: {value: code for code, value in enumerate(header[facet])}
+                       for facet in ('language', 'category', 'tag')}
+        base = _align(16 + header_len)
+        view = memoryview(self._mmap)
+        self._count = header['entries']
+        self._offsets = view[base + header['offsets_at']:base + header['offsets_at'] + 4 * (self._count + 1)].cast('I')
+        self._blob_at = base + header['blob_at']
+        self._index = {(lang, cat, tag): view[base + at:base + at + 4 * count].cast('I')
+                       for lang, cat, tag, at, count in header['indexes']}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def text(self, entry_id: int) -> str:
+        return self._mmap[self._blob_at + self._offsets[entry_id]:
+                          self._blob_at + self._offsets[entry_id + 1]].decode('utf-8')
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(super().get_stats(), mapped_bytes=len(self._mmap))
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def write_binary_catalog(catalog: ComplimentCatalog, path: str) -> int:
+    """Compile a loaded catalog to ``path`` for MappedCatalog; returns its size
+
+    The file is written next to ``path`` and renamed over it, so processes
+    that have the previous version mapped keep reading a consistent file.
+    """
+    offsets = array('I', [0])
+    chunks = []
+    size = 0
+    for entry_id in range(len(catalog)):
+        chunk = catalog.text(entry_id).encode('utf-8')
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= 1 << 32:
+            raise ValueError("catalog text exceeds 4 GiB")
+        offsets.append(size)
+    blob = b''.join(chunks)
+    del chunks
+
+    # Section positions are relative to the end of the (aligned) header
+    sections = [offsets.tobytes()]
+    position = _align(len(sections[0]))
+    indexes = []
+    for (lang, cat, tag), ids in catalog._index.items():
+        indexes.append([lang, cat, tag, position, len(ids)])
+        sections.append(ids.tobytes())
+        position = _align(position + len(sections[-1]))
+    blob_at = position
+
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'entries': len(catalog),
+        'default_language': catalog.default_language,
+        'language': catalog.values('language'),
+        'category': catalog.values('category'),
+        'tag': catalog.values('tag'),
+        'offsets_at': 0,
+        'blob_at': blob_at,
+        'indexes': indexes
+    }).encode('utf-8')
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(BINARY_MAGIC + struct.pack('<I', len(header)) + bytes(4) + header)
+        f.write(bytes(_align(16 + len(header)) - 16 - len(header)))
+        for section in sections:
+            f.write(section)
+            f.write(bytes(_align(len(section)) - len(section)))
+        f.write(blob)
+        total = f.tell()
+    os.replace(tmp_path, path)
+    return total
+
+
+def iter_entries(items: Iterable[Any], default_language: str = DEFAULT_LANGUAGE,
+                 default_category: str = DEFAULT_CATEGORY) -> Iterator[Tuple[str, str, str, Sequence[str]]]:
+    """Catalog entries from parsed items: strings, or objects with ``text``
+    and optional ``language``, ``category`` and ``tags``"""
+    skipped = 0
+    for item in items:
+        if isinstance(item, str):
+            if item:
+                yield item, default_language, default_category, ()
+                continue
+        elif isinstance(item, dict) and isinstance(item.get('text'), str) and item['text']:
+            yield (item['text'], item.get('language', default_language), item.get('category', default_category),
+                   tuple(item.get('tags', ())))
+            continue
+        skipped += 1
+    if skipped:
+        logger.warning(f"Skipped {skipped} compliments without text")
+
+
+def load_catalog(path: str) -> ComplimentCatalog:
+    """Read and index a catalog file; raises on unreadable or invalid files
+
+    ``.json`` files hold the original flat list of strings, or an object with
+    optional ``language``/``category`` defaults and a ``compliments`` list.
+    ``.jsonl`` files hold one entry per line; they are parsed a line at a
+    time, so loading a large one in a worker thread never holds the GIL for
+    long (a single ``json.load`` of a big file does). ``.bin`` files are
+    compiled catalogs, which are mapped rather than read.
+    """
+    if path.endswith(BINARY_SUFFIX):
+        catalog = MappedCatalog(path)
+        if not len(catalog):
+            raise ValueError("catalog has no compliments")
+        return catalog
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            catalog = ComplimentCatalog(iter_entries(json.loads(line) for line in f if line.strip()))
+        else:
+            raw = json.load(f)
+            if isinstance(raw, list):
+                catalog = ComplimentCatalog(iter_entries(raw))
+            elif isinstance(raw, dict) and isinstance(raw.get('compliments'), list):
+                language = raw.get('language', DEFAULT_LANGUAGE)
+                catalog = ComplimentCatalog(
+                    iter_entries(raw['compliments'], language, raw.get('category', DEFAULT_CATEGORY)), language
+                )
+            else:
+                raise ValueError("expected a list of compliments or an object with a 'compliments' list")
+    if not len(catalog):
+        raise ValueError("catalog has no compliments")
+    return catalog
+
+
+def fallback_catalog() -> ComplimentCatalog:
+    return ComplimentCatalog((text, DEFAULT_LANGUAGE, DEFAULT_CATEGORY, ()) for text in FALLBACK_COMPLIMENTS)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
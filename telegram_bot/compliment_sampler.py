@@ -0,0 +1,165 @@
+"""
+Per-user compliment rotation for KindWords Telegram Bot
+Walks each user through the compliment catalog in their own shuffled order,
+so nobody sees a repeat until they have seen everything. A user keeps one
+rotation per candidate set they draw from (say, their language versus the
+whole catalog), so alternating between sets doesn't restart either one.
+Each rotation is a few integers (set checksum, shuffle seed, position, set
+size), kept in SQLite with a bounded in-memory cache in front.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from analytics_db import apply_pragmas
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(x: int) -> int:
+    """splitmix64 finalizer: a fast, well-spread 64-bit hash"""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def permute(index: int, size: int, seed: int) -> int:
+    """Position ``index`` of a seeded shuffle of ``range(size)``
+
+    A four-round Feistel network over the smallest even-bit domain covering
+    ``size`` is a bijection; values that land outside ``range(size)`` are
+    fed back through until one lands inside (cycle walking), which keeps it a
+    bijection on ``range(size)``. No shuffled list is ever built.
+    """
+    if size <= 1:
+        return 0
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    x = index
+    while True:
+        left, right = x >> half_bits, x & mask
+        for round_key in range(4):
+            left, right = right, left ^ (_mix((right + seed + round_key * 0x9E3779B97F4A7C15) & _MASK64) & mask)
+        x = (left << half_bits) | right
+        if x < size:
+            return x
+
+
+def fingerprint(ids: Sequence[int]) -> int:
+    """Checksum of a candidate set, so a rotation restarts when the set's contents change"""
+    if isinstance(ids, range):
+        return zlib.crc32(f"{ids.start}:{ids.stop}:{ids.step}".encode())
+    return zlib.crc32(ids)
+
+
+class ComplimentSampler:
+    """Non-repeating per-user draws from named candidate sets
+
+    ``next_index`` hands out every index of a set once, in a per-user
+    shuffled order, then starts a new shuffle (never opening with the item
+    that closed the previous one). Each (user, set name) pair has its own
+    rotation; when the set's size or fingerprint changes, that rotation
+    starts over on the new set. Draws run on a worker thread and each one
+    is persisted before it is returned.
+    """
+
+    def __init__(self, db_path: str = "telegram_bot/data/compliment_history.db", cache_size: int = 10000,
+                 rng: Optional[random.Random] = None):
+        self.db_path = db_path
+        self.rng = rng or random.Random()
+        self._cache = LRUCache(max_size=cache_size)  # (user_id, pool) -> (fingerprint, seed, cursor, size)
+        self._lock = threading.Lock()
+
+        self.draws = 0
+        self.cycles = 0
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        apply_pragmas(self._conn)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS compliment_history (
+                    user_id INTEGER NOT NULL,
+                    pool TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    seed INTEGER NOT NULL,
+                    cursor INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, pool)
+                ) WITHOUT ROWID
+            ''')
+
+    async def _run(self, fn, *args):
+        """Run a blocking database call on the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _load(self, user_id: int, pool: str) -> Optional[Tuple[int, int, int, int]]:
+        state = self._cache.get((user_id, pool))
+        if state is None:
+            row = self._conn.execute(
+                "SELECT fingerprint, seed, cursor, size FROM compliment_history WHERE user_id = ? AND pool = ?",
+                (user_id, pool)
+            ).fetchone()
+            state = tuple(row) if row else None
+        return state
+
+    def _new_seed(self, size: int, avoid: Optional[int]) -> int:
+        """A seed whose shuffle doesn't start with ``avoid``"""
+        for _ in range(8):
+            seed = self.rng.getrandbits(63)
+            if avoid is None or size < 2 or permute(0, size, seed) != avoid:
+                return seed
+        return seed  # Vanishingly unlikely with size >= 2
+
+    def _next(self, user_id: int, pool: str, size: int, set_fingerprint: int) -> int:
+        with self._lock:
+            state = self._load(user_id, pool)
+            if state is None or state[0] != set_fingerprint or state[3] != size:
+                seed, cursor = self._new_seed(size, None), 0
+            else:
+                _, seed, cursor, _ = state
+                if cursor >= size:
+                    # Rotation finished; reshuffle without repeating the last item
+                    seed, cursor = self._new_seed(size, permute(size - 1, size, seed)), 0
+                    self.cycles += 1
+
+            index = permute(cursor, size, seed)
+            state = (set_fingerprint, seed, cursor + 1, size)
+            with self._conn:
+                self._conn.execute('''
+                    INSERT INTO compliment_history (user_id, pool, fingerprint, seed, cursor, size)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id, pool) DO UPDATE SET
+                        fingerprint = excluded.fingerprint, seed = excluded.seed,
+                        cursor = excluded.cursor, size = excluded.size
+                ''', (user_id, pool, *state))
+            self._cache.set((user_id, pool), state)
+            self.draws += 1
+        return index
+
+    async def next_index(self, user_id: int, pool: str, size: int, set_fingerprint: int = 0) -> int:
+        """The next index into candidate set ``pool`` (``size`` items) for this user"""
+        return await self._run(self._next, user_id, pool, size, set_fingerprint)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get draw counters and cache hit rates for monitoring"""
+        return {
+            'draws': self.draws,
+            'cycles_completed': self.cycles,
+            'cache': self._cache.get_stats()
+        }
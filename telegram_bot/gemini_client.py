@@ -0,0 +1,304 @@
+"""
+Async Gemini client for KindWords Telegram Bot
+Pooled keep-alive HTTP connections, a cap on in-flight requests, jittered
+retries and a per-call deadline that every wait and attempt is bounded by
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com/v1beta'
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+MOOD_PROMPTS = {
+    'uplift': 'uplifting and encouraging, reminding them how much they brighten the lives of others',
+    'congrats': 'congratulating them warmly on a recent achievement',
+    'thanks': 'thanking them sincerely for their friendship and support',
+    'motivation': 'motivating them to keep going and believe in themselves',
+    'support': 'gently supportive for someone going through a hard time',
+    'celebration': 'joyful and festive, celebrating them and the good times'
+}
+
+
+class GenerationError(Exception):
+    """Generation failed or could not finish before its deadline"""
+
+
+def build_prompt(friend_name: str, mood_theme: str) -> str:
+    """Prompt for one kind message to a friend"""
+    tone = MOOD_PROMPTS.get(mood_theme, MOOD_PROMPTS['uplift'])
+    return (
+        f"Write a short, heartfelt message (2-3 sentences) to a friend named {friend_name}. "
+        f"The message should be {tone}. Address {friend_name} by name, end with one fitting "
+        f"emoji, and reply with the message text only."
+    )
+
+
+class GeminiClient:
+    """generateContent client with pooling, concurrency limits and deadlines
+
+    ``generate`` takes a ``timeout`` for the whole call. Waiting for a
+    concurrency slot, each attempt and each backoff sleep are all cut short
+    so the call never outlives it; callers fall back when it raises
+    ``GenerationError``. Background calls (``background=True``) only take a
+    slot that is free while no user request is waiting for one, so
+    prefetching never queues ahead of a user.
+    """
+
+    def __init__(self, api_key: str, model: str = 'gemini-1.5-flash', base_url: str = DEFAULT_BASE_URL,
+                 request_timeout: float = 10.0, max_concurrent: int = 8, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_max: float = 2.0):
+        self.model = model
+        self.request_timeout = request_timeout
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers={'x-goog-api-key': api_key},
+            timeout=httpx.Timeout(request_timeout, connect=min(request_timeout, 5.0)),
+            # One pooled keep-alive connection per concurrency slot
+            limits=httpx.Limits(max_connections=max_concurrent,
+                                max_keepalive_connections=max_concurrent)
+        )
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0                    # Foreground calls waiting for a slot
+        self._slot_freed = asyncio.Event()
+
+        self.background_requests = 0
+        self.background_yielded = 0          # Background calls that found no idle slot in time
+
+        self.requests = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.in_flight = 0
+        self._latency_total = 0.0
+
+    async def generate(self, prompt: str, timeout: float, background: bool = False) -> str:
+        """Generate text for a prompt, raising GenerationError on failure"""
+        deadline = time.monotonic() + timeout
+        if background:
+            await self._acquire_idle(deadline)
+        else:
+            await self._acquire(deadline)
+        start = time.monotonic()
+        try:
+            attempt = 0
+            while True:
+                remaining = self._remaining(deadline)
+                attempt_timeout = min(remaining, self.request_timeout)
+                try:
+                    # httpx timeouts apply per phase; wait_for bounds the whole attempt
+                    text = await asyncio.wait_for(self._request(prompt, attempt_timeout), attempt_timeout)
+                    break
+                except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                    error, retry_after = self._classify(e)
+                await self._backoff(error, retry_after, attempt, deadline)
+                attempt += 1
+            self._record_success(start)
+            return text
+        except GenerationError:
+            self.failed += 1
+            raise
+        finally:
+            self._release()
+
+    async def stream(self, prompt: str, timeout: float) -> AsyncIterator[str]:
+        """Yield text chunks as they are generated
+
+        Failures before the first chunk are retried like ``generate``; once
+        text has been yielded a failure raises GenerationError, since the
+        caller has already shown part of the message.
+        """
+        deadline = time.monotonic() + timeout
+        await self._acquire(deadline)
+        start = time.monotonic()
+        try:
+            attempt = 0
+            while True:
+                self._remaining(deadline)
+                emitted = False
+                try:
+                    # Closed here, not by the loop's finalizer, so the HTTP
+                    # response is gone before the slot is released
+                    async with aclosing(self._stream_request(prompt, deadline)) as chunks:
+                        async for chunk in chunks:
+                            emitted = True
+                            yield chunk
+                    if not emitted:
+                        raise GenerationError("empty response")
+                    self._record_success(start)
+                    return
+                except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                    error, retry_after = self._classify(e)
+                    if emitted:
+                        raise GenerationError(f"stream interrupted: {error}")
+                await self._backoff(error, retry_after, attempt, deadline)
+                attempt += 1
+        except GenerationError:
+            self.failed += 1
+            raise
+        finally:
+            self._release()
+
+    async def _acquire(self, deadline: float):
+        """Take a concurrency slot, waiting no later than the deadline"""
+        self.requests += 1
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.failed += 1
+            self.deadline_exceeded += 1
+            raise GenerationError("no free generation slot before the deadline")
+        finally:
+            self._waiting -= 1
+        self.in_flight += 1
+
+    async def _acquire_idle(self, deadline: float):
+        """Take a slot for background work once one is free and no user request wants it"""
+        try:
+            while self._waiting or self._slots.locked():
+                self._slot_freed.clear()
+                await asyncio.wait_for(self._slot_freed.wait(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.background_yielded += 1
+            raise GenerationError("no idle generation slot for background work")
+        await self._slots.acquire()          # Free and uncontended, so this doesn't wait
+        self.requests += 1
+        self.background_requests += 1
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._slots.release()
+        self._slot_freed.set()
+
+    def _record_success(self, start: float):
+        self.succeeded += 1
+        self._latency_total += time.monotonic() - start
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.deadline_exceeded += 1
+            raise GenerationError("deadline exceeded")
+        return remaining
+
+    @classmethod
+    def _classify(cls, e: Exception) -> Tuple[str, Optional[float]]:
+        """Describe a retryable failure, or raise GenerationError if it is not"""
+        if isinstance(e, (httpx.TimeoutException, asyncio.TimeoutError)):
+            return f"timed out ({type(e).__name__})", None
+        if isinstance(e, httpx.HTTPStatusError):
+            status = e.response.status_code
+            if status not in RETRY_STATUSES:
+                raise GenerationError(f"HTTP {status}")
+            return f"HTTP {status}", cls._retry_after(e.response)
+        return f"transport error: {e}", None
+
+    async def _backoff(self, error: str, retry_after: Optional[float], attempt: int, deadline: float):
+        """Sleep before the next attempt, or raise if out of retries or time"""
+        if attempt >= self.max_retries:
+            raise GenerationError(f"{error} after {attempt + 1} attempts")
+
+        # Full jitter spreads retries from concurrent callers apart
+        delay = retry_after if retry_after is not None else \
+            random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            self.deadline_exceeded += 1
+            raise GenerationError(f"{error}; no time left to retry")
+        logger.warning(f"Gemini request failed ({error}), retrying in {delay:.2f}s")
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    async def _request(self, prompt: str, timeout: float) -> str:
+        response = await self._client.post(
+            f'/models/{self.model}:generateContent',
+            json={'contents': [{'parts': [{'text': prompt}]}]},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        try:
+            text = self._text(response.json()).strip()
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise GenerationError(f"unexpected response: {e}")
+        if not text:
+            raise GenerationError("empty response")
+        return text
+
+    async def _stream_request(self, prompt: str, deadline: float) -> AsyncIterator[str]:
+        """One streamGenerateContent attempt, read as server-sent events"""
+        attempt_timeout = min(self._remaining(deadline), self.request_timeout)
+        async with self._client.stream(
+            'POST',
+            f'/models/{self.model}:streamGenerateContent',
+            params={'alt': 'sse'},
+            json={'contents': [{'parts': [{'text': prompt}]}]},
+            timeout=attempt_timeout
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+
+            lines = response.aiter_lines()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    line = await asyncio.wait_for(lines.__anext__(), min(remaining, self.request_timeout))
+                except StopAsyncIteration:
+                    return
+                if not line.startswith('data:'):
+                    continue
+                try:
+                    text = self._text(json.loads(line[5:]))
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    raise GenerationError(f"unexpected stream event: {e}")
+                if text:
+                    yield text
+
+    @staticmethod
+    def _text(payload: Dict[str, Any]) -> str:
+        parts = payload['candidates'][0]['content']['parts']
+        return ''.join(part.get('text', '') for part in parts)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return max(0.0, float(response.headers['retry-after']))
+        except (KeyError, ValueError):
+            return None
+
+    async def close(self):
+        """Close pooled connections"""
+        await self._client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request and latency metrics for monitoring"""
+        return {
+            'requests': self.requests,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'retries': self.retries,
+            'deadline_exceeded': self.deadline_exceeded,
+            'in_flight': self.in_flight,
+            'max_concurrent': self.max_concurrent,
+            'background_requests': self.background_requests,
+            'background_yielded': self.background_yielded,
+            'latency_ms_avg': round(self._latency_total / self.succeeded * 1000, 1) if self.succeeded else 0.0
+        }
@@ -0,0 +1,262 @@
+"""
+Generation cache for KindWords Telegram Bot
+Keeps a small pool of AI-generated variants per (mood, recipient name) in an
+LRU/TTL memory tier backed by SQLite, and shares one upstream call between
+concurrent identical requests
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from analytics_db import apply_pragmas
+from cache import LRUCache
+from message_templates import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+GenerateFn = Callable[[str, str], Awaitable[str]]
+
+
+def normalize_name(name: str) -> str:
+    """Cache key form of a recipient name: case-folded, single-spaced"""
+    return ' '.join(name.split()).casefold()
+
+
+def templatize(text: str, name: str) -> CompiledTemplate:
+    """Split generated text around the recipient's name so it can be re-rendered
+    for the same name written differently ("alex" vs "Alex")"""
+    name = name.strip()
+    if not name:
+        return CompiledTemplate((text,))
+    # Whole-name matches only, so "Sam" does not split "same"
+    pattern = r'(?<!\w)' + re.escape(name) + r'(?!\w)'
+    return CompiledTemplate(tuple(re.split(pattern, text, flags=re.IGNORECASE)))
+
+
+class VariantPool:
+    """Generated variants for one key, handed out in rotation"""
+
+    __slots__ = ('variants', 'cursor', 'created_at')
+
+    def __init__(self, variants: Optional[List[CompiledTemplate]] = None, created_at: Optional[float] = None):
+        self.variants = variants or []
+        self.cursor = 0
+        self.created_at = time.time() if created_at is None else created_at  # Of the oldest variant
+
+    def next(self) -> CompiledTemplate:
+        variant = self.variants[self.cursor % len(self.variants)]
+        self.cursor += 1
+        return variant
+
+
+class GenerationCache:
+    """Cache of generated messages with a memory and an optional disk tier
+
+    ``get`` returns a cached variant when one exists. With ``fresh=True``
+    (used by "Generate Another") it generates a new variant instead until
+    the key holds ``variants`` of them, then rotates through the pool.
+    Only successful generations are cached; errors from ``generate``
+    propagate to the caller.
+    """
+
+    def __init__(self, max_keys: int = 10000, variants: int = 5, ttl: float = 86400,
+                 db_path: Optional[str] = None):
+        self.variants = max(1, variants)
+        self.ttl = ttl
+        self.db_path = db_path
+        self.memory = LRUCache(max_size=max_keys, ttl=ttl)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.generated = 0
+
+        self._conn = None
+        self._lock = threading.Lock()
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            apply_pragmas(self._conn)
+            with self._conn:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS generation_variants (
+                        mood TEXT NOT NULL,
+                        name_key TEXT NOT NULL,
+                        variant INTEGER NOT NULL,
+                        parts TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        PRIMARY KEY (mood, name_key, variant)
+                    )
+                ''')
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_generation_variants_created ON generation_variants (created_at)"
+                )
+            removed = self._prune()
+            if removed:
+                logger.info(f"Pruned {removed} expired cached generations")
+
+    async def _run(self, fn, *args):
+        """Run a blocking database call on the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _load(self, key: Tuple[str, str]) -> Optional[VariantPool]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT parts, created_at FROM generation_variants "
+                "WHERE mood = ? AND name_key = ? AND created_at > ? ORDER BY variant LIMIT ?",
+                (key[0], key[1], time.time() - self.ttl, self.variants)
+            ).fetchall()
+        if not rows:
+            return None
+        return VariantPool([CompiledTemplate(tuple(json.loads(row[0]))) for row in rows],
+                           created_at=min(row[1] for row in rows))
+
+    def _store(self, key: Tuple[str, str], variant: CompiledTemplate):
+        """Save a variant in the lowest slot not held by a live row"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM generation_variants WHERE mood = ? AND name_key = ? AND created_at <= ?",
+                (key[0], key[1], time.time() - self.ttl)
+            )
+            used = {row[0] for row in self._conn.execute(
+                "SELECT variant FROM generation_variants WHERE mood = ? AND name_key = ?", key)}
+            index = next(slot for slot in range(len(used) + 1) if slot not in used)
+            self._conn.execute(
+                "INSERT INTO generation_variants (mood, name_key, variant, parts, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], index, json.dumps(variant.parts, ensure_ascii=False), time.time())
+            )
+
+    def _prune(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM generation_variants WHERE created_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    async def get(self, name: str, mood: str, generate: GenerateFn, fresh: bool = False) -> str:
+        """Return a message for ``name`` in ``mood``, generating on a miss"""
+        message = await self.lookup(name, mood, fresh=fresh)
+        if message is not None:
+            return message
+        variant = await self._generate_once((mood, normalize_name(name)), name, mood, generate)
+        return variant.render(name)
+
+    async def lookup(self, name: str, mood: str, fresh: bool = False) -> Optional[str]:
+        """Return a cached message, or None when ``get`` would generate one"""
+        key = (mood, normalize_name(name))
+        self.lookups += 1
+
+        pool = self._memory_pool(key)
+        if pool is not None:
+            hit = 'memory'
+        elif self._conn is not None:
+            try:
+                pool = await self._run(self._load, key)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading generation cache: {e}")
+            if pool is not None:
+                self.memory.set(key, pool)
+                hit = 'disk'
+
+        if pool is not None and not (fresh and len(pool.variants) < self.variants):
+            if hit == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            return pool.next().render(name)
+        return None
+
+    def _memory_pool(self, key: Tuple[str, str]) -> Optional[VariantPool]:
+        """The memory tier's pool for a key, unless its oldest variant has expired
+
+        A pool loaded from disk can be nearly as old as the TTL already, so
+        age is judged by the variants' creation time, not the cache entry's.
+        """
+        pool = self.memory.get(key)
+        if pool is not None and time.time() - pool.created_at >= self.ttl:
+            self.memory.invalidate(key)
+            return None
+        return pool
+
+    async def _generate_once(self, key: Tuple[str, str], name: str, mood: str,
+                             generate: GenerateFn) -> CompiledTemplate:
+        """Single-flight: concurrent callers for a key share one generation"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._generate_and_store(key, name, mood, generate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._generation_done(key, t))
+        # Shielded so one caller giving up does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _generation_done(self, key: Tuple[str, str], task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every waiter was cancelled
+
+    async def _generate_and_store(self, key: Tuple[str, str], name: str, mood: str,
+                                  generate: GenerateFn) -> CompiledTemplate:
+        text = await generate(name, mood)
+        variant = templatize(text, name)
+        self.generated += 1
+
+        pool = self._memory_pool(key)
+        if pool is None:
+            pool = VariantPool()
+            self.memory.set(key, pool)
+        if len(pool.variants) >= self.variants:
+            return variant
+
+        pool.variants.append(variant)
+        pool.cursor = len(pool.variants)  # The new variant is the one being shown
+        if self._conn is not None:
+            try:
+                await self._run(self._store, key, variant)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing generation cache: {e}")
+        return variant
+
+    async def prune(self) -> int:
+        """Drop expired variants from the disk tier"""
+        if self._conn is None:
+            return 0
+        return await self._run(self._prune)
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and size metrics for monitoring"""
+        hits = self.memory_hits + self.disk_hits
+        return {
+            'keys': len(self.memory),
+            'max_keys': self.memory.max_size,
+            'variants_per_key': self.variants,
+            'lookups': self.lookups,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / self.lookups, 4) if self.lookups else 0.0,
+            'coalesced': self.coalesced,
+            'generated': self.generated,
+            'in_flight': len(self._inflight),
+            'evictions': self.memory.evictions
+        }
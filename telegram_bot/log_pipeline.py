@@ -0,0 +1,207 @@
+"""
+Logging pipeline for KindWords Telegram Bot
+Handlers on the event loop only put records on a bounded queue; a listener
+thread formats them and writes JSON lines to a rotating file (and plain text
+to the console). High-volume INFO messages are rate limited per message
+template, and every record carries the update it was logged for.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Set while an update is being handled; copied into every record logged for it
+update_context: contextvars.ContextVar = contextvars.ContextVar('update_context', default=None)
+
+# Record attributes that aren't custom ``extra`` fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+CONTEXT_FIELDS = ('update_id', 'user_id', 'handler')
+
+
+class ContextFilter(logging.Filter):
+    """Adds update_id, user_id and handler from the current update, if any"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = update_context.get()
+        if context:
+            for field in CONTEXT_FIELDS:
+                if not hasattr(record, field):
+                    setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Rate limits INFO and lower records per message template
+
+    Each ``(logger, msg)`` pair gets a token bucket of ``rate`` records per
+    second (burst ``burst``). Records over the limit are dropped before
+    they are formatted or queued; the next one let through reports how many
+    were skipped in ``sampled_out``. Warnings and errors always pass. Log
+    with %-style arguments so one template means one bucket.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float = 20.0, max_keys: int = 1000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[tuple, list] = {}  # key -> [tokens, updated, dropped]
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.rate <= 0:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()  # f-string messages make endless keys; start over
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.dropped += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.sampled_out = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with context and any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that sheds INFO records when the queue is full
+
+    Warnings and errors wait up to ``block_timeout`` for room instead, so
+    they are only lost if the writer thread is stuck. Unlike the stock
+    handler it leaves message formatting to the listener thread; only
+    exception tracebacks are rendered up front, while the frames still exist.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block_timeout: float = 1.0):
+        super().__init__(log_queue)
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop waits for room in a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """The installed queue handler, sampling filter and listener thread"""
+
+    def __init__(self, handler: BoundedQueueHandler, sampler: SamplingFilter,
+                 listener: DrainingQueueListener):
+        self.handler = handler
+        self.sampler = sampler
+        self.listener = listener
+        self._stopped = False
+
+    def stop(self):
+        """Write out everything still queued and stop the listener thread"""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and sampling counters for monitoring"""
+        return {
+            'queued': self.handler.queue.qsize(),
+            'enqueued': self.handler.enqueued,
+            'dropped_queue_full': self.handler.dropped,
+            'sampled_out': self.sampler.dropped
+        }
+
+
+def setup_logging(log_file: str, level: int = logging.INFO, max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, rotate_when: Optional[str] = None, sample_rate: float = 10.0,
+                  sample_burst: float = 20.0, queue_size: int = 10000, console: bool = True) -> LogPipeline:
+    """Route all logging through a queue to a rotating JSON file and the console
+
+    Files rotate at ``max_bytes``, or on the ``rotate_when`` schedule (e.g.
+    'midnight') when given. Returns the pipeline; call ``stop()`` on exit.
+    """
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8'
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    file_handler.setFormatter(JSONFormatter())
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
+
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    sampler = SamplingFilter(sample_rate, sample_burst)
+    queue_handler.addFilter(sampler)
+    queue_handler.addFilter(ContextFilter())
+    listener = DrainingQueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    return LogPipeline(queue_handler, sampler, listener)
@@ -3,18 +3,20 @@
 KindWords Telegram Bot
 A bot that generates AI-powered kind messages and compliments
 """
-from keep_alive import keep_alive
-keep_alive()
-
 import os
+import atexit
 import logging
 import asyncio
+import signal
 import sqlite3
-import csv
 import json
+import random
+from contextlib import aclosing
+from functools import partial
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NamedTuple, Callable, Awaitable, Sequence, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -25,23 +27,143 @@ from telegram.ext import (
 )
 from dotenv import load_dotenv
 
+import analytics_rollups
+from analytics_db import SQLiteConnectionManager
+from analytics_migrations import apply_migrations
+from analytics_writer import BackgroundBatchWriter
+from broadcast import DailyBroadcaster, SubscriptionStore
+from cache import LRUCache
+from compliment_catalog import ComplimentCatalog, fallback_catalog, file_signature, load_catalog
+from compliment_sampler import ComplimentSampler, fingerprint
+from event_log import SegmentedEventLog
+from gemini_client import DEFAULT_BASE_URL, GeminiClient, GenerationError, build_prompt
+from generation_cache import GenerationCache
+from log_pipeline import setup_logging
+from message_pool import MessagePool
+from message_templates import TemplateRegistry
+from rate_limiter import PRIORITY_BULK, PriorityRateLimiter
+from session_store import Session, create_session_backend
+from stream_editor import ThrottledEditor
+from update_processor import PerUserUpdateProcessor
+from webhook_server import WebhookServer
+
 # Load environment variables
 load_dotenv()
 
+# Logging configuration (records are queued and written by a background thread)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FILE = os.getenv('LOG_FILE', 'telegram_bot/logs/bot.log')  # One JSON object per line
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # Size-based rotation
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')  # e.g. 'midnight' to rotate by time instead of size
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Records dropped (and counted) beyond this
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '10'))  # INFO records per second per message, 0 keeps all
+LOG_SAMPLE_BURST = float(os.getenv('LOG_SAMPLE_BURST', '20'))
+
 # Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('telegram_bot/logs/bot.log'),
-        logging.StreamHandler()
-    ]
+logging_pipeline = setup_logging(
+    LOG_FILE,
+    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    rotate_when=LOG_ROTATE_WHEN,
+    sample_rate=LOG_SAMPLE_RATE,
+    sample_burst=LOG_SAMPLE_BURST,
+    queue_size=LOG_QUEUE_SIZE
 )
+atexit.register(logging_pipeline.stop)
 logger = logging.getLogger(__name__)
 
 # Bot configuration
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL')  # Point at a local fake Bot API for testing
+
+# Update ingress configuration
+BOT_MODE = os.getenv('BOT_MODE', 'polling')  # 'polling' or 'webhook'
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+HTTP_HOST = os.getenv('HTTP_HOST', '0.0.0.0')
+HTTP_PORT = int(os.getenv('PORT', '8080'))  # Serves /health in both modes
+
+# Gemini generation configuration
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', DEFAULT_BASE_URL)  # Point at tools/fake_gemini_api.py for testing
+GEMINI_DEADLINE = float(os.getenv('GEMINI_DEADLINE', '8.0'))  # Seconds before falling back to templates
+GEMINI_REQUEST_TIMEOUT = float(os.getenv('GEMINI_REQUEST_TIMEOUT', '5.0'))  # Per attempt
+GEMINI_MAX_CONCURRENT = int(os.getenv('GEMINI_MAX_CONCURRENT', '8'))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '2'))
+
+# Streaming configuration (only used with Gemini)
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'false').lower() in ('1', 'true', 'yes')  # Show text as it is generated
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))  # Min seconds between progressive edits
+
+# Generation cache configuration (only used with Gemini)
+GENERATION_CACHE_SIZE = int(os.getenv('GENERATION_CACHE_SIZE', '10000'))  # (mood, name) keys in memory, 0 disables
+GENERATION_CACHE_VARIANTS = int(os.getenv('GENERATION_CACHE_VARIANTS', '5'))  # Variants "Generate Another" rotates through
+GENERATION_CACHE_TTL = float(os.getenv('GENERATION_CACHE_TTL', '86400'))
+GENERATION_CACHE_DB = os.getenv('GENERATION_CACHE_DB', 'telegram_bot/data/generation_cache.db')  # Empty for memory only
+
+# Pre-generated message pool configuration (only used with Gemini)
+MESSAGE_POOL_SIZE = int(os.getenv('MESSAGE_POOL_SIZE', '20'))  # Ready messages per mood, 0 disables
+MESSAGE_POOL_REFILL_INTERVAL = float(os.getenv('MESSAGE_POOL_REFILL_INTERVAL', '30'))
+MESSAGE_POOL_REFILL_BATCH = int(os.getenv('MESSAGE_POOL_REFILL_BATCH', '5'))  # Per mood per refill
+MESSAGE_POOL_MAX_AGE = float(os.getenv('MESSAGE_POOL_MAX_AGE', '3600'))  # Seconds before a pooled message is discarded
+MESSAGE_POOL_MAX_IN_FLIGHT = int(os.getenv('MESSAGE_POOL_MAX_IN_FLIGHT', '2'))  # Refill calls at once, only in idle Gemini slots
+
+# Message template configuration
+TEMPLATES_FILE = os.getenv('TEMPLATES_FILE', 'telegram_bot/message_templates.json')
+
+# Update processing configuration
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '16'))  # Updates from one user still run in order
+
+# Outbound rate limits (kept a little under Telegram's published limits)
+RATE_LIMIT_GLOBAL = float(os.getenv('RATE_LIMIT_GLOBAL', '25'))  # Requests per second across all chats
+RATE_LIMIT_PER_CHAT = float(os.getenv('RATE_LIMIT_PER_CHAT', '1.0'))  # Messages per second per private chat
+RATE_LIMIT_CHAT_BURST = int(os.getenv('RATE_LIMIT_CHAT_BURST', '3'))
+RATE_LIMIT_GROUP_PER_MINUTE = int(os.getenv('RATE_LIMIT_GROUP_PER_MINUTE', '20'))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))  # Retries after a 429 retry_after
+
+# Analytics writer configuration
+ANALYTICS_FLUSH_SIZE = int(os.getenv('ANALYTICS_FLUSH_SIZE', '100'))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', '1.0'))
+ANALYTICS_QUEUE_SIZE = int(os.getenv('ANALYTICS_QUEUE_SIZE', '10000'))
+ANALYTICS_QUEUE_OVERFLOW = os.getenv('ANALYTICS_QUEUE_OVERFLOW', 'drop')  # 'drop', or 'block' (stalls the event loop)
+
+# Raw event log (append-only JSON lines segments alongside the database)
+EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', 'telegram_bot/data/events')  # Empty disables the raw trail
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv('EVENT_LOG_SEGMENT_BYTES', str(64 * 1024 * 1024)))  # Rotate at this size...
+EVENT_LOG_SEGMENT_SECONDS = float(os.getenv('EVENT_LOG_SEGMENT_SECONDS', '86400'))  # ...or this age
+EVENT_LOG_COMPRESS = os.getenv('EVENT_LOG_COMPRESS', 'true').lower() in ('1', 'true', 'yes')  # Gzip closed segments
+
+# /stats cache configuration
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '5.0'))  # Seconds community stats are reused
+USER_STATS_CACHE_SIZE = int(os.getenv('USER_STATS_CACHE_SIZE', '10000'))
+
+# /create session configuration
+SESSION_IDLE_TTL = float(os.getenv('SESSION_IDLE_TTL', '1800'))  # Seconds of inactivity before a session expires
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '100000'))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')  # 'memory', 'sqlite' or 'kv'
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'telegram_bot/data/sessions.db')
+SESSION_LOCAL_TTL = float(os.getenv('SESSION_LOCAL_TTL', '30'))  # 0 disables the local read-through cache
+
+# Compliment catalog
+COMPLIMENTS_FILE = os.getenv('COMPLIMENTS_FILE', 'telegram_bot/compliments.json')
+COMPLIMENTS_RELOAD_INTERVAL = float(os.getenv('COMPLIMENTS_RELOAD_INTERVAL', '30'))  # Seconds between change checks, 0 disables
+
+# Per-user compliment rotation (no repeats until the whole catalog has been seen)
+COMPLIMENT_HISTORY_DB = os.getenv('COMPLIMENT_HISTORY_DB', 'telegram_bot/data/compliment_history.db')
+COMPLIMENT_HISTORY_CACHE_SIZE = int(os.getenv('COMPLIMENT_HISTORY_CACHE_SIZE', '10000'))  # Users kept in memory
+
+# Daily compliment subscriptions (hours are in the server's local time)
+SUBSCRIPTIONS_DB_PATH = os.getenv('SUBSCRIPTIONS_DB_PATH', 'telegram_bot/data/subscriptions.db')
+BROADCAST_CHECK_INTERVAL = float(os.getenv('BROADCAST_CHECK_INTERVAL', '60'))  # Seconds between due checks
+BROADCAST_BATCH_SIZE = int(os.getenv('BROADCAST_BATCH_SIZE', '500'))  # Subscribers claimed per batch
+BROADCAST_CATCHUP_HOURS = int(os.getenv('BROADCAST_CATCHUP_HOURS', '3'))  # Missed hours still delivered after downtime
+BROADCAST_MAX_IN_FLIGHT = int(os.getenv('BROADCAST_MAX_IN_FLIGHT', '32'))  # Concurrent daily sends
+DEFAULT_SUBSCRIPTION_HOUR = int(os.getenv('DEFAULT_SUBSCRIPTION_HOUR', '9'))
 
 # Mood themes available for message generation
 MOOD_THEMES = {
@@ -53,262 +175,467 @@ MOOD_THEMES = {
     'celebration': {'emoji': '🎊', 'name': 'Celebration'}
 }
 
+def italic_markdown(text: str) -> str:
+    """Text in italics for parse_mode='Markdown'
+
+    Legacy Markdown can't escape inside an entity (other markup characters
+    are literal there), so the italics are closed around each underscore,
+    which is escaped outside them.
+    """
+    return '\\_'.join(f"_{part}_" if part else '' for part in text.split('_'))
+
+class InteractionEvent(NamedTuple):
+    """A single user interaction waiting to be written"""
+    timestamp: datetime
+    user_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    action: str
+    recipient_name: Optional[str]
+    mood_choice: Optional[str]
+    message_generated: bool
+    session_data: Optional[str]
+
 class AnalyticsLogger:
-    """Handles logging user interactions to CSV and SQLite database"""
+    """Handles logging user interactions to SQLite and the raw event log"""
     
     def __init__(self, db_path: str = "telegram_bot/data/analytics.db", 
-                 csv_path: str = "telegram_bot/data/user_interactions.csv"):
+                 event_log_dir: Optional[str] = "telegram_bot/data/events",
+                 segment_bytes: int = 64 * 1024 * 1024, segment_age: float = 86400,
+                 compress_segments: bool = True, flush_size: int = 100, flush_interval: float = 1.0,
+                 max_queue_size: int = 10000, overflow: str = 'drop',
+                 max_readers: int = 4, daily_cache_ttl: float = 5.0,
+                 user_cache_size: int = 10000):
         self.db_path = db_path
-        self.csv_path = csv_path
+        
+        # Community stats are the same for everyone, so a short TTL is enough;
+        # per-user stats are kept current as interactions are logged
+        self.daily_cache = LRUCache(max_size=8, ttl=daily_cache_ttl)
+        self.user_cache = LRUCache(max_size=user_cache_size)
         
         # Ensure data directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        
+        # Long-lived WAL connections: one writer, a small pool of readers
+        self.db = SQLiteConnectionManager(db_path, max_readers=max_readers)
         
         # Initialize database
         self._init_database()
         
-        # Initialize CSV if it doesn't exist
-        self._init_csv()
+        # Raw trail of every event: one held-open segment, rotated and gzipped
+        self.event_log = None
+        if event_log_dir:
+            self.event_log = SegmentedEventLog(
+                event_log_dir,
+                max_segment_bytes=segment_bytes,
+                max_segment_age=segment_age,
+                compress=compress_segments
+            )
+        
+        # Writes happen in batches on a background thread
+        self.writer = BackgroundBatchWriter(
+            self._write_batch,
+            flush_size=flush_size,
+            flush_interval=flush_interval,
+            max_queue_size=max_queue_size,
+            overflow=overflow
+        )
+        self.writer.start()
     
     def _init_database(self):
-        """Initialize SQLite database with required tables"""
+        """Initialize SQLite database and bring its schema up to date"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # User interactions table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_interactions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        username TEXT,
-                        first_name TEXT,
-                        last_name TEXT,
-                        timestamp DATETIME NOT NULL,
-                        action TEXT NOT NULL,
-                        recipient_name TEXT,
-                        mood_choice TEXT,
-                        message_generated BOOLEAN DEFAULT FALSE,
-                        session_data TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Daily stats table for quick analytics
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS daily_stats (
-                        date DATE PRIMARY KEY,
-                        total_users INTEGER DEFAULT 0,
-                        total_messages INTEGER DEFAULT 0,
-                        unique_users INTEGER DEFAULT 0,
-                        most_popular_mood TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Mood popularity table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS mood_stats (
-                        mood TEXT PRIMARY KEY,
-                        count INTEGER DEFAULT 0,
-                        last_used DATETIME,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                conn.commit()
-                logger.info("Database initialized successfully")
+            with self.db.writer() as conn:
+                version = apply_migrations(conn)
+                logger.info(f"Database initialized successfully (schema version {version})")
                 
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
     
-    def _init_csv(self):
-        """Initialize CSV file with headers if it doesn't exist"""
-        try:
-            if not os.path.exists(self.csv_path):
-                with open(self.csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow([
-                        'timestamp', 'user_id', 'username', 'first_name', 'last_name',
-                        'action', 'recipient_name', 'mood_choice', 'message_generated'
-                    ])
-                logger.info("CSV file initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing CSV: {e}")
-    
     def log_interaction(self, user_data: Dict[str, Any], action: str, 
                        recipient_name: str = None, mood_choice: str = None, 
                        message_generated: bool = False, session_data: Dict = None):
-        """Log user interaction to both CSV and SQLite database"""
-        timestamp = datetime.now()
-        
+        """Queue a user interaction for logging to SQLite and the event log"""
         try:
-            # Log to CSV
-            self._log_to_csv(user_data, action, timestamp, recipient_name, 
-                           mood_choice, message_generated)
-            
-            # Log to SQLite
-            self._log_to_sqlite(user_data, action, timestamp, recipient_name, 
-                              mood_choice, message_generated, session_data)
-            
-            # Update mood statistics if mood was chosen
-            if mood_choice:
-                self._update_mood_stats(mood_choice)
+            # Snapshot the session now, it keeps changing after this call
+            event = InteractionEvent(
+                timestamp=datetime.now(),
+                user_id=user_data.get('id'),
+                username=user_data.get('username'),
+                first_name=user_data.get('first_name'),
+                last_name=user_data.get('last_name'),
+                action=action,
+                recipient_name=recipient_name,
+                mood_choice=mood_choice,
+                message_generated=message_generated,
+                session_data=json.dumps(session_data, default=str) if session_data else None
+            )
             
-            logger.info(f"Logged interaction: user_id={user_data.get('id')}, action={action}")
+            if self.writer.submit(event):
+                self.user_cache.update(event.user_id, lambda stats: self._apply_to_user_stats(stats, event))
+                logger.info("Logged interaction: user_id=%s, action=%s", event.user_id, action,
+                            extra={'action': action})
             
         except Exception as e:
             logger.error(f"Error logging interaction: {e}")
     
-    def _log_to_csv(self, user_data: Dict[str, Any], action: str, timestamp: datetime,
-                    recipient_name: str, mood_choice: str, message_generated: bool):
-        """Log interaction to CSV file"""
+    def close(self):
+        """Flush pending interactions and release the database connections"""
+        self.writer.close()
+        if self.event_log:
+            self.event_log.close()
+        self.db.close()
+    
+    def _apply_to_user_stats(self, stats: Dict[str, Any], event: InteractionEvent):
+        """Fold a not-yet-written event into a cached user stats entry"""
+        stats['total_interactions'] += 1
+        if event.message_generated:
+            stats['messages_created'] += 1
+        if event.mood_choice and event.mood_choice == stats.get('favorite_mood'):
+            stats['favorite_mood_count'] += 1
+    
+    def _write_batch(self, events: List[InteractionEvent]):
+        """Write a batch of interactions, called from the writer thread"""
+        self._log_to_event_log(events)
         try:
-            with open(self.csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([
-                    timestamp.isoformat(),
-                    user_data.get('id'),
-                    user_data.get('username', ''),
-                    user_data.get('first_name', ''),
-                    user_data.get('last_name', ''),
-                    action,
-                    recipient_name or '',
-                    mood_choice or '',
-                    message_generated
-                ])
+            self._log_to_sqlite(events)
+        finally:
+            # The rollups are authoritative for these users again: they now
+            # include the events, or the write failed and the events that were
+            # folded into the cached entries must not linger there
+            self.user_cache.invalidate_many({event.user_id for event in events})
+    
+    def _log_to_event_log(self, events: List[InteractionEvent]):
+        """Append interactions to the raw event log in one buffered write"""
+        if not self.event_log:
+            return
+        try:
+            self.event_log.append({
+                'timestamp': event.timestamp.isoformat(),
+                'user_id': event.user_id,
+                'username': event.username,
+                'first_name': event.first_name,
+                'last_name': event.last_name,
+                'action': event.action,
+                'recipient_name': event.recipient_name,
+                'mood_choice': event.mood_choice,
+                'message_generated': event.message_generated
+            } for event in events)
         except Exception as e:
-            logger.error(f"Error writing to CSV: {e}")
+            logger.error(f"Error writing to event log: {e}")
     
-    def _log_to_sqlite(self, user_data: Dict[str, Any], action: str, timestamp: datetime,
-                       recipient_name: str, mood_choice: str, message_generated: bool,
-                       session_data: Dict):
-        """Log interaction to SQLite database"""
+    def _log_to_sqlite(self, events: List[InteractionEvent]):
+        """Log interactions and mood statistics to SQLite in one transaction"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
+            with self.db.writer() as conn:
+                conn.executemany('''
                     INSERT INTO user_interactions 
-                    (user_id, username, first_name, last_name, timestamp, action, 
+                    (user_id, username, first_name, last_name, timestamp, day, action, 
                      recipient_name, mood_choice, message_generated, session_data)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    user_data.get('id'),
-                    user_data.get('username'),
-                    user_data.get('first_name'),
-                    user_data.get('last_name'),
-                    timestamp,
-                    action,
-                    recipient_name,
-                    mood_choice,
-                    message_generated,
-                    json.dumps(session_data) if session_data else None
-                ))
-                conn.commit()
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(
+                    event.user_id,
+                    event.username,
+                    event.first_name,
+                    event.last_name,
+                    event.timestamp,
+                    event.timestamp.strftime('%Y-%m-%d'),
+                    event.action,
+                    event.recipient_name,
+                    event.mood_choice,
+                    event.message_generated,
+                    event.session_data
+                ) for event in events])
+                
+                self._update_mood_stats(conn, events)
+                analytics_rollups.apply_events(conn, events)
         except Exception as e:
             logger.error(f"Error writing to SQLite: {e}")
+            raise
     
-    def _update_mood_stats(self, mood_choice: str):
+    def _update_mood_stats(self, conn: sqlite3.Connection, events: List[InteractionEvent]):
         """Update mood popularity statistics"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO mood_stats (mood, count, last_used, updated_at)
-                    VALUES (?, 
-                            COALESCE((SELECT count FROM mood_stats WHERE mood = ?), 0) + 1,
-                            ?, 
-                            ?)
-                ''', (mood_choice, mood_choice, datetime.now(), datetime.now()))
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Error updating mood stats: {e}")
+        mood_counts = {}
+        for event in events:
+            if event.mood_choice:
+                count, _ = mood_counts.get(event.mood_choice, (0, None))
+                mood_counts[event.mood_choice] = (count + 1, event.timestamp)
+        
+        if not mood_counts:
+            return
+        
+        now = datetime.now()
+        conn.executemany('''
+            INSERT INTO mood_stats (mood, count, last_used, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(mood) DO UPDATE SET
+                count = count + excluded.count,
+                last_used = excluded.last_used,
+                updated_at = excluded.updated_at
+        ''', [(mood, count, last_used, now) for mood, (count, last_used) in mood_counts.items()])
     
     def get_daily_stats(self, date: str = None) -> Dict[str, Any]:
-        """Get daily statistics for analytics"""
+        """Get daily statistics for analytics from the daily rollup"""
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
+        cached = self.daily_cache.get(date)
+        if cached is not None:
+            return cached
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get daily stats
-                cursor.execute('''
-                    SELECT 
-                        COUNT(*) as total_interactions,
-                        COUNT(DISTINCT user_id) as unique_users,
-                        COUNT(CASE WHEN message_generated = 1 THEN 1 END) as messages_generated
-                    FROM user_interactions 
-                    WHERE DATE(timestamp) = ?
-                ''', (date,))
-                
-                stats = cursor.fetchone()
-                
-                # Get most popular mood for the day
-                cursor.execute('''
-                    SELECT mood_choice, COUNT(*) as count
-                    FROM user_interactions 
-                    WHERE DATE(timestamp) = ? AND mood_choice IS NOT NULL
-                    GROUP BY mood_choice
-                    ORDER BY count DESC
-                    LIMIT 1
-                ''', (date,))
-                
-                popular_mood = cursor.fetchone()
-                
-                return {
-                    'date': date,
-                    'total_interactions': stats[0] if stats else 0,
-                    'unique_users': stats[1] if stats else 0,
-                    'messages_generated': stats[2] if stats else 0,
-                    'most_popular_mood': popular_mood[0] if popular_mood else None
-                }
+            with self.db.reader() as conn:
+                stats = analytics_rollups.get_daily_stats(conn, date)
+            self.daily_cache.set(date, stats)
+            return stats
                 
         except Exception as e:
             logger.error(f"Error getting daily stats: {e}")
             return {}
+    
+    def get_user_stats(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's personal statistics from the per-user rollup"""
+        cached = self.user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
+        # Don't cache a read that raced with a batch commit for this user
+        generation = self.user_cache.generation
+        with self.db.reader() as conn:
+            stats = analytics_rollups.get_user_stats(conn, user_id)
+        if stats is not None:
+            self.user_cache.set(user_id, stats, generation)
+        return stats
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss counters of the stats caches for monitoring"""
+        return {
+            'daily': self.daily_cache.get_stats(),
+            'user': self.user_cache.get_stats()
+        }
 
 class ComplimentLoader:
     """Handles loading and managing compliments from JSON file"""
     
-    def __init__(self, compliments_file: str = "telegram_bot/compliments.json"):
+    def __init__(self, compliments_file: str = "telegram_bot/compliments.json",
+                 sampler: Optional[ComplimentSampler] = None):
         self.compliments_file = compliments_file
-        self.compliments = []
+        self.catalog = fallback_catalog()  # Replaced as a whole on reload, never mutated
+        self.sampler = sampler  # Per-user rotation; plain random picks without one
+        self.rng = random.Random()
+        self._fingerprints: Dict[str, int] = {}  # Candidate set name -> checksum, for _fingerprinted
+        self._fingerprinted = None
+        self._signature = None
+        self._reloading = False
+        self.reloads = 0
         self.load_compliments()
     
-    def load_compliments(self):
-        """Load compliments from JSON file"""
+    def load_compliments(self) -> bool:
+        """Load compliments from JSON file, keeping the current catalog on error"""
+        signature = file_signature(self.compliments_file)
+        self._signature = signature
+        if signature is None:
+            logger.warning(f"Compliments file not found: {self.compliments_file}")
+            return False
         try:
-            if os.path.exists(self.compliments_file):
-                with open(self.compliments_file, 'r', encoding='utf-8') as f:
-                    self.compliments = json.load(f)
-                logger.info(f"Loaded {len(self.compliments)} compliments from {self.compliments_file}")
-            else:
-                logger.warning(f"Compliments file not found: {self.compliments_file}")
-                # Fallback to a few basic compliments
-                self.compliments = [
-                    "You have an incredible ability to make others feel valued and appreciated.",
-                    "Your kindness radiates warmth that brightens everyone's day.",
-                    "The way you listen with such genuine care is truly a gift."
-                ]
+            catalog = load_catalog(self.compliments_file)
         except Exception as e:
             logger.error(f"Error loading compliments: {e}")
-            self.compliments = ["You are amazing and worthy of love and kindness! 💖"]
+            return False
+        self.catalog = catalog
+        logger.info(f"Loaded {len(catalog)} compliments from {self.compliments_file}")
+        return True
+    
+    async def reload_if_changed(self) -> bool:
+        """Swap in the catalog file if it changed, parsing it off the event loop"""
+        if self._reloading or file_signature(self.compliments_file) == self._signature:
+            return False
+        self._reloading = True
+        try:
+            loop = asyncio.get_running_loop()
+            reloaded = await loop.run_in_executor(None, self.load_compliments)
+        finally:
+            self._reloading = False
+        if reloaded:
+            self.reloads += 1
+        return reloaded
+    
+    def _candidates(self, catalog: ComplimentCatalog, language_code: Optional[str],
+                    category: Optional[str]) -> Tuple[str, Sequence[int]]:
+        """Name and entries of the user's language, falling back to the whole category or catalog"""
+        language = catalog.resolve_language(language_code)
+        for pool_language, pool_category in ((language, category), (None, category), (None, None)):
+            ids = catalog.select(pool_language, pool_category)
+            if ids:
+                return f"{pool_language or '*'}/{pool_category or '*'}", ids
+        return '*/*', ()
     
-    def get_random_compliment(self) -> str:
+    def _fingerprint(self, catalog: ComplimentCatalog, pool: str, ids: Sequence[int]) -> int:
+        """Checksum of a candidate set, computed once per catalog"""
+        if self._fingerprinted is not catalog:
+            self._fingerprints = {}
+            self._fingerprinted = catalog
+        value = self._fingerprints.get(pool)
+        if value is None:
+            value = self._fingerprints[pool] = fingerprint(ids)
+        return value
+    
+    def get_random_compliment(self, language_code: Optional[str] = None, category: Optional[str] = None) -> str:
         """Get a random compliment"""
-        import random
-        if self.compliments:
-            return random.choice(self.compliments)
+        catalog = self.catalog
+        _, ids = self._candidates(catalog, language_code, category)
+        if ids:
+            return catalog.text(ids[self.rng.randrange(len(ids))])
         return "You are wonderful just as you are! 🌟"
+    
+    async def get_compliment_for(self, user_id: int, language_code: Optional[str] = None,
+                                 category: Optional[str] = None) -> str:
+        """Get the next compliment in this user's rotation (no repeats until all are seen)"""
+        catalog = self.catalog
+        pool, ids = self._candidates(catalog, language_code, category)
+        if not ids or self.sampler is None:
+            return self.get_random_compliment(language_code, category)
+        try:
+            index = await self.sampler.next_index(user_id, pool, len(ids), self._fingerprint(catalog, pool, ids))
+            return catalog.text(ids[index])
+        except Exception as e:
+            logger.error(f"Error drawing compliment for user {user_id}: {e}")
+            return self.get_random_compliment(language_code, category)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog size and reload counters for monitoring"""
+        return dict(self.catalog.get_stats(), reloads=self.reloads)
 
 class KindWordsBot:
     def __init__(self):
-        self.user_sessions = {}  # Store user session data
-        self.analytics = AnalyticsLogger()  # Initialize analytics logger
-        self.compliments = ComplimentLoader()  # Initialize compliment loader
+        self.user_sessions = create_session_backend(  # Store user session data
+            SESSION_BACKEND,
+            idle_ttl=SESSION_IDLE_TTL,
+            max_sessions=MAX_SESSIONS,
+            db_path=SESSION_DB_PATH,
+            local_ttl=SESSION_LOCAL_TTL
+        )
+        self.analytics = AnalyticsLogger(  # Initialize analytics logger
+            event_log_dir=EVENT_LOG_DIR or None,
+            segment_bytes=EVENT_LOG_SEGMENT_BYTES,
+            segment_age=EVENT_LOG_SEGMENT_SECONDS,
+            compress_segments=EVENT_LOG_COMPRESS,
+            flush_size=ANALYTICS_FLUSH_SIZE,
+            flush_interval=ANALYTICS_FLUSH_INTERVAL,
+            max_queue_size=ANALYTICS_QUEUE_SIZE,
+            overflow=ANALYTICS_QUEUE_OVERFLOW,
+            daily_cache_ttl=STATS_CACHE_TTL,
+            user_cache_size=USER_STATS_CACHE_SIZE
+        )
+        self.compliment_sampler = ComplimentSampler(COMPLIMENT_HISTORY_DB, cache_size=COMPLIMENT_HISTORY_CACHE_SIZE)
+        self.compliments = ComplimentLoader(COMPLIMENTS_FILE, sampler=self.compliment_sampler)  # Initialize compliment loader
+        self.templates = TemplateRegistry(TEMPLATES_FILE)  # Compiled once; rendering is a single join
+        self.update_processor = PerUserUpdateProcessor(max_concurrent=MAX_CONCURRENT_UPDATES)
+        self.rate_limiter = PriorityRateLimiter(
+            global_rate=RATE_LIMIT_GLOBAL,
+            chat_rate=RATE_LIMIT_PER_CHAT,
+            chat_burst=RATE_LIMIT_CHAT_BURST,
+            group_per_minute=RATE_LIMIT_GROUP_PER_MINUTE,
+            max_retries=RATE_LIMIT_MAX_RETRIES
+        )
+        self.ai = None  # Gemini client; templates are used when no API key is set
+        if GEMINI_API_KEY:
+            self.ai = GeminiClient(
+                GEMINI_API_KEY,
+                model=GEMINI_MODEL,
+                base_url=GEMINI_BASE_URL,
+                request_timeout=GEMINI_REQUEST_TIMEOUT,
+                max_concurrent=GEMINI_MAX_CONCURRENT,
+                max_retries=GEMINI_MAX_RETRIES
+            )
+        self.generation_cache = None  # Shares AI results between users asking for the same name and mood
+        if self.ai and GENERATION_CACHE_SIZE > 0:
+            self.generation_cache = GenerationCache(
+                max_keys=GENERATION_CACHE_SIZE,
+                variants=GENERATION_CACHE_VARIANTS,
+                ttl=GENERATION_CACHE_TTL,
+                db_path=GENERATION_CACHE_DB or None
+            )
+        self.message_pool = None  # Ready-made messages so requests skip the API round trip
+        if self.ai and MESSAGE_POOL_SIZE > 0:
+            self.message_pool = MessagePool(
+                list(MOOD_THEMES),
+                partial(self._generate_ai, background=True),
+                size=MESSAGE_POOL_SIZE,
+                refill_batch=MESSAGE_POOL_REFILL_BATCH,
+                max_age=MESSAGE_POOL_MAX_AGE,
+                max_in_flight=MESSAGE_POOL_MAX_IN_FLIGHT
+            )
+        self.subscriptions = SubscriptionStore(SUBSCRIPTIONS_DB_PATH)  # Daily compliment opt-ins
+        self.broadcaster = DailyBroadcaster(
+            self.subscriptions,
+            batch_size=BROADCAST_BATCH_SIZE,
+            catchup_hours=BROADCAST_CATCHUP_HOURS,
+            max_in_flight=BROADCAST_MAX_IN_FLIGHT
+        )
+    
+    async def shutdown(self, application: Application) -> None:
+        """Drain pending analytics before the process exits"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.analytics.close)
+        await self.user_sessions.close()
+        if self.ai:
+            await self.ai.close()
+        if self.generation_cache:
+            self.generation_cache.close()
+        self.subscriptions.close()
+        self.compliment_sampler.close()
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Runtime metrics reported on the /health endpoint"""
+        return {
+            'analytics_writer': self.analytics.writer.get_stats(),
+            'event_log': self.analytics.event_log.get_stats() if self.analytics.event_log else None,
+            'stats_cache': self.analytics.get_cache_stats(),
+            'sessions': self.user_sessions.get_stats(),
+            'updates': self.update_processor.get_stats(),
+            'rate_limiter': self.rate_limiter.get_stats(),
+            'ai': self.ai.get_stats() if self.ai else None,
+            'generation_cache': self.generation_cache.get_stats() if self.generation_cache else None,
+            'message_pool': self.message_pool.get_stats() if self.message_pool else None,
+            'broadcast': self.broadcaster.get_stats(),
+            'compliments': dict(self.compliments.get_stats(), rotation=self.compliment_sampler.get_stats()),
+            'logging': logging_pipeline.get_stats()
+        }
+    
+    async def sweep_sessions(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job queue callback that drops idle /create sessions"""
+        removed = await self.user_sessions.sweep()
+        if removed:
+            logger.info(f"Expired {removed} idle sessions")
+    
+    async def refill_message_pool(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job queue callback that tops up the pre-generated message pool"""
+        added = await self.message_pool.refill()
+        if added:
+            logger.info(f"Added {added} messages to the message pool")
+    
+    async def reload_compliments(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job queue callback that picks up edits to the compliments file"""
+        if await self.compliments.reload_if_changed():
+            logger.info(f"Reloaded compliment catalog: {self.compliments.get_stats()}")
+    
+    async def deliver_daily_compliments(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job queue callback that sends daily compliments that are due"""
+        try:
+            await self.broadcaster.run_due(partial(self._send_daily_compliment, context.bot))
+        except Exception as e:
+            logger.error(f"Error delivering daily compliments: {e}")
+    
+    async def _send_daily_compliment(self, bot, user_id: int, chat_id: int, language_code: Optional[str]) -> None:
+        """Send one subscriber their daily compliment at bulk priority"""
+        text = (
+            "☀️ *Your daily compliment:*\n\n"
+            f"_{await self.compliments.get_compliment_for(user_id, language_code)}_\n\n"
+            "Use /unsubscribe to stop daily compliments."
+        )
+        await bot.send_message(chat_id, text, parse_mode='Markdown', rate_limit_args=PRIORITY_BULK)
     
     def _get_user_data(self, user) -> Dict[str, Any]:
         """Extract user data for logging"""
@@ -355,6 +682,8 @@ class KindWordsBot:
             "/start - Welcome message and get started\n"
             "/create - Create a new kind message\n"
             "/compliment - Receive a gentle compliment\n"
+            "/subscribe [hour] - Get a compliment every day at that hour\n"
+            "/unsubscribe - Stop daily compliments\n"
             "/help - Show this help message\n"
             "/about - Learn more about KindWords\n"
             "/stats - View your usage statistics\n\n"
@@ -391,7 +720,7 @@ class KindWordsBot:
         user_data = self._get_user_data(user)
         self.analytics.log_interaction(user_data, 'compliment_command')
         
-        compliment = self.compliments.get_random_compliment()
+        compliment = await self.compliments.get_compliment_for(user.id, user.language_code)
         
         compliment_message = (
             f"💝 *A gentle compliment for you, {user.first_name}:*\n\n"
@@ -407,6 +736,58 @@ class KindWordsBot:
         
         await update.message.reply_text(compliment_message, reply_markup=reply_markup, parse_mode='Markdown')
     
+    async def subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle the /subscribe command - opt in to a daily compliment"""
+        user = update.effective_user
+        user_data = self._get_user_data(user)
+        self.analytics.log_interaction(user_data, 'subscribe_command')
+        
+        hour = DEFAULT_SUBSCRIPTION_HOUR
+        if context.args:
+            try:
+                hour = int(context.args[0].split(':')[0])
+            except ValueError:
+                hour = -1
+            if not 0 <= hour <= 23:
+                await update.message.reply_text("Please give an hour from 0 to 23, like /subscribe 9 🕘")
+                return
+        
+        # Start tomorrow if today's delivery hour has already passed
+        now = datetime.now()
+        first_day = now.strftime('%Y-%m-%d') if hour < now.hour else ''
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.subscriptions.subscribe,
+                                       user.id, update.effective_chat.id, hour, first_day, user.language_code)
+        except Exception as e:
+            logger.error(f"Error saving subscription: {e}")
+            await update.message.reply_text("Sorry, I couldn't save your subscription. Please try again later! 💙")
+            return
+        
+        await update.message.reply_text(
+            f"☀️ You're subscribed! I'll send you a compliment every day at {hour:02d}:00 "
+            f"(server time).\n\nUse /unsubscribe to stop anytime."
+        )
+    
+    async def unsubscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle the /unsubscribe command - stop daily compliments"""
+        user = update.effective_user
+        user_data = self._get_user_data(user)
+        self.analytics.log_interaction(user_data, 'unsubscribe_command')
+        
+        try:
+            loop = asyncio.get_running_loop()
+            removed = await loop.run_in_executor(None, self.subscriptions.unsubscribe, user.id)
+        except Exception as e:
+            logger.error(f"Error removing subscription: {e}")
+            await update.message.reply_text("Sorry, something went wrong. Please try again later! 💙")
+            return
+        
+        if removed:
+            await update.message.reply_text("You've been unsubscribed from daily compliments. Take care! 🌸")
+        else:
+            await update.message.reply_text("You're not subscribed. Use /subscribe to get a daily compliment! ☀️")
+    
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle the /stats command - show user their usage statistics"""
         user = update.effective_user
@@ -414,54 +795,44 @@ class KindWordsBot:
         self.analytics.log_interaction(user_data, 'stats_command')
         
         try:
-            # Get user's personal stats
-            with sqlite3.connect(self.analytics.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get user's total interactions
-                cursor.execute('''
-                    SELECT 
-                        COUNT(*) as total_interactions,
-                        COUNT(CASE WHEN message_generated = 1 THEN 1 END) as messages_created,
-                        MIN(timestamp) as first_interaction
-                    FROM user_interactions 
-                    WHERE user_id = ?
-                ''', (user.id,))
-                
-                user_stats = cursor.fetchone()
-                
-                # Get user's favorite mood
-                cursor.execute('''
-                    SELECT mood_choice, COUNT(*) as count
-                    FROM user_interactions 
-                    WHERE user_id = ? AND mood_choice IS NOT NULL
-                    GROUP BY mood_choice
-                    ORDER BY count DESC
-                    LIMIT 1
-                ''', (user.id,))
-                
-                favorite_mood = cursor.fetchone()
-                
-                # Get today's stats
-                today = datetime.now().strftime('%Y-%m-%d')
-                daily_stats = self.analytics.get_daily_stats(today)
-                
-                stats_text = (
-                    f"📊 *Your KindWords Statistics* 📊\n\n"
-                    f"👤 *Personal Stats:*\n"
-                    f"• Total interactions: {user_stats[0] if user_stats else 0}\n"
-                    f"• Messages created: {user_stats[1] if user_stats else 0}\n"
-                    f"• Member since: {user_stats[2][:10] if user_stats and user_stats[2] else 'Today'}\n"
-                    f"• Favorite mood: {MOOD_THEMES.get(favorite_mood[0], {}).get('emoji', '')} {MOOD_THEMES.get(favorite_mood[0], {}).get('name', 'None yet')} ({favorite_mood[1]} times)" if favorite_mood else "• Favorite mood: None yet\n"
-                    f"\n🌍 *Today's Community:*\n"
-                    f"• Active users: {daily_stats.get('unique_users', 0)}\n"
-                    f"• Messages created: {daily_stats.get('messages_generated', 0)}\n"
-                    f"• Popular mood: {MOOD_THEMES.get(daily_stats.get('most_popular_mood'), {}).get('emoji', '')} {MOOD_THEMES.get(daily_stats.get('most_popular_mood'), {}).get('name', 'None')}" if daily_stats.get('most_popular_mood') else "• Popular mood: None yet\n"
-                    f"\n💖 Keep spreading kindness!"
-                )
-                
-                await update.message.reply_text(stats_text, parse_mode='Markdown')
-                
+            # Personal and community stats are single-row rollup lookups
+            user_stats = self.analytics.get_user_stats(user.id) or {}
+            today = datetime.now().strftime('%Y-%m-%d')
+            daily_stats = self.analytics.get_daily_stats(today)
+            
+            favorite_mood = user_stats.get('favorite_mood')
+            popular_mood = daily_stats.get('most_popular_mood')
+            member_since = user_stats.get('first_interaction')
+            
+            if favorite_mood:
+                favorite_theme = MOOD_THEMES.get(favorite_mood, {})
+                favorite_text = (f"{favorite_theme.get('emoji', '')} {favorite_theme.get('name', favorite_mood)} "
+                                 f"({user_stats.get('favorite_mood_count', 0)} times)")
+            else:
+                favorite_text = "None yet"
+            
+            if popular_mood:
+                popular_theme = MOOD_THEMES.get(popular_mood, {})
+                popular_text = f"{popular_theme.get('emoji', '')} {popular_theme.get('name', popular_mood)}"
+            else:
+                popular_text = "None yet"
+            
+            stats_text = (
+                f"📊 *Your KindWords Statistics* 📊\n\n"
+                f"👤 *Personal Stats:*\n"
+                f"• Total interactions: {user_stats.get('total_interactions', 0)}\n"
+                f"• Messages created: {user_stats.get('messages_created', 0)}\n"
+                f"• Member since: {str(member_since)[:10] if member_since else 'Today'}\n"
+                f"• Favorite mood: {favorite_text}\n"
+                f"\n🌍 *Today's Community:*\n"
+                f"• Active users: {daily_stats.get('unique_users', 0)}\n"
+                f"• Messages created: {daily_stats.get('messages_generated', 0)}\n"
+                f"• Popular mood: {popular_text}\n"
+                f"\n💖 Keep spreading kindness!"
+            )
+            
+            await update.message.reply_text(stats_text, parse_mode='Markdown')
+            
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             await update.message.reply_text("Sorry, I couldn't retrieve your statistics right now. Please try again later!")
@@ -473,16 +844,12 @@ class KindWordsBot:
         user_data = self._get_user_data(user)
         
         # Initialize user session
-        self.user_sessions[user_id] = {
-            'step': 'waiting_for_name',
-            'friend_name': None,
-            'mood_theme': None,
-            'start_time': datetime.now()
-        }
+        session = Session()
+        await self.user_sessions.set(user_id, session)
         
         # Log the create command
         self.analytics.log_interaction(user_data, 'create_command', 
-                                     session_data=self.user_sessions[user_id])
+                                     session_data=session.to_dict())
         
         message = (
             "🌸 Let's create a beautiful message! 🌸\n\n"
@@ -498,26 +865,26 @@ class KindWordsBot:
         user_data = self._get_user_data(user)
         text = update.message.text
         
-        if user_id not in self.user_sessions:
+        session = await self.user_sessions.get(user_id)
+        if session is None:
             self.analytics.log_interaction(user_data, 'message_without_session')
             await update.message.reply_text(
                 "Please use /create to start creating a message! 😊"
             )
             return
         
-        session = self.user_sessions[user_id]
-        
-        if session['step'] == 'waiting_for_name':
+        if session.step == 'waiting_for_name':
             # Store the friend's name and ask for mood theme
-            session['friend_name'] = text.strip()
-            session['step'] = 'waiting_for_mood'
+            session.friend_name = text.strip()
+            session.step = 'waiting_for_mood'
+            await self.user_sessions.set(user_id, session)
             
             # Log recipient name entry
             self.analytics.log_interaction(user_data, 'recipient_name_entered', 
-                                         recipient_name=session['friend_name'],
-                                         session_data=session)
+                                         recipient_name=session.friend_name,
+                                         session_data=session.to_dict())
             
-            await self.show_mood_selection(update, context)
+            await self.show_mood_selection(update, context, session.friend_name)
         
         else:
             self.analytics.log_interaction(user_data, 'unexpected_message')
@@ -525,10 +892,9 @@ class KindWordsBot:
                 "Please use the buttons to select options, or use /create to start over! 😊"
             )
     
-    async def show_mood_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    async def show_mood_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                  friend_name: str) -> None:
         """Show mood theme selection buttons"""
-        user_id = update.effective_user.id
-        friend_name = self.user_sessions[user_id]['friend_name']
         
         message = (
             f"Perfect! I'll create a message for *{friend_name}* 💖\n\n"
@@ -576,7 +942,7 @@ class KindWordsBot:
         
         self.analytics.log_interaction(user_data, 'compliment_callback')
         
-        compliment = self.compliments.get_random_compliment()
+        compliment = await self.compliments.get_compliment_for(user.id, user.language_code)
         
         compliment_message = (
             f"💝 *A gentle compliment for you, {user.first_name}:*\n\n"
@@ -598,32 +964,32 @@ class KindWordsBot:
         user_id = query.from_user.id
         user_data = self._get_user_data(query.from_user)
         
-        if user_id not in self.user_sessions:
+        session = await self.user_sessions.get(user_id)
+        if session is None:
             await query.edit_message_text("Session expired. Please use /create to start over!")
             return
         
         mood_theme = data.replace('mood_', '')
-        session = self.user_sessions[user_id]
-        session['mood_theme'] = mood_theme
+        session.mood_theme = mood_theme
+        await self.user_sessions.set(user_id, session)
         
         # Log mood selection
         self.analytics.log_interaction(user_data, 'mood_selected', 
-                                     recipient_name=session['friend_name'],
+                                     recipient_name=session.friend_name,
                                      mood_choice=mood_theme,
-                                     session_data=session)
+                                     session_data=session.to_dict())
         
         # Generate the message
-        await self.generate_and_send_message(update, context)
+        await self.generate_and_send_message(update, context, session)
     
-    async def generate_and_send_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    async def generate_and_send_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                        session: Session, regenerate: bool = False) -> None:
         """Generate and send the AI message"""
         query = update.callback_query
-        user_id = query.from_user.id
         user_data = self._get_user_data(query.from_user)
-        session = self.user_sessions[user_id]
         
-        friend_name = session['friend_name']
-        mood_theme = session['mood_theme']
+        friend_name = session.friend_name
+        mood_theme = session.mood_theme
         theme_data = MOOD_THEMES[mood_theme]
         
         # Show generating message
@@ -633,23 +999,32 @@ class KindWordsBot:
         )
         await query.edit_message_text(generating_text)
         
+        # Progressive edits while the AI writes, when streaming is enabled
+        editor = None
+        on_partial = None
+        if STREAM_RESPONSES and self.ai:
+            editor = ThrottledEditor(query.edit_message_text, min_interval=STREAM_EDIT_INTERVAL)
+            partial_header = f"✨ Writing a {theme_data['name'].lower()} message for {friend_name}...\n\n"
+            on_partial = lambda text: editor.update(partial_header + text + " ✍️")
+        
         try:
             # Generate message
-            message = await self.generate_message_with_ai(friend_name, mood_theme)
+            message = await self.generate_message_with_ai(friend_name, mood_theme, fresh=regenerate,
+                                                          on_partial=on_partial)
             
             # Log successful message generation
             self.analytics.log_interaction(user_data, 'message_generated', 
                                          recipient_name=friend_name,
                                          mood_choice=mood_theme,
                                          message_generated=True,
-                                         session_data=session)
+                                         session_data=session.to_dict())
             
             # Format the final message
             final_text = (
                 f"🌸 *Your AI-Generated Message* 🌸\n\n"
-                f"*For:* {friend_name}\n"
+                f"*For:* {escape_markdown(friend_name, version=1)}\n"
                 f"*Theme:* {theme_data['emoji']} {theme_data['name']}\n\n"
-                f"_{message}_\n\n"
+                f"{italic_markdown(message)}\n\n"
                 "💝 *Ready to spread some kindness!*"
             )
             
@@ -660,7 +1035,10 @@ class KindWordsBot:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await query.edit_message_text(final_text, reply_markup=reply_markup, parse_mode='Markdown')
+            if editor:
+                await editor.finish(final_text, reply_markup=reply_markup, parse_mode='Markdown')
+            else:
+                await query.edit_message_text(final_text, reply_markup=reply_markup, parse_mode='Markdown')
             
         except Exception as e:
             logger.error(f"Error generating message: {e}")
@@ -669,7 +1047,7 @@ class KindWordsBot:
             self.analytics.log_interaction(user_data, 'message_generation_error', 
                                          recipient_name=friend_name,
                                          mood_choice=mood_theme,
-                                         session_data=session)
+                                         session_data=session.to_dict())
             
             error_text = (
                 "😔 Sorry, I encountered an error while generating your message.\n\n"
@@ -683,54 +1061,112 @@ class KindWordsBot:
         user_id = query.from_user.id
         user_data = self._get_user_data(query.from_user)
         
-        if user_id not in self.user_sessions:
+        session = await self.user_sessions.get(user_id)
+        if session is None or not session.mood_theme:
             await query.edit_message_text("Session expired. Please use /create to start over!")
             return
         
         # Log regeneration request
-        session = self.user_sessions[user_id]
         self.analytics.log_interaction(user_data, 'message_regenerated', 
-                                     recipient_name=session['friend_name'],
-                                     mood_choice=session['mood_theme'],
-                                     session_data=session)
-        
-        await self.generate_and_send_message(update, context)
-    
-    async def generate_message_with_ai(self, friend_name: str, mood_theme: str) -> str:
-        """Generate message using AI or fallback templates"""
-        # TODO: Implement Gemini API integration
-        # For now, using fallback templates
-        
-        templates = {
-            'uplift': [
-                f"Hey {friend_name}! Just wanted to remind you that your positive energy lights up every room you enter. Your resilience and strength inspire everyone around you. Keep being amazing! 🌟",
-                f"{friend_name}, you have this incredible ability to find silver linings in any situation. Your optimism is contagious and makes the world a brighter place. Thank you for being you! ✨"
-            ],
-            'congrats': [
-                f"Congratulations, {friend_name}! Your hard work and dedication have truly paid off. You've achieved something amazing and you should be incredibly proud! 🎉",
-                f"{friend_name}, what an incredible achievement! Your perseverance and talent have led you to this moment. You've inspired so many people with your journey! 🏆"
-            ],
-            'thanks': [
-                f"Thank you, {friend_name}, for being such an incredible friend. Your support, kindness, and genuine care mean the world to me. I'm so grateful to have you in my life! 🙏",
-                f"{friend_name}, I can't thank you enough for everything you do. Your thoughtfulness and generosity never cease to amaze me. You make life so much better! 💕"
-            ],
-            'motivation': [
-                f"{friend_name}, you have incredible strength within you that can overcome any challenge. Your potential is limitless, and I believe in you completely. You've got this! 💪",
-                f"Hey {friend_name}! Remember that every expert was once a beginner, and every champion was once a contender. Your journey is just beginning, and greatness awaits! 🚀"
-            ],
-            'support': [
-                f"{friend_name}, I want you to know that you're not alone in this journey. You're stronger than you realize, and you have people who care about you deeply. Take it one day at a time. 🤗",
-                f"Dear {friend_name}, remember that it's okay not to be okay sometimes. Your feelings are valid, and your courage to keep going is admirable. You're braver than you believe! 💙"
-            ],
-            'celebration': [
-                f"It's party time, {friend_name}! Your joy and enthusiasm are absolutely infectious. You know how to make every moment special and memorable. Let's celebrate life together! 🎊",
-                f"{friend_name}, you bring such vibrant energy to everything you do! Your zest for life and ability to find joy in the little things makes every day an adventure. Keep shining! ✨"
-            ]
-        }
+                                     recipient_name=session.friend_name,
+                                     mood_choice=session.mood_theme,
+                                     session_data=session.to_dict())
+        
+        await self.generate_and_send_message(update, context, session, regenerate=True)
+    
+    async def generate_message_with_ai(self, friend_name: str, mood_theme: str, fresh: bool = False,
+                                       on_partial: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """Generate message using AI or fallback templates
+
+        ``fresh`` asks the generation cache for a new variant rather than a
+        cached one, for "Generate Another". ``on_partial`` is called with the
+        text so far when a message has to be generated on demand.
+        """
+        if self.ai:
+            try:
+                # Cheapest first: a cached message for this name, then a pooled
+                # one, and only then a call to the API
+                if self.generation_cache:
+                    message = await self.generation_cache.lookup(friend_name, mood_theme, fresh=fresh)
+                    if message is not None:
+                        return message
+                if self.message_pool:
+                    template = self.message_pool.take(mood_theme)
+                    if template is not None:
+                        return template.render(friend_name)
+                generate = self._generate_ai
+                if on_partial:
+                    generate = lambda name, mood: self._generate_ai(name, mood, on_partial)
+                if self.generation_cache:
+                    return await self.generation_cache.get(friend_name, mood_theme, generate, fresh=fresh)
+                return await generate(friend_name, mood_theme)
+            except GenerationError as e:
+                logger.warning(f"AI generation failed, using a template: {e}")
         
-        import random
-        theme_templates = templates.get(mood_theme, templates['uplift'])
-        return random.choice(theme_templates)
+        return self.templates.render(mood_theme, friend_name)
+    
+    async def _generate_ai(self, friend_name: str, mood_theme: str,
+                           on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+                           background: bool = False) -> str:
+        """One uncached Gemini generation, streamed when ``on_partial`` is given
+
+        ``background`` generations (pool refills) only use idle API slots.
+        """
+        prompt = build_prompt(friend_name, mood_theme)
+        if on_partial is None:
+            return await self.ai.generate(prompt, timeout=GEMINI_DEADLINE, background=background)
+        
+        text = ''
+        # Closed even if on_partial raises, so the client's slot is released now
+        # rather than whenever the abandoned generator is garbage collected
+        async with aclosing(self.ai.stream(prompt, timeout=GEMINI_DEADLINE)) as chunks:
+            async for chunk in chunks:
+                text += chunk
+                await on_partial(text)
+        return text.strip()
+
+async def run_bot(application: Application, bot: KindWordsBot) -> None:
+    """Run the bot and its HTTP server in one event loop until stopped"""
+    webhook_mode = BOT_MODE == 'webhook'
+    server = WebhookServer(
+        application,
+        host=HTTP_HOST,
+        port=HTTP_PORT,
+        webhook_path=WEBHOOK_PATH if webhook_mode else None,
+        secret_token=WEBHOOK_SECRET_TOKEN,
+        health_info=bot.get_health
+    )
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on this platform; Ctrl+C raises KeyboardInterrupt instead
+    
+    async with application:
+        await application.start()
+        try:
+            await server.start()
+            
+            if webhook_mode:
+                # Telegram pushes updates to the server instead of being long-polled
+                await application.bot.set_webhook(
+                    url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+                    secret_token=WEBHOOK_SECRET_TOKEN,
+                    allowed_updates=Update.ALL_TYPES
+                )
+            else:
+                await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            
+            await stop_event.wait()
+        finally:
+            if application.updater and application.updater.running:
+                await application.updater.stop()
+            await server.stop()
+            await application.stop()
+            await bot.shutdown(application)
 
 def main() -> None:
     """Start the bot"""
@@ -738,14 +1174,24 @@ def main() -> None:
         logger.error("TELEGRAM_BOT_TOKEN not found in environment variables!")
         return
     
-    # Ensure logs directory exists
-    os.makedirs('telegram_bot/logs', exist_ok=True)
+    if BOT_MODE not in ('polling', 'webhook'):
+        logger.error(f"Unknown BOT_MODE: {BOT_MODE} (expected 'polling' or 'webhook')")
+        return
+    
+    if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+        logger.error("WEBHOOK_URL must be set when BOT_MODE=webhook!")
+        return
     
     # Create bot instance
     bot = KindWordsBot()
     
     # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    builder = (Application.builder().token(BOT_TOKEN)
+               .concurrent_updates(bot.update_processor)
+               .rate_limiter(bot.rate_limiter))
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    application = builder.build()
     
     # Add handlers
     application.add_handler(CommandHandler("start", bot.start_command))
@@ -754,12 +1200,32 @@ def main() -> None:
     application.add_handler(CommandHandler("stats", bot.stats_command))
     application.add_handler(CommandHandler("create", bot.create_command))
     application.add_handler(CommandHandler("compliment", bot.compliment_command))
+    application.add_handler(CommandHandler("subscribe", bot.subscribe_command))
+    application.add_handler(CommandHandler("unsubscribe", bot.unsubscribe_command))
     application.add_handler(CallbackQueryHandler(bot.handle_callback))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_message))
     
+    # Periodically drop idle sessions
+    application.job_queue.run_repeating(bot.sweep_sessions, interval=SESSION_SWEEP_INTERVAL,
+                                        first=SESSION_SWEEP_INTERVAL)
+    
+    # Replace pooled messages as users draw them (nothing is generated until they do)
+    if bot.message_pool:
+        application.job_queue.run_repeating(bot.refill_message_pool, interval=MESSAGE_POOL_REFILL_INTERVAL,
+                                            first=MESSAGE_POOL_REFILL_INTERVAL)
+    
+    # Pick up compliment catalog edits without a restart
+    if COMPLIMENTS_RELOAD_INTERVAL > 0:
+        application.job_queue.run_repeating(bot.reload_compliments, interval=COMPLIMENTS_RELOAD_INTERVAL,
+                                            first=COMPLIMENTS_RELOAD_INTERVAL)
+    
+    # Send daily compliments that have come due
+    application.job_queue.run_repeating(bot.deliver_daily_compliments, interval=BROADCAST_CHECK_INTERVAL,
+                                        first=10)
+    
     # Start the bot
-    logger.info("Starting KindWords Telegram Bot with analytics...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    logger.info(f"Starting KindWords Telegram Bot with analytics ({BOT_MODE} mode)...")
+    asyncio.run(run_bot(application, bot))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
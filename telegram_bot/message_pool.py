@@ -0,0 +1,122 @@
+"""
+Pre-generated message pool for KindWords Telegram Bot
+Keeps a per-mood supply of AI messages written for a placeholder name, so a
+request only substitutes the recipient's name instead of waiting on the API.
+A job queue callback replaces what users drew, in the background.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from generation_cache import templatize
+from message_templates import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+# Name the pool's messages are generated for, then swapped for the recipient's
+PLACEHOLDER_NAME = 'Jamie'
+
+
+class MessagePool:
+    """Per-mood queues of name-templated messages, each served once
+
+    ``take`` returns None when a mood is empty so the caller can generate
+    on demand. Every ``take`` counts as demand for its mood, and ``refill``
+    only replaces what was demanded: at most ``refill_batch`` messages per
+    mood per call, no more than ``max_in_flight`` generations at once. A
+    mood nobody asks for is never generated for, so an idle bot makes no
+    API calls. Messages older than ``max_age`` seconds are discarded instead
+    of served, and are not replaced unless there is demand.
+    """
+
+    def __init__(self, moods: List[str], generate: Callable[[str, str], Awaitable[str]],
+                 size: int = 20, refill_batch: int = 5, max_age: float = 3600, max_in_flight: int = 2):
+        self.generate = generate
+        self.size = size
+        self.refill_batch = refill_batch
+        self.max_age = max_age
+        self.max_in_flight = max(1, max_in_flight)
+        self._pools: Dict[str, Deque[Tuple[CompiledTemplate, float]]] = {mood: deque() for mood in moods}
+        self._demand: Dict[str, int] = {mood: 0 for mood in moods}   # Takes not yet replaced
+        self._refilling = False
+
+        self.served = 0
+        self.depleted = 0
+        self.stale = 0
+        self.generated = 0
+        self.refill_errors = 0
+
+    def take(self, mood: str) -> Optional[CompiledTemplate]:
+        """Pop the oldest fresh message for a mood, or None if there is none"""
+        pool = self._pools.get(mood)
+        if pool is None:
+            return None
+        self._demand[mood] += 1
+        self._drop_stale(pool)
+        if not pool:
+            self.depleted += 1
+            return None
+        self.served += 1
+        return pool.popleft()[0]
+
+    def _drop_stale(self, pool: Deque[Tuple[CompiledTemplate, float]]):
+        cutoff = time.monotonic() - self.max_age
+        while pool and pool[0][1] <= cutoff:
+            pool.popleft()
+            self.stale += 1
+
+    async def refill(self) -> int:
+        """Replace up to ``refill_batch`` drawn messages per mood"""
+        if self._refilling:
+            return 0  # Previous run still generating
+        self._refilling = True
+        try:
+            jobs = []
+            for mood, pool in self._pools.items():
+                self._drop_stale(pool)
+                count = max(0, min(self.size - len(pool), self.refill_batch, self._demand[mood]))
+                # Demand beyond a full pool is met already; the rest carries over
+                self._demand[mood] = 0 if len(pool) + count >= self.size else self._demand[mood] - count
+                jobs.extend([mood] * count)
+            if not jobs:
+                return 0
+
+            slots = asyncio.Semaphore(self.max_in_flight)
+
+            async def generate(mood: str) -> str:
+                async with slots:
+                    return await self.generate(PLACEHOLDER_NAME, mood)
+
+            results = await asyncio.gather(*(generate(mood) for mood in jobs), return_exceptions=True)
+            added = 0
+            for mood, result in zip(jobs, results):
+                if isinstance(result, BaseException):
+                    self.refill_errors += 1
+                    self._demand[mood] += 1     # Try again next refill
+                    continue
+                self._pools[mood].append((templatize(result, PLACEHOLDER_NAME), time.monotonic()))
+                added += 1
+            self.generated += added
+            if added < len(jobs):
+                logger.warning(f"Message pool refill: {len(jobs) - added} of {len(jobs)} generations failed")
+            return added
+        finally:
+            self._refilling = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool depth and usage metrics for monitoring"""
+        requests = self.served + self.depleted
+        return {
+            'depth': {mood: len(pool) for mood, pool in self._pools.items()},
+            'size_per_mood': self.size,
+            'pending_demand': dict(self._demand),
+            'served': self.served,
+            'depleted': self.depleted,
+            'served_rate': round(self.served / requests, 4) if requests else 0.0,
+            'stale_dropped': self.stale,
+            'generated': self.generated,
+            'refill_errors': self.refill_errors
+        }
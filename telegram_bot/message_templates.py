@@ -0,0 +1,113 @@
+"""
+Message template registry for KindWords Telegram Bot
+Loads per-mood message templates from a JSON file once at startup and
+compiles them so rendering a message costs one join, whatever the pool size
+"""
+
+import json
+import logging
+import os
+import random
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = 'name'
+DEFAULT_MOOD = 'uplift'
+
+# Used when the templates file is missing or unreadable
+FALLBACK_TEMPLATES = {
+    DEFAULT_MOOD: ["Hey {name}! Just wanted to remind you how amazing you are. Keep shining! 🌟"]
+}
+
+
+class CompiledTemplate:
+    """A template pre-split around its {name} placeholders"""
+
+    __slots__ = ('parts',)
+
+    def __init__(self, parts: Tuple[str, ...]):
+        self.parts = parts
+
+    def render(self, name: str) -> str:
+        # Joining literal parts never interprets braces in the name itself
+        return name.join(self.parts)
+
+
+def compile_template(text: str) -> CompiledTemplate:
+    """Compile a template string; only the {name} placeholder is allowed"""
+    parts = []
+    current = ''
+    for literal, field, spec, conversion in Formatter().parse(text):
+        current += literal
+        if field is None:
+            continue
+        if field != PLACEHOLDER or spec or conversion:
+            raise ValueError(f"unsupported placeholder {{{field}}}")
+        parts.append(current)
+        current = ''
+    parts.append(current)
+    return CompiledTemplate(tuple(parts))
+
+
+class TemplateRegistry:
+    """Compiled message templates grouped by mood
+
+    Templates are compiled once when loaded; picking one is a single
+    ``randrange`` over a tuple, so pools can grow to thousands per mood
+    without any per-call cost.
+    """
+
+    def __init__(self, templates_file: Optional[str] = None, rng: Optional[random.Random] = None):
+        self.templates_file = templates_file
+        self.rng = rng or random.Random()
+        self.templates: Dict[str, Tuple[CompiledTemplate, ...]] = {}
+        self.load(templates_file)
+
+    def load(self, templates_file: Optional[str] = None):
+        """Load and compile templates, falling back to a built-in set on error"""
+        raw = FALLBACK_TEMPLATES
+        if templates_file:
+            try:
+                if os.path.exists(templates_file):
+                    with open(templates_file, 'r', encoding='utf-8') as f:
+                        raw = json.load(f)
+                else:
+                    logger.warning(f"Templates file not found: {templates_file}")
+            except Exception as e:
+                logger.error(f"Error loading templates: {e}")
+
+        self.templates = self.compile_all(raw)
+        if DEFAULT_MOOD not in self.templates:
+            self.templates[DEFAULT_MOOD] = self.compile_all(FALLBACK_TEMPLATES)[DEFAULT_MOOD]
+        logger.info(f"Loaded {self.count()} message templates for {len(self.templates)} moods")
+
+    @staticmethod
+    def compile_all(raw: Dict[str, List[str]]) -> Dict[str, Tuple[CompiledTemplate, ...]]:
+        """Compile every mood's templates, skipping invalid ones"""
+        compiled = {}
+        for mood, texts in raw.items():
+            pool = []
+            for text in texts:
+                try:
+                    pool.append(compile_template(text))
+                except ValueError as e:
+                    logger.warning(f"Skipping {mood} template: {e}")
+            if pool:
+                compiled[mood] = tuple(pool)
+        return compiled
+
+    def render(self, mood_theme: str, name: str) -> str:
+        """Render a random template for the mood (unknown moods use uplift)"""
+        pool = self.templates.get(mood_theme) or self.templates[DEFAULT_MOOD]
+        return pool[self.rng.randrange(len(pool))].render(name)
+
+    def moods(self) -> List[str]:
+        return list(self.templates)
+
+    def count(self, mood_theme: Optional[str] = None) -> int:
+        """Number of templates for one mood, or in total"""
+        if mood_theme is not None:
+            return len(self.templates.get(mood_theme, ()))
+        return sum(len(pool) for pool in self.templates.values())
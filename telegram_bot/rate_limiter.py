@@ -0,0 +1,211 @@
+"""
+Outbound rate limiting for KindWords Telegram Bot
+Schedules Bot API requests through global and per-chat token buckets so
+bursts stay under Telegram's flood limits, serving callback answers before
+replies and replies before bulk sends
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Request priorities; lower is sent first. Pass one as ``rate_limit_args``
+# to a bot method to override the default for its endpoint.
+PRIORITY_CALLBACK = 0   # answerCallbackQuery: the user's button spinner is waiting
+PRIORITY_REPLY = 1      # Replies and edits in response to an update
+PRIORITY_BULK = 2       # Broadcasts and other sends nobody is waiting on
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is now)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class PriorityRateLimiter(BaseRateLimiter[int]):
+    """Token-bucket rate limiter with a priority queue for the global limit
+
+    Requests that carry a ``chat_id`` first wait on that chat's bucket
+    (private and group chats have separate limits), then on the global
+    bucket. When global tokens run short, waiting requests are released in
+    priority order. A ``RetryAfter`` from Telegram pauses all sending for
+    the requested time before the request is retried.
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: int = 3,
+                 group_per_minute: int = 20, max_retries: int = 3, delay_samples: int = 1000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60.0
+        self.group_burst = max(1, group_per_minute // 3)
+        self.max_retries = max_retries
+
+        self._chats: Dict[Union[int, str], list] = {}  # chat_id -> [bucket, lock]
+        self._next_prune = time.monotonic() + 60
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self.requests = 0
+        self.retry_afters = 0
+        self._delays = {priority: deque(maxlen=delay_samples)
+                        for priority in (PRIORITY_CALLBACK, PRIORITY_REPLY, PRIORITY_BULK)}
+        self.max_delay = 0.0
+
+    async def initialize(self) -> None:
+        """Nothing to set up; the dispatcher starts on first use"""
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        if rate_limit_args is not None:
+            priority = rate_limit_args
+        elif endpoint == 'answerCallbackQuery':
+            priority = PRIORITY_CALLBACK
+        else:
+            priority = PRIORITY_REPLY
+        chat_id = data.get('chat_id')
+        self.requests += 1
+
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+            if chat_id is not None:
+                await self._acquire_chat(chat_id)
+            await self._acquire_global(priority)
+            self._record_delay(priority, time.monotonic() - queued_at)
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retry_afters += 1
+                retry_after = float(e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Flood control on {endpoint}, pausing sends for {retry_after}s")
+
+    async def _acquire_chat(self, chat_id: Union[int, str]):
+        """Wait for this chat's bucket; one waiter at a time keeps chat order"""
+        now = time.monotonic()
+        entry = self._chats.get(chat_id)
+        if entry is None:
+            if now >= self._next_prune:
+                self._prune(now)
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_rate, self.group_burst) if group else \
+                TokenBucket(self.chat_rate, self.chat_burst)
+            entry = self._chats[chat_id] = [bucket, asyncio.Lock()]
+
+        bucket, lock = entry
+        async with lock:
+            while True:
+                now = time.monotonic()
+                wait = max(bucket.wait_time(now), self._paused_until - now)
+                if wait <= 0:
+                    bucket.take()
+                    return
+                await asyncio.sleep(wait)
+
+    def _prune(self, now: float):
+        """Forget chats whose buckets have refilled and have no waiters"""
+        for chat_id in [chat_id for chat_id, (bucket, lock) in self._chats.items()
+                        if not lock.locked() and bucket.is_full(now)]:
+            del self._chats[chat_id]
+        self._next_prune = now + 60
+
+    async def _acquire_global(self, priority: int):
+        now = time.monotonic()
+        if not self._waiters and now >= self._paused_until and self.global_bucket.wait_time(now) == 0:
+            self.global_bucket.take()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        """Hand out global tokens to waiters, most urgent first"""
+        while self._waiters:
+            now = time.monotonic()
+            wait = max(self.global_bucket.wait_time(now), self._paused_until - now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # Caller gave up
+            self.global_bucket.take()
+            future.set_result(None)
+
+    def _record_delay(self, priority: int, delay: float):
+        samples = self._delays.get(priority)
+        if samples is None:
+            samples = self._delays[priority] = deque(maxlen=self._delays[PRIORITY_REPLY].maxlen)
+        samples.append(delay)
+        if delay > self.max_delay:
+            self.max_delay = delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queueing delay and flood-control metrics for monitoring"""
+        delays = {}
+        for priority, samples in self._delays.items():
+            ordered = sorted(samples)
+            delays[priority] = {
+                'avg_ms': round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+                'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2) if ordered else 0.0
+            }
+        return {
+            'requests': self.requests,
+            'queued': len(self._waiters),
+            'chats_tracked': len(self._chats),
+            'retry_afters': self.retry_afters,
+            'paused': self._paused_until > time.monotonic(),
+            'delay_by_priority': delays,
+            'max_delay_ms': round(self.max_delay * 1000, 2)
+        }
@@ -0,0 +1,413 @@
+"""
+Conversation session storage for KindWords Telegram Bot
+Bounded, idle-expiring store for the /create flow state of each user, plus
+pluggable persistent backends so several bot processes can share sessions
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from analytics_db import apply_pragmas
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """State of one user's /create conversation"""
+
+    __slots__ = ('step', 'friend_name', 'mood_theme', 'start_time', 'last_access')
+
+    def __init__(self, step: str = 'waiting_for_name', friend_name: Optional[str] = None,
+                 mood_theme: Optional[str] = None, start_time: Optional[float] = None):
+        self.step = step
+        self.friend_name = friend_name
+        self.mood_theme = mood_theme
+        # Plain floats are a fraction of the size of datetime objects
+        self.start_time = start_time or time.time()
+        self.last_access = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Session fields for analytics logging"""
+        return {
+            'step': self.step,
+            'friend_name': self.friend_name,
+            'mood_theme': self.mood_theme,
+            'start_time': datetime.fromtimestamp(self.start_time).isoformat()
+        }
+
+    def to_json(self) -> str:
+        """Serialize for a persistent backend"""
+        return json.dumps([self.step, self.friend_name, self.mood_theme, self.start_time])
+
+    @classmethod
+    def from_json(cls, data: str) -> 'Session':
+        """Rebuild a session serialized with to_json"""
+        step, friend_name, mood_theme, start_time = json.loads(data)
+        return cls(step, friend_name, mood_theme, start_time)
+
+
+class SessionStore:
+    """Sessions keyed by user id with idle expiry and LRU eviction
+
+    A session expires ``idle_ttl`` seconds after it was last read or written,
+    or after its own ttl if it was stored with one. When more than
+    ``max_sessions`` are live, the least recently used one is evicted.
+    Entries are kept in access order, so ``sweep()`` only has to look at the
+    stale end of the store plus the (usually few) sessions with their own ttl.
+    """
+
+    def __init__(self, idle_ttl: float = 1800, max_sessions: int = 100000):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[int, Session]" = OrderedDict()
+        self._ttls: Dict[int, float] = {}      # Sessions stored with a non-default ttl
+
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, user_id: int) -> Session:
+        """Start a fresh session for a user, replacing any existing one"""
+        return self.put(user_id, Session())
+
+    def put(self, user_id: int, session: Session, ttl: Optional[float] = None) -> Session:
+        """Store a session for a user and reset its idle timer (``ttl`` overrides idle_ttl)"""
+        session.last_access = time.monotonic()
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        if ttl is None:
+            self._ttls.pop(user_id, None)
+        else:
+            self._ttls[user_id] = ttl
+
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self._ttls.pop(evicted_id, None)
+            self.evicted += 1
+        return session
+
+    def get(self, user_id: int) -> Optional[Session]:
+        """Return a live session and refresh its idle timer, or None"""
+        session = self._sessions.get(user_id)
+        if session is None:
+            return None
+
+        now = time.monotonic()
+        if now - session.last_access > self._ttls.get(user_id, self.idle_ttl):
+            self.delete(user_id)
+            self.expired += 1
+            return None
+
+        session.last_access = now
+        self._sessions.move_to_end(user_id)
+        return session
+
+    def delete(self, user_id: int):
+        """Drop a user's session if there is one"""
+        self._sessions.pop(user_id, None)
+        self._ttls.pop(user_id, None)
+
+    def sweep(self) -> int:
+        """Remove every idle-expired session, returns how many were removed"""
+        now = time.monotonic()
+        cutoff = now - self.idle_ttl
+        expired = []
+        for user_id, session in self._sessions.items():
+            ttl = self._ttls.get(user_id)
+            if ttl is None:
+                if session.last_access > cutoff:
+                    break
+                expired.append(user_id)
+            elif now - session.last_access > ttl:
+                expired.append(user_id)
+        # Sessions with a shorter ttl of their own can sit past the stop point
+        seen = set(expired)
+        expired += [user_id for user_id, ttl in self._ttls.items()
+                    if user_id not in seen and now - self._sessions[user_id].last_access > ttl]
+
+        for user_id in expired:
+            self.delete(user_id)
+        self.expired += len(expired)
+        return len(expired)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get session counters for monitoring"""
+        return {
+            'active': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+class SessionBackend(ABC):
+    """Async session storage shared by the bot handlers
+
+    ``set`` must be called after changing a session so persistent backends
+    see the change; ``ttl`` is the idle lifetime in seconds.
+    """
+
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[Session]:
+        """Return a live session or None"""
+
+    @abstractmethod
+    async def set(self, user_id: int, session: Session, ttl: Optional[float] = None):
+        """Store a session, expiring it ``ttl`` seconds from now"""
+
+    @abstractmethod
+    async def delete(self, user_id: int):
+        """Drop a user's session"""
+
+    async def sweep(self) -> int:
+        """Remove expired sessions, returns how many were removed"""
+        return 0
+
+    async def close(self):
+        """Release any resources held by the backend"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend counters for monitoring"""
+        return {}
+
+
+class MemorySessionBackend(SessionBackend):
+    """Sessions held in this process only, lost on restart"""
+
+    def __init__(self, idle_ttl: float = 1800, max_sessions: int = 100000):
+        self.store = SessionStore(idle_ttl=idle_ttl, max_sessions=max_sessions)
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        return self.store.get(user_id)
+
+    async def set(self, user_id: int, session: Session, ttl: Optional[float] = None):
+        self.store.put(user_id, session, ttl)
+
+    async def delete(self, user_id: int):
+        self.store.delete(user_id)
+
+    async def sweep(self) -> int:
+        return self.store.sweep()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.store.get_stats()
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a SQLite table, shared by every process using the file
+
+    Queries run on a worker thread so the event loop never waits on disk.
+    """
+
+    def __init__(self, db_path: str = "telegram_bot/data/sessions.db", idle_ttl: float = 1800):
+        self.db_path = db_path
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        apply_pragmas(self._conn)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    user_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    async def _run(self, fn, *args):
+        """Run a blocking database call on the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _get(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE user_id = ? AND expires_at > ?", (user_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, user_id: int, data: str, expires_at: float):
+        with self._lock, self._conn:
+            self._conn.execute('''
+                INSERT INTO sessions (user_id, data, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+            ''', (user_id, data, expires_at))
+
+    def _delete(self, user_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def _sweep(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        data = await self._run(self._get, user_id)
+        return Session.from_json(data) if data else None
+
+    async def set(self, user_id: int, session: Session, ttl: Optional[float] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.idle_ttl)
+        await self._run(self._set, user_id, session.to_json(), expires_at)
+
+    async def delete(self, user_id: int):
+        await self._run(self._delete, user_id)
+
+    async def sweep(self) -> int:
+        return await self._run(self._sweep)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FakeKeyValueStore:
+    """In-process stand-in for a Redis-like server
+
+    Implements the subset of the ``redis.asyncio`` client API the key-value
+    backend uses (get, set with ``ex``, delete), with per-key expiry. Redis
+    evicts expired keys itself; here ``sweep()`` does it, otherwise keys that
+    are never read again would stay forever.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[float] = None):
+        self._data[key] = (value, time.monotonic() + ex if ex is not None else None)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def sweep(self) -> int:
+        """Remove every expired key, returns how many were removed"""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._data.items()
+                   if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+
+
+class KeyValueSessionBackend(SessionBackend):
+    """Sessions in a Redis-like key-value store, expiry handled by the store"""
+
+    def __init__(self, client: Any, idle_ttl: float = 1800, prefix: str = 'kindwords:session:'):
+        self.client = client
+        self.idle_ttl = idle_ttl
+        self.prefix = prefix
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        data = await self.client.get(f"{self.prefix}{user_id}")
+        if data is None:
+            return None
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return Session.from_json(data)
+
+    async def set(self, user_id: int, session: Session, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.idle_ttl
+        await self.client.set(f"{self.prefix}{user_id}", session.to_json(), ex=max(1, int(ttl)))
+
+    async def delete(self, user_id: int):
+        await self.client.delete(f"{self.prefix}{user_id}")
+
+    async def sweep(self) -> int:
+        # A real server expires keys on its own; the in-process fake needs a sweep
+        if hasattr(self.client, 'sweep'):
+            return await self.client.sweep()
+        return 0
+
+
+class CachedSessionBackend(SessionBackend):
+    """Read-through, write-through cache in front of a persistent backend
+
+    Sessions this process read or wrote in the last ``local_ttl`` seconds are
+    served from memory; only misses go to the backend. A session changed by
+    another process is not seen until the local copy expires, so workers
+    without per-user routing should disable the local tier (``local_ttl=0``).
+    """
+
+    def __init__(self, backend: SessionBackend, local_ttl: float = 30, max_local: int = 10000):
+        self.backend = backend
+        self.local = LRUCache(max_size=max_local, ttl=local_ttl)
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        session = self.local.get(user_id)
+        if session is not None:
+            return session
+
+        session = await self.backend.get(user_id)
+        if session is not None:
+            self.local.set(user_id, session)
+        return session
+
+    async def set(self, user_id: int, session: Session, ttl: Optional[float] = None):
+        self.local.set(user_id, session)
+        await self.backend.set(user_id, session, ttl)
+
+    async def delete(self, user_id: int):
+        self.local.invalidate(user_id)
+        await self.backend.delete(user_id)
+
+    async def sweep(self) -> int:
+        return await self.backend.sweep()
+
+    async def close(self):
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get local cache counters for monitoring"""
+        return self.local.get_stats()
+
+
+def create_session_backend(kind: str = 'memory', idle_ttl: float = 1800, max_sessions: int = 100000,
+                           db_path: str = "telegram_bot/data/sessions.db",
+                           local_ttl: float = 30) -> SessionBackend:
+    """Build the session backend selected in configuration
+
+    ``memory`` keeps sessions in this process; ``sqlite`` and ``kv`` (the
+    in-process fake key-value store) persist them, fronted by a local
+    read-through cache unless ``local_ttl`` is 0.
+    """
+    if kind == 'memory':
+        return MemorySessionBackend(idle_ttl=idle_ttl, max_sessions=max_sessions)
+    if kind == 'sqlite':
+        backend = SQLiteSessionBackend(db_path=db_path, idle_ttl=idle_ttl)
+    elif kind == 'kv':
+        backend = KeyValueSessionBackend(FakeKeyValueStore(), idle_ttl=idle_ttl)
+    else:
+        raise ValueError(f"Unknown session backend: {kind}")
+
+    logger.info(f"Using {kind} session backend")
+    if local_ttl <= 0:
+        return backend
+    return CachedSessionBackend(backend, local_ttl=min(local_ttl, idle_ttl), max_local=max_sessions)
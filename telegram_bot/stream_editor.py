@@ -0,0 +1,79 @@
+"""
+Progressive message edits for KindWords Telegram Bot
+Shows a streaming AI response by editing one Telegram message at a limited
+rate, coalescing the chunks that arrive in between edits
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottledEditor:
+    """Rate-limited edits of a single message
+
+    ``update`` edits at most once per ``min_interval`` seconds and simply
+    drops text that arrives sooner; the next update or ``finish`` carries
+    the newer text. Flood-control waits from Telegram push the next edit
+    back. Partial edits are best effort, but ``finish`` always delivers the
+    final text, waiting out any flood-control delay first.
+    """
+
+    def __init__(self, edit: Callable[..., Awaitable[Any]], min_interval: float = 1.0):
+        self.edit = edit
+        self.min_interval = min_interval
+        self._next_edit_at = 0.0
+        self._retry_until = 0.0
+        self._last_text = None
+        self._disabled = False
+
+        self.edits = 0
+        self.coalesced = 0
+
+    async def update(self, text: str):
+        """Show partial text if an edit is due"""
+        if self._disabled or text == self._last_text:
+            return
+        now = time.monotonic()
+        if now < self._next_edit_at or now < self._retry_until:
+            self.coalesced += 1
+            return
+
+        try:
+            await self.edit(text)
+        except RetryAfter as e:
+            self._retry_until = time.monotonic() + float(e.retry_after)
+            return
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                logger.warning(f"Stopping streamed edits: {e}")
+                self._disabled = True
+            return
+        except TelegramError as e:
+            logger.warning(f"Stopping streamed edits: {e}")
+            self._disabled = True
+            return
+
+        self._last_text = text
+        self.edits += 1
+        self._next_edit_at = time.monotonic() + self.min_interval
+
+    async def finish(self, text: str, attempts: int = 3, **kwargs):
+        """Deliver the final text (with any markup), retrying on flood control"""
+        for attempt in range(attempts):
+            delay = self._retry_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                result = await self.edit(text, **kwargs)
+                self.edits += 1
+                return result
+            except RetryAfter as e:
+                if attempt == attempts - 1:
+                    raise
+                self._retry_until = time.monotonic() + float(e.retry_after)
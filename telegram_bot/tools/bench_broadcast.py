@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Daily broadcast load test against a local fake Bot API
+Fills a scratch subscriptions database, starts delivering one hour's
+subscribers through an ExtBot with PriorityRateLimiter, kills the run part
+way through, then resumes it with a fresh store and broadcaster. Reports
+throughput and checks that no chat received more than one message.
+
+    python tools/bench_broadcast.py --subscribers 200000 --crash-after 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram.ext import ExtBot
+from telegram.request import HTTPXRequest
+
+from broadcast import DailyBroadcaster, SubscriptionStore
+from fake_bot_api import FakeBotAPI
+from rate_limiter import PRIORITY_BULK, PriorityRateLimiter
+
+DAY = '2024-01-01'
+HOUR = 9
+FIRST_CHAT = 1000000
+
+
+def populate(db_path: str, subscribers: int) -> SubscriptionStore:
+    """Subscribe users to HOUR, plus a few at other hours that must not be sent"""
+    store = SubscriptionStore(db_path)
+    with store._lock:
+        store._conn.execute("BEGIN")
+        store._conn.executemany(
+            "INSERT INTO subscriptions (user_id, chat_id, hour, created_at) VALUES (?, ?, ?, 0)",
+            ((FIRST_CHAT + i, FIRST_CHAT + i, HOUR if i % 50 else (HOUR + 1) % 24) for i in range(subscribers))
+        )
+        store._conn.execute("COMMIT")
+    return store
+
+
+async def send(bot: ExtBot, user_id: int, chat_id: int, language_code: str = None):
+    await bot.send_message(chat_id, "☀️ Your daily compliment: you are wonderful!", rate_limit_args=PRIORITY_BULK)
+
+
+async def deliver(bot: ExtBot, db_path: str, args, crash_after: float = None):
+    """Run one broadcaster over the hour, cancelling it after ``crash_after`` seconds"""
+    store = SubscriptionStore(db_path)
+    broadcaster = DailyBroadcaster(store, batch_size=args.batch_size, max_in_flight=args.in_flight)
+    task = asyncio.create_task(broadcaster.deliver_hour(partial(send, bot), DAY, HOUR))
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(task, crash_after)
+        crashed = False
+    except asyncio.TimeoutError:
+        crashed = True
+    elapsed = time.perf_counter() - start
+    stats = broadcaster.get_stats()
+    store.close()
+    return crashed, elapsed, stats
+
+
+async def run(args):
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, 'subscriptions.db')
+    start = time.perf_counter()
+    store = populate(db_path, args.subscribers)
+    due = store.count(HOUR)
+    store.close()
+    print(f"{args.subscribers} subscribers ({due} due at {HOUR:02d}:00) written in "
+          f"{time.perf_counter() - start:.1f}s")
+
+    blocked = range(FIRST_CHAT, FIRST_CHAT + args.subscribers, args.blocked_every) if args.blocked_every else ()
+    api = FakeBotAPI(port=args.port, enforce_limits=True, global_rate=args.global_rate, blocked_chats=blocked)
+    await api.start()
+    limiter = PriorityRateLimiter(global_rate=args.global_rate * args.headroom)
+    bot = ExtBot('123:test', base_url=f'http://127.0.0.1:{args.port}/bot', rate_limiter=limiter,
+                 request=HTTPXRequest(connection_pool_size=args.connections))
+    try:
+        async with bot:
+            crashed, elapsed, first = await deliver(bot, db_path, args, args.crash_after)
+            sent_before = sum(api.delivered.values())
+            print(f"\nRun 1: {'killed' if crashed else 'finished'} after {elapsed:.1f}s, "
+                  f"{sent_before} delivered ({sent_before / elapsed:.0f}/s)")
+
+            _, elapsed, second = await deliver(bot, db_path, args)
+            sent_after = sum(api.delivered.values()) - sent_before
+            print(f"Run 2: resumed and finished in {elapsed:.1f}s, {sent_after} delivered "
+                  f"({sent_after / elapsed:.0f}/s)")
+    finally:
+        await api.stop()
+
+    store = SubscriptionStore(db_path)
+    with store._lock:
+        unsent = store._conn.execute(
+            "SELECT COUNT(*) FROM subscriptions WHERE hour = ? AND last_sent_day < ?", (HOUR, DAY)
+        ).fetchone()[0]
+    remaining = store.count()
+    store.close()
+
+    delivered = sum(api.delivered.values())
+    blocked_due = sum(1 for chat_id in blocked if (chat_id - FIRST_CHAT) % 50)
+    lost = due - delivered - blocked_due
+    print(f"\nDelivered {delivered} of {due} due; {blocked_due} blocked chats removed "
+          f"({args.subscribers - remaining} subscriptions deleted)")
+    print(f"In flight at the kill (not resent): {lost}; still unclaimed: {unsent}")
+    print(f"429s from API: {sum(api.rejected.values())}, max messages to one chat: "
+          f"{max(api.delivered.values(), default=0)}")
+    print(f"Off-hour chats messaged: "
+          f"{sum(1 for i in range(0, args.subscribers, 50) if api.delivered.get(str(FIRST_CHAT + i)))}")
+    print(f"Broadcaster run 2: {second}")
+    if max(api.delivered.values(), default=0) > 1:
+        print("FAIL: a chat received more than one daily compliment")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily broadcast load test")
+    parser.add_argument("--subscribers", type=int, default=200000, help="Subscribers to create")
+    parser.add_argument("--blocked-every", type=int, default=997, help="Every Nth chat has blocked the bot (0 = none)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Subscribers claimed per batch")
+    parser.add_argument("--in-flight", type=int, default=32, help="Concurrent sends")
+    parser.add_argument("--crash-after", type=float, default=5.0, help="Seconds before the first run is killed")
+    parser.add_argument("--global-rate", type=float, default=3000.0, help="Global limit the fake API enforces")
+    parser.add_argument("--headroom", type=float, default=0.9, help="Fraction of the global limit to use")
+    parser.add_argument("--connections", type=int, default=64, help="HTTP connection pool size")
+    parser.add_argument("--port", type=int, default=8096, help="Port for the in-process fake API")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
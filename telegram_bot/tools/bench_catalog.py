@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Compliment catalog benchmark: load time, memory and filtered sampling
+Writes a synthetic catalog with languages, categories and tags as JSON and
+as JSON Lines, then measures loading and indexing each, the memory the
+indexed catalog retains, filtered picks against a scan over the parsed
+entries, and how long a background reload of each stalls the event loop.
+
+    python tools/bench_catalog.py --entries 1000000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliment_catalog import ComplimentCatalog, load_catalog
+
+LANGUAGES = ['en', 'es', 'pt', 'de', 'fr']
+CATEGORIES = ['kindness', 'strength', 'joy', 'wisdom', 'connection', 'character', 'growth', 'courage']
+TAGS = [f'tag{i}' for i in range(20)]
+WORDS = "you bring warmth light courage kindness joy to every room and everyone around you".split()
+
+
+def write_catalogs(directory: str, entries: int, seed: int = 1) -> tuple:
+    """The same synthetic catalog as compliments.json and compliments.jsonl"""
+    rng = random.Random(seed)
+    json_path = os.path.join(directory, 'compliments.json')
+    jsonl_path = os.path.join(directory, 'compliments.jsonl')
+    with open(json_path, 'w', encoding='utf-8') as f, open(jsonl_path, 'w', encoding='utf-8') as lines:
+        f.write('{"language": "en", "compliments": [\n')
+        for i in range(entries):
+            entry = json.dumps({
+                'text': f"#{i} " + ' '.join(rng.choices(WORDS, k=rng.randint(8, 14))) + '.',
+                'language': rng.choice(LANGUAGES),
+                'category': rng.choice(CATEGORIES),
+                'tags': rng.sample(TAGS, rng.randint(0, 3))
+            })
+            f.write(entry + (',\n' if i < entries - 1 else '\n'))
+            lines.write(entry + '\n')
+        f.write(']}\n')
+    return json_path, jsonl_path
+
+
+def timed_load(path: str) -> tuple:
+    start = time.perf_counter()
+    catalog = load_catalog(path)
+    return catalog, time.perf_counter() - start
+
+
+def retained_bytes(path: str) -> int:
+    """Memory the indexed catalog keeps after the parsed JSON is released"""
+    gc.collect()
+    tracemalloc.start()
+    catalog = load_catalog(path)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del catalog
+    return size
+
+
+def raw_bytes(path: str) -> int:
+    """Memory of the parsed JSON entries kept as-is, for comparison"""
+    gc.collect()
+    tracemalloc.start()
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del raw
+    return size
+
+
+def bench_sampling(catalog: ComplimentCatalog, path: str, picks: int):
+    rng = random.Random(2)
+    filters = [(rng.choice(LANGUAGES), rng.choice(CATEGORIES), rng.choice(TAGS + [None])) for _ in range(picks)]
+
+    start = time.perf_counter()
+    for language, category, tag in filters:
+        catalog.sample(rng, language, category, tag)
+    indexed = (time.perf_counter() - start) / picks
+
+    with open(path, 'r', encoding='utf-8') as f:
+        items = json.load(f)['compliments']
+    scan_picks = max(1, picks // 1000)
+    start = time.perf_counter()
+    for language, category, tag in filters[:scan_picks]:
+        matches = [item['text'] for item in items
+                   if item['language'] == language and item['category'] == category
+                   and (tag is None or tag in item['tags'])]
+        if matches:
+            rng.choice(matches)
+    scan = (time.perf_counter() - start) / scan_picks
+    return indexed, scan
+
+
+async def reload_stall(path: str) -> tuple:
+    """Longest gap between event loop ticks while a reload runs in a thread"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    reload = loop.run_in_executor(None, load_catalog, path)
+    last = time.perf_counter()
+    ticks = 0
+    while not reload.done():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        worst = max(worst, now - last)
+        last = now
+        ticks += 1
+    await reload
+    return worst, ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compliment catalog benchmark")
+    parser.add_argument("--entries", type=int, default=1000000, help="Compliments in the synthetic catalog")
+    parser.add_argument("--picks", type=int, default=200000, help="Filtered picks to time")
+    args = parser.parse_args()
+
+    path, jsonl_path = write_catalogs(tempfile.mkdtemp(), args.entries)
+    print(f"Catalog: {args.entries} entries, {os.path.getsize(path) / 1e6:.0f} MB of JSON")
+
+    catalog, json_time = timed_load(path)
+    print(f"Load .json:  {json_time:.2f}s")
+    del catalog
+    gc.collect()
+    catalog, jsonl_time = timed_load(jsonl_path)
+    print(f"Load .jsonl: {jsonl_time:.2f}s")
+    print(f"  {catalog.get_stats()}")
+
+    indexed, scan = bench_sampling(catalog, path, args.picks)
+    print(f"Filtered pick (language + category + tag): indexed {indexed * 1e6:.2f} us, "
+          f"scan of parsed entries {scan * 1e3:.1f} ms ({scan / indexed:.0f}x)")
+    del catalog
+    gc.collect()
+
+    raw = raw_bytes(path)
+    kept = retained_bytes(path)
+    print(f"Memory: parsed JSON entries {raw / 1e6:.0f} MB, indexed catalog {kept / 1e6:.0f} MB "
+          f"({kept / args.entries:.0f} bytes/entry)")
+
+    for label, catalog_path in (('.json', path), ('.jsonl', jsonl_path)):
+        worst, ticks = asyncio.run(reload_stall(catalog_path))
+        print(f"Background reload of {label}: longest event loop stall {worst * 1000:.0f} ms over {ticks} ticks")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Binary catalog benchmark: startup time and memory, JSON vs memory-mapped
+Compiles a synthetic catalog, then starts fresh processes that each load
+it (as .json, .jsonl or the compiled .bin) and make some filtered picks,
+reporting load time and memory. Memory is read from /proc: RSS, the
+process's private memory, and PSS, which splits shared pages between the
+processes using them. Several processes are run at once to show sharing.
+
+    python tools/bench_catalog_mmap.py --entries 1000000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+sys.path.insert(0, TOOLS_DIR)
+
+
+def memory_kb() -> dict:
+    """RSS, private and proportional set size of this process"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def child(path: str, picks: int, hold: float):
+    """Load the catalog, make filtered picks, report timings and memory"""
+    start = time.perf_counter()
+    from compliment_catalog import load_catalog
+    imported = time.perf_counter()
+    before = memory_kb()
+    catalog = load_catalog(path)
+    loaded = time.perf_counter()
+
+    rng = random.Random(os.getpid())
+    languages, categories = catalog.values('language'), catalog.values('category')
+    for _ in range(picks):
+        catalog.sample(rng, rng.choice(languages), rng.choice(categories))
+    picked = time.perf_counter()
+
+    time.sleep(hold)  # Keep running while sibling processes map the same file
+    after = memory_kb()
+    print(json.dumps({
+        'import_s': imported - start,
+        'load_s': loaded - imported,
+        'picks_s': picked - loaded,
+        'memory_kb': {key: after[key] - before[key] for key in after}
+    }))
+
+
+def run_children(path: str, workers: int, picks: int) -> list:
+    hold = 2.0 if workers > 1 else 0.0
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', path,
+                               '--picks', str(picks), '--hold', str(hold)],
+                              stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+    return [json.loads(proc.communicate()[0]) for proc in procs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary catalog startup and memory benchmark")
+    parser.add_argument("--entries", type=int, default=1000000, help="Compliments in the synthetic catalog")
+    parser.add_argument("--workers", type=int, default=4, help="Processes loading the catalog at once")
+    parser.add_argument("--picks", type=int, default=10000, help="Filtered picks per process")
+    parser.add_argument("--child", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--hold", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.picks, args.hold)
+        return
+
+    from bench_catalog import write_catalogs
+    from compliment_catalog import load_catalog, write_binary_catalog
+
+    directory = tempfile.mkdtemp()
+    json_path, jsonl_path = write_catalogs(directory, args.entries)
+    bin_path = os.path.join(directory, 'compliments.bin')
+    start = time.perf_counter()
+    size = write_binary_catalog(load_catalog(jsonl_path), bin_path)
+    print(f"{args.entries} entries: JSON {os.path.getsize(json_path) / 1e6:.0f} MB, "
+          f"compiled {size / 1e6:.0f} MB in {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'format':<8}{'procs':>6}{'load s':>9}{'picks ms':>10}{'RSS MB':>9}{'private MB':>12}{'PSS MB':>9}")
+    for label, path in (('.json', json_path), ('.jsonl', jsonl_path), ('.bin', bin_path)):
+        for workers in (1, args.workers):
+            results = run_children(path, workers, args.picks)
+            load = max(r['load_s'] for r in results)
+            picks = max(r['picks_s'] for r in results) * 1000
+            # Totals across processes; PSS is what they cost the machine together
+            rss = sum(r['memory_kb']['rss'] for r in results) / 1024
+            private = sum(r['memory_kb']['private'] for r in results) / 1024
+            pss = sum(r['memory_kb']['pss'] for r in results) / 1024
+            print(f"{label:<8}{workers:>6}{load:>9.3f}{picks:>10.1f}{rss:>9.0f}{private:>12.0f}{pss:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Chart rendering benchmark
+Times ``analytics_viewer.py --charts`` against an analytics database (e.g.
+one left by tools/bench_report.py): drawing every chart in one worker, in
+one worker per chart, and a repeat run where every chart is already cached.
+
+    python tools/bench_charts.py --db /tmp/bench_report.db
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+VIEWER = os.path.join(os.path.dirname(TOOLS_DIR), 'analytics_viewer.py')
+
+
+def run(db_path: str, chart_dir: str, *args) -> float:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, VIEWER, '--db', db_path, '--charts', '--chart-dir', chart_dir, *args],
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode or '❌' in proc.stdout:
+        raise SystemExit(f"--charts {' '.join(args)} failed:\n{proc.stdout}{proc.stderr[-2000:]}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart rendering benchmark")
+    parser.add_argument("--db", type=str, required=True, help="Analytics database to chart")
+    parser.add_argument("--source", choices=['auto', 'rollups', 'scan'], default='auto',
+                        help="Where chart data comes from")
+    args = parser.parse_args()
+
+    chart_dir = tempfile.mkdtemp()
+    print(f"{os.cpu_count()} CPUs, charts from {args.db}\n")
+    print(f"{'run':<28}{'seconds':>9}")
+    for label, extra in [('1 worker, all drawn', ['--workers', '1', '--force']),
+                         ('1 worker per chart', ['--force']),
+                         ('unchanged data (cached)', [])]:
+        print(f"{label:<28}{run(args.db, chart_dir, '--source', args.source, *extra):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Event log benchmark: per-batch CSV append vs segmented event log
+Writes the same synthetic interactions the old way (reopening
+user_interactions.csv in append mode for every batch) and through the
+segmented log, at a few batch sizes. Reports events/sec on the writing thread
+(compression runs in the background and is timed separately), what ends up
+on disk once closed segments are compressed, and how fast read_events
+streams the log back.
+
+    python tools/bench_event_log.py --events 200000
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+from event_log import SegmentedEventLog, read_events
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+ACTIONS = ['start', 'create_message', 'mood_selected', 'message_generated', 'view_stats']
+
+
+def make_events(count: int) -> list:
+    rng = random.Random(42)
+    return [{
+        'timestamp': datetime.now().isoformat(),
+        'user_id': rng.randrange(100000, 200000),
+        'username': f"user{rng.randrange(100000)}",
+        'first_name': rng.choice(['Ann', 'Bo', 'Chen', 'Dara', 'Eli']),
+        'last_name': None,
+        'action': rng.choice(ACTIONS),
+        'recipient_name': rng.choice(['Sam', 'Alex', 'Mom', None]),
+        'mood_choice': rng.choice(MOODS),
+        'message_generated': rng.random() < 0.3
+    } for _ in range(count)]
+
+
+def write_csv(path: str, batches: list):
+    """What AnalyticsLogger._log_to_csv did for every batch"""
+    for batch in batches:
+        with open(path, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerows([
+                event['timestamp'], event['user_id'], event['username'] or '', event['first_name'] or '',
+                event['last_name'] or '', event['action'], event['recipient_name'] or '',
+                event['mood_choice'] or '', event['message_generated']
+            ] for event in batch)
+
+
+def write_segments(directory: str, batches: list, segment_bytes: int) -> tuple:
+    """Seconds spent appending, then seconds until every segment is compressed"""
+    start = time.perf_counter()
+    log = SegmentedEventLog(directory, max_segment_bytes=segment_bytes)
+    for batch in batches:
+        log.append(batch)
+    appended = time.perf_counter() - start
+    log.close()
+    # Compress the final segment too, as the next start would
+    SegmentedEventLog(directory).close()
+    return appended, time.perf_counter() - start - appended
+
+
+def disk_mb(path: str) -> float:
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event log benchmark")
+    parser.add_argument("--events", type=int, default=200000, help="Events to write per run")
+    parser.add_argument("--batch-sizes", type=str, default="1,10,100", help="Events per append")
+    parser.add_argument("--segment-mb", type=float, default=8, help="Segment rotation size")
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    print(f"{args.events:,} events\n")
+    print(f"{'writer':<22}{'batch':>6}{'events/sec':>12}{'on disk MB':>12}{'compress s':>12}")
+    for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+        batches = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+        directory = tempfile.mkdtemp()
+
+        csv_path = os.path.join(directory, 'user_interactions.csv')
+        start = time.perf_counter()
+        write_csv(csv_path, batches)
+        elapsed = time.perf_counter() - start
+        print(f"{'csv append':<22}{batch_size:>6}{args.events / elapsed:>12,.0f}{disk_mb(csv_path):>12.1f}")
+
+        segments = os.path.join(directory, 'events')
+        appended, compressed = write_segments(segments, batches, int(args.segment_mb * 1e6))
+        print(f"{'segmented log':<22}{batch_size:>6}{args.events / appended:>12,.0f}{disk_mb(segments):>12.1f}"
+              f"{compressed:>12.2f}")
+
+    start = time.perf_counter()
+    count = sum(1 for _ in read_events(segments))
+    elapsed = time.perf_counter() - start
+    print(f"\nread_events: {count:,} events in {elapsed:.2f}s ({count / elapsed:,.0f} events/sec)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Export benchmark: pandas read_sql_query vs the streaming exporter
+Exports an analytics database (e.g. one left by tools/bench_report.py) the
+old way, loading everything into a DataFrame, and with the streaming
+exporter in each format. Every export runs in a fresh process (with SQLite's
+mmap off) so its peak RSS can be reported alongside wall time, rows/sec and
+file size.
+
+    python tools/bench_export.py --db /tmp/bench_report.db
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+PANDAS_SQL = '''
+    SELECT user_id, username, first_name, last_name, timestamp, action,
+           recipient_name, mood_choice, message_generated
+    FROM user_interactions ORDER BY timestamp
+'''
+
+
+def child(db_path: str, mode: str, path: str):
+    from analytics_db import connect_readonly
+    conn = connect_readonly(db_path)
+    # Mapped database pages would count towards RSS; leave them out
+    conn.execute("PRAGMA mmap_size = 0")
+    if mode == 'pandas':
+        import pandas as pd
+        pd.read_sql_query(PANDAS_SQL, conn).to_csv(path, index=False)
+    else:
+        from analytics_export import export_interactions
+        export_interactions(conn, path, mode)
+    conn.close()
+
+
+def run(db_path: str, mode: str, path: str) -> tuple:
+    """(seconds, peak RSS in MB) of one export in a fresh process"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--db', db_path,
+                             '--child', mode, '--out', path])
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status:
+        raise SystemExit(f"{mode} export failed")
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--db", type=str, required=True, help="Analytics database to export")
+    parser.add_argument("--formats", type=str, default="csv,csv.gz,jsonl,jsonl.gz,parquet,feather",
+                        help="Streaming formats to time (parquet/feather need pyarrow)")
+    parser.add_argument("--child", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--out", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.db, args.child, args.out)
+        return
+
+    import sqlite3
+    rows = sqlite3.connect(args.db).execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+    directory = tempfile.mkdtemp()
+    print(f"{rows:,} interactions in {args.db}\n")
+    print(f"{'export':<18}{'seconds':>9}{'rows/sec':>11}{'peak RSS MB':>13}{'file MB':>9}")
+
+    modes = ['pandas'] + [fmt for fmt in args.formats.split(',') if fmt]
+    for mode in modes:
+        path = os.path.join(directory, f"export.{'csv' if mode == 'pandas' else mode}")
+        try:
+            elapsed, rss = run(args.db, mode, path)
+        except SystemExit as e:
+            print(f"{mode:<18}{str(e):>9}")
+            continue
+        label = 'pandas (csv)' if mode == 'pandas' else f'streaming {mode}'
+        print(f"{label:<18}{elapsed:>9.1f}{rows / elapsed:>11,.0f}{rss:>13.0f}"
+              f"{os.path.getsize(path) / 1e6:>9.0f}")
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Gemini client load test against tools/fake_gemini_api.py
+Starts the stub in-process with the given latency and failure mix, fires
+concurrent generations with a deadline and reports how many fell back to
+templates, end-to-end latency, and the peak in-flight calls the stub saw.
+
+    python tools/bench_gemini.py --calls 500 --error-rate 0.1 --slow-rate 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini_api import FakeGeminiAPI
+from gemini_client import GeminiClient, GenerationError, build_prompt
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+
+
+async def run(args):
+    api = FakeGeminiAPI(port=args.port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                        slow_rate=args.slow_rate, slow_latency=args.deadline * 4, seed=args.seed)
+    await api.start()
+    client = GeminiClient('test-key', base_url=f'http://127.0.0.1:{args.port}/v1beta',
+                          request_timeout=args.request_timeout, max_concurrent=args.max_concurrent,
+                          max_retries=args.max_retries)
+    latencies, fallbacks = [], []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        try:
+            await client.generate(build_prompt(f'User{i}', MOODS[i % len(MOODS)]), timeout=args.deadline)
+        except GenerationError as e:
+            fallbacks.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.calls)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.close()
+        await api.stop()
+
+    latencies.sort()
+    print(f"{args.calls} generations in {elapsed:.2f}s ({args.calls / elapsed:,.1f}/s), "
+          f"deadline {args.deadline}s, {args.max_concurrent} in flight max")
+    print(f"  AI messages: {args.calls - len(fallbacks)}  template fallbacks: {len(fallbacks)}")
+    print(f"  latency s: p50={statistics.median(latencies):.2f} "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.2f} max={latencies[-1]:.2f}")
+    print(f"  client: {client.get_stats()}")
+    print(f"  stub: responses={dict(api.responses)} max_in_flight={api.max_in_flight}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini client load test")
+    parser.add_argument("--calls", type=int, default=300, help="Concurrent generations")
+    parser.add_argument("--port", type=int, default=8092, help="Port for the in-process stub")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub base latency")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Stub latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05, help="Fraction of 429 responses")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Fraction of hanging calls")
+    parser.add_argument("--deadline", type=float, default=8.0, help="Per-message deadline")
+    parser.add_argument("--request-timeout", type=float, default=5.0, help="Per-attempt timeout")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="Client in-flight cap")
+    parser.add_argument("--max-retries", type=int, default=2, help="Retries per generation")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
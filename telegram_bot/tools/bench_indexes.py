@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /stats and daily-stats query latency before and after migrations
+Builds a synthetic user_interactions table with the original schema, times the
+original queries, applies the schema migrations, then times the rewritten
+queries against the new indexes.
+
+    python tools/bench_indexes.py --rows 10000000 --db /tmp/bench_10m.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_db import apply_pragmas
+from analytics_migrations import MIGRATIONS, apply_migrations
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+ACTIONS = ['start_command', 'create_command', 'recipient_name_entered', 'mood_selected', 'message_generated']
+
+USER_STATS_SQL = '''
+    SELECT COUNT(*), COUNT(CASE WHEN message_generated = 1 THEN 1 END), MIN(timestamp)
+    FROM user_interactions WHERE user_id = ?
+'''
+FAVORITE_MOOD_SQL = '''
+    SELECT mood_choice, COUNT(*) as count FROM user_interactions
+    WHERE user_id = ? AND mood_choice IS NOT NULL
+    GROUP BY mood_choice ORDER BY count DESC LIMIT 1
+'''
+DAILY_BEFORE_SQL = '''
+    SELECT COUNT(*), COUNT(DISTINCT user_id), COUNT(CASE WHEN message_generated = 1 THEN 1 END)
+    FROM user_interactions WHERE DATE(timestamp) = ?
+'''
+DAILY_MOOD_BEFORE_SQL = '''
+    SELECT mood_choice, COUNT(*) as count FROM user_interactions
+    WHERE DATE(timestamp) = ? AND mood_choice IS NOT NULL
+    GROUP BY mood_choice ORDER BY count DESC LIMIT 1
+'''
+DAILY_AFTER_SQL = DAILY_BEFORE_SQL.replace("DATE(timestamp) = ?", "day = ?")
+DAILY_MOOD_AFTER_SQL = DAILY_MOOD_BEFORE_SQL.replace("DATE(timestamp) = ?", "day = ?")
+MOOD_POPULARITY_SQL = '''
+    SELECT mood_choice, COUNT(*) FROM user_interactions
+    WHERE mood_choice IS NOT NULL GROUP BY mood_choice
+'''
+
+
+def build_database(db_path: str, rows: int, users: int, days: int):
+    """Create the pre-migration schema and fill it with synthetic rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    apply_pragmas(conn)
+    conn.execute("BEGIN")
+    MIGRATIONS[0][2](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("COMMIT")
+
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=days)
+    span = days * 86400
+    chunk = 100000
+    for offset in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - offset)):
+            mood = rng.choice(MOODS) if rng.random() < 0.4 else None
+            batch.append((
+                rng.randrange(users), 'user', 'Test', None,
+                (start + timedelta(seconds=rng.randrange(span))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                rng.choice(ACTIONS), 'Alex', mood, mood is not None and rng.random() < 0.8
+            ))
+        conn.executemany('''
+            INSERT INTO user_interactions
+            (user_id, username, first_name, last_name, timestamp, action,
+             recipient_name, mood_choice, message_generated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+    conn.close()
+
+
+def time_query(conn: sqlite3.Connection, sql: str, params_list) -> float:
+    """Average latency in milliseconds over the given parameter sets"""
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) * 1000 / len(params_list)
+
+
+def run_queries(conn: sqlite3.Connection, user_ids, day_list, daily_sql, daily_mood_sql):
+    """Time every query shape the bot and viewer issue"""
+    return [
+        ("user stats", time_query(conn, USER_STATS_SQL, [(u,) for u in user_ids])),
+        ("favorite mood", time_query(conn, FAVORITE_MOOD_SQL, [(u,) for u in user_ids])),
+        ("daily totals", time_query(conn, daily_sql, [(d,) for d in day_list])),
+        ("daily top mood", time_query(conn, daily_mood_sql, [(d,) for d in day_list])),
+        ("mood popularity", time_query(conn, MOOD_POPULARITY_SQL, [()])),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency before/after analytics migrations")
+    parser.add_argument("--rows", type=int, default=10000000, help="Synthetic rows to generate")
+    parser.add_argument("--users", type=int, default=200000, help="Distinct user ids")
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--db", type=str, default="bench_indexes.db", help="Scratch database path")
+    parser.add_argument("--samples", type=int, default=20, help="Parameter sets per query")
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    print(f"Building {args.rows:,} rows in {args.db}...")
+    start = time.perf_counter()
+    build_database(args.db, args.rows, args.users, args.days)
+    print(f"Built in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    user_ids = [rng.randrange(args.users) for _ in range(args.samples)]
+    today = datetime.now()
+    day_list = [(today - timedelta(days=rng.randrange(args.days))).strftime('%Y-%m-%d')
+                for _ in range(args.samples)]
+
+    conn = sqlite3.connect(args.db)
+    apply_pragmas(conn)
+    before = run_queries(conn, user_ids, day_list, DAILY_BEFORE_SQL, DAILY_MOOD_BEFORE_SQL)
+
+    start = time.perf_counter()
+    apply_migrations(conn)
+    migrate_seconds = time.perf_counter() - start
+    conn.execute("ANALYZE")
+
+    after = run_queries(conn, user_ids, day_list, DAILY_AFTER_SQL, DAILY_MOOD_AFTER_SQL)
+    conn.close()
+
+    print(f"Migrations applied in {migrate_seconds:.1f}s\n")
+    print(f"{'Query':<18} {'Before (ms)':>12} {'After (ms)':>12} {'Speedup':>9}")
+    print("-" * 54)
+    for (name, b), (_, a) in zip(before, after):
+        print(f"{name:<18} {b:>12.2f} {a:>12.2f} {b / a if a else float('inf'):>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
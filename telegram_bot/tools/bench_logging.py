@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Logging benchmark: what a log call costs the event loop
+Logs bursts of interaction-style INFO records (plus a few warnings) from
+coroutines, through the old synchronous FileHandler setup and through the
+queued JSON pipeline, with and without sampling. Reports the time spent in
+log calls and the longest event loop stall. ``--write-delay-ms`` slows every
+file write down to show what a busy or network-backed disk does to each.
+
+    python tools/bench_logging.py --records 100000 --write-delay-ms 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import setup_logging, update_context
+
+
+def slow_down(handler: logging.Handler, delay: float):
+    """Make every emit on ``handler`` take at least ``delay`` seconds longer"""
+    if delay <= 0:
+        return
+    emit = handler.emit
+
+    def slow_emit(record):
+        time.sleep(delay)
+        emit(record)
+    handler.emit = slow_emit
+
+
+def setup_sync(path: str, delay: float):
+    """The bot's previous setup: text records written on the calling thread"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    slow_down(handler, delay)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    return handler.close
+
+
+def setup_queued(path: str, delay: float, sample_rate: float, queue_size: int):
+    pipeline = setup_logging(path, sample_rate=sample_rate, queue_size=queue_size, console=False)
+    for handler in pipeline.listener.handlers:
+        slow_down(handler, delay)
+    return pipeline
+
+
+async def run_load(records: int, users: int) -> dict:
+    """Log ``records`` records from ``users`` concurrent coroutines"""
+    logger = logging.getLogger('main')
+    call_time = 0.0
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            worst_stall = max(worst_stall, now - last - 0.001)
+            last = now
+
+    async def user(user_id: int, count: int):
+        nonlocal call_time
+        for i in range(count):
+            token = update_context.set({'update_id': i, 'user_id': user_id, 'handler': '/compliment'})
+            start = time.perf_counter()
+            logger.info("Logged interaction: user_id=%s, action=%s", user_id, 'compliment_command')
+            if i % 100 == 0:
+                logger.warning("Slow update for user %s", user_id)
+            call_time += time.perf_counter() - start
+            update_context.reset(token)
+            if i % 10 == 0:
+                await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(user(u, records // users) for u in range(users)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return {'elapsed': elapsed, 'call_time': call_time, 'stall': worst_stall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging pipeline benchmark")
+    parser.add_argument("--records", type=int, default=100000, help="INFO records to log")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent coroutines logging")
+    parser.add_argument("--write-delay-ms", type=float, default=0.0, help="Extra time per file write")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Pipeline queue bound")
+    args = parser.parse_args()
+
+    delay = args.write_delay_ms / 1000
+    directory = tempfile.mkdtemp()
+    print(f"{args.records} records from {args.users} coroutines, write delay {args.write_delay_ms} ms\n")
+    print(f"{'setup':<22}{'us/call':>9}{'loop s':>9}{'stall ms':>10}{'drain s':>9}{'lines':>9}{'dropped':>9}")
+
+    for label in ('sync FileHandler', 'queue', 'queue + sampling'):
+        path = os.path.join(directory, label.replace(' ', '_').replace('+', '') + '.log')
+        if label == 'sync FileHandler':
+            stop = setup_sync(path, delay)
+            pipeline = None
+        else:
+            pipeline = setup_queued(path, delay, 10.0 if 'sampling' in label else 0, args.queue_size)
+            stop = pipeline.stop
+        result = asyncio.run(run_load(args.records, args.users))
+        start = time.perf_counter()
+        stats = pipeline.get_stats() if pipeline else {}
+        stop()
+        drain = time.perf_counter() - start
+        with open(path, 'rb') as f:
+            lines = sum(1 for _ in f)
+        dropped = stats.get('dropped_queue_full', 0) + stats.get('sampled_out', 0)
+        calls = args.records + args.records // 100
+        print(f"{label:<22}{result['call_time'] / calls * 1e6:>9.1f}{result['elapsed']:>9.2f}"
+              f"{result['stall'] * 1000:>10.1f}{drain:>9.2f}{lines:>9}{dropped:>9}")
+
+
+if __name__ == '__main__':
+    main()
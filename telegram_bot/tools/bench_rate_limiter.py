@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Rate limiter test: burst of sends against a fake Bot API enforcing limits
+Runs the same mixed workload (bulk sends to many chats, several replies per
+chat, callback answers) through a bot without a rate limiter and through
+PriorityRateLimiter, and reports 429s, failed calls and latency per kind.
+
+    python tools/bench_rate_limiter.py --chats 50 --per-chat 4 --bulk 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from telegram.request import HTTPXRequest
+
+from fake_bot_api import FakeBotAPI
+from rate_limiter import PRIORITY_BULK, PriorityRateLimiter
+
+
+async def workload(bot: ExtBot, args) -> dict:
+    """Fire every call at once and time each kind"""
+    latencies = {'callback': [], 'reply': [], 'bulk': []}
+    failures = {'callback': 0, 'reply': 0, 'bulk': 0}
+
+    async def timed(kind, coro):
+        start = time.perf_counter()
+        try:
+            await coro
+            latencies[kind].append(time.perf_counter() - start)
+        except RetryAfter:
+            failures[kind] += 1
+
+    # rate_limit_args is only accepted when the bot has a rate limiter
+    bulk_args = {'rate_limit_args': PRIORITY_BULK} if bot.rate_limiter else {}
+    calls = []
+    for i in range(args.bulk):
+        calls.append(timed('bulk', bot.send_message(500000 + i, "Your daily compliment 💖", **bulk_args)))
+    for chat in range(args.chats):
+        calls.append(timed('callback', bot.answer_callback_query(f'cb{chat}')))
+        for n in range(args.per_chat):
+            calls.append(timed('reply', bot.send_message(100000 + chat, f"Reply {n}")))
+
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    return {'elapsed': time.perf_counter() - start, 'latencies': latencies, 'failures': failures}
+
+
+def report(label: str, result: dict, api: FakeBotAPI, limiter: PriorityRateLimiter = None):
+    print(f"{label}: {result['elapsed']:.2f}s, 429s from API: {sum(api.rejected.values())}, "
+          f"failed calls: {sum(result['failures'].values())}")
+    for kind, samples in result['latencies'].items():
+        if samples:
+            samples.sort()
+            print(f"  {kind:<9} ok={len(samples):<5} failed={result['failures'][kind]:<5} "
+                  f"p50={statistics.median(samples) * 1000:8.1f} ms  max={samples[-1] * 1000:8.1f} ms")
+        else:
+            print(f"  {kind:<9} ok=0     failed={result['failures'][kind]}")
+    if limiter:
+        print(f"  limiter: {limiter.get_stats()}")
+
+
+async def run_once(args, port: int, limiter: PriorityRateLimiter = None):
+    api = FakeBotAPI(port=port, enforce_limits=True, global_rate=args.global_rate)
+    await api.start()
+    bot = ExtBot('123:test', base_url=f'http://127.0.0.1:{port}/bot', rate_limiter=limiter,
+                 request=HTTPXRequest(connection_pool_size=128))
+    try:
+        async with bot:
+            result = await workload(bot, args)
+    finally:
+        await api.stop()
+    return result, api
+
+
+async def run(args):
+    total = args.bulk + args.chats * (args.per_chat + 1)
+    print(f"{total} calls: {args.bulk} bulk sends, {args.chats} chats x {args.per_chat} replies, "
+          f"{args.chats} callback answers; API allows {args.global_rate:g}/s, 1/s per chat (burst 3)\n")
+
+    result, api = await run_once(args, args.port)
+    report("No rate limiter", result, api)
+
+    limiter = PriorityRateLimiter(global_rate=args.global_rate * args.headroom)
+    result, api = await run_once(args, args.port + 1, limiter)
+    report("\nPriorityRateLimiter", result, api, limiter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outbound rate limiter test")
+    parser.add_argument("--chats", type=int, default=50, help="Chats receiving interactive replies")
+    parser.add_argument("--per-chat", type=int, default=4, help="Replies per chat")
+    parser.add_argument("--bulk", type=int, default=200, help="Bulk sends, one per chat")
+    parser.add_argument("--global-rate", type=float, default=30.0, help="Global limit the fake API enforces")
+    parser.add_argument("--headroom", type=float, default=0.9, help="Fraction of the global limit to use")
+    parser.add_argument("--port", type=int, default=8094, help="First port for the in-process fake API")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark: analytics report, per-section queries vs the report engine
+Builds a synthetic analytics database of /create visits, then produces the report the old way
+(overview, daily activity, moods and top users, each from its own queries)
+and with the report engine, from a single scan and from the rollup tables.
+Counts the statements each issues and how many of them scan
+user_interactions in full (per EXPLAIN QUERY PLAN), and checks that the scan
+and the rollups agree.
+
+    python tools/bench_report.py --rows 5000000 --db /tmp/bench_report.db
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+sys.path.insert(0, TOOLS_DIR)
+
+import analytics_viewer
+from analytics_db import apply_pragmas, connect_readonly
+from analytics_migrations import apply_migrations
+from analytics_report import build_report
+from analytics_rollups import rebuild_rollups
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+# One /create visit; the mood is recorded on the last two steps
+VISIT = [('start_command', False, False), ('create_command', False, False),
+         ('recipient_name_entered', False, False), ('mood_selected', True, False),
+         ('message_generated', True, True)]
+
+
+def build_database(db_path: str, rows: int, users: int, days: int):
+    """A migrated database filled with /create visits, plus rebuilt rollups"""
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn)
+    apply_migrations(conn)
+
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=days)
+    written = 0
+    while written < rows:
+        batch = []
+        while len(batch) < 100000 and written + len(batch) < rows:
+            user_id = rng.randrange(users)
+            at = start + timedelta(seconds=rng.randrange(days * 86400))
+            mood = rng.choice(MOODS)
+            for step, (action, has_mood, generated) in enumerate(VISIT):
+                timestamp = (at + timedelta(seconds=step * 10)).strftime('%Y-%m-%d %H:%M:%S.%f')
+                batch.append((user_id, 'user', f'Test{user_id % 100}', None, timestamp, timestamp[:10],
+                              action, 'Alex', mood if has_mood else None, generated))
+        conn.executemany('''
+            INSERT INTO user_interactions
+            (user_id, username, first_name, last_name, timestamp, day, action,
+             recipient_name, mood_choice, message_generated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+        written += len(batch)
+    rebuild_rollups(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+class StatementLog:
+    """Collects every statement run on the connections it opened"""
+
+    def __init__(self):
+        self.statements = []
+
+    def connect_readonly(self, db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = connect_readonly(db_path, check_same_thread)
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+    def counts(self, db_path: str) -> tuple:
+        """(queries, full scans of user_interactions)"""
+        queries = [sql for sql in self.statements if sql.lstrip().upper().startswith('SELECT')]
+        conn = connect_readonly(db_path)
+        scans = 0
+        for sql in queries:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+            scans += sum(1 for row in plan if row[-1].startswith('SCAN user_interactions'))
+        conn.close()
+        return len(queries), scans
+
+
+def run_sections(db_path: str) -> tuple:
+    """The report as four independent sections, each with its own connection"""
+    log = StatementLog()
+    original = analytics_viewer.connect_readonly
+    analytics_viewer.connect_readonly = log.connect_readonly
+    try:
+        viewer = analytics_viewer.AnalyticsViewer(db_path)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            viewer.get_overview_stats()
+            viewer.get_daily_activity(7)
+            viewer.get_mood_popularity()
+            viewer.get_user_activity(5)
+        elapsed = time.perf_counter() - start
+    finally:
+        analytics_viewer.connect_readonly = original
+    return elapsed, log
+
+
+def run_engine(db_path: str, source: str) -> tuple:
+    log = StatementLog()
+    conn = log.connect_readonly(db_path)
+    start = time.perf_counter()
+    report = build_report(conn, 7, 5, source)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, log, report
+
+
+def comparable(report) -> tuple:
+    """Report contents, ignoring the order of tied moods, days and users"""
+    return (report.total_users, report.total_interactions, report.total_messages,
+            report.most_active_day[1] if report.most_active_day else None,
+            sorted(report.moods), report.daily,
+            [user.total_interactions for user in report.top_users])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics report benchmark")
+    parser.add_argument("--rows", type=int, default=5000000, help="Synthetic rows to generate")
+    parser.add_argument("--users", type=int, default=100000, help="Distinct user ids")
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--db", type=str, default="bench_report.db", help="Scratch database path")
+    parser.add_argument("--reuse", action="store_true", help="Keep an existing database at --db")
+    args = parser.parse_args()
+
+    if not (args.reuse and os.path.exists(args.db)):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        print(f"Building {args.rows:,} rows in {args.db}...")
+        start = time.perf_counter()
+        build_database(args.db, args.rows, args.users, args.days)
+        print(f"Built in {time.perf_counter() - start:.1f}s\n")
+
+    results = [('per-section queries', *run_sections(args.db))]
+    scan_time, scan_log, scan_report = run_engine(args.db, 'scan')
+    rollup_time, rollup_log, rollup_report = run_engine(args.db, 'rollups')
+    results += [('engine, single scan', scan_time, scan_log), ('engine, rollups', rollup_time, rollup_log)]
+
+    print(f"{'Report path':<22} {'Queries':>8} {'Full scans':>11} {'Wall (s)':>9}")
+    print("-" * 54)
+    for label, elapsed, log in results:
+        queries, scans = log.counts(args.db)
+        print(f"{label:<22} {queries:>8} {scans:>11} {elapsed:>9.3f}")
+
+    print("\nScan and rollup reports match" if comparable(scan_report) == comparable(rollup_report)
+          else "\n❌ Scan and rollup reports differ")
+
+if __name__ == '__main__':
+    main()
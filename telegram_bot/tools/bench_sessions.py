@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: plain dict sessions vs SessionStore with __slots__ sessions
+Creates N simulated /create sessions both ways and reports traced memory,
+then shows how the store stays bounded under max_sessions and how long a
+sweep of fully expired sessions takes.
+
+    python tools/bench_sessions.py --sessions 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SessionStore
+
+
+def measure(build):
+    """Return (traced bytes, seconds) for building a structure"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def build_dicts(count: int):
+    sessions = {}
+    for user_id in range(count):
+        sessions[user_id] = {
+            'step': 'waiting_for_mood',
+            'friend_name': 'Alex',
+            'mood_theme': None,
+            'start_time': datetime.now()
+        }
+    return sessions
+
+
+def build_store(count: int, max_sessions: int):
+    store = SessionStore(idle_ttl=1800, max_sessions=max_sessions)
+    for user_id in range(count):
+        session = store.create(user_id)
+        session.step = 'waiting_for_mood'
+        session.friend_name = 'Alex'
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session memory benchmark")
+    parser.add_argument("--sessions", type=int, default=1000000, help="Simulated sessions")
+    parser.add_argument("--max-sessions", type=int, default=100000, help="Bound for the capped run")
+    args = parser.parse_args()
+
+    n = args.sessions
+    dicts, dict_bytes, dict_secs = measure(lambda: build_dicts(n))
+    del dicts
+    store, store_bytes, store_secs = measure(lambda: build_store(n, n))
+    capped, capped_bytes, capped_secs = measure(lambda: build_store(n, args.max_sessions))
+
+    print(f"{'Layout':<34} {'Sessions':>10} {'MiB':>9} {'B/session':>10} {'Build s':>8}")
+    print("-" * 75)
+    for name, live, size, secs in [
+        ("dict of dicts (unbounded)", n, dict_bytes, dict_secs),
+        ("SessionStore, __slots__", len(store), store_bytes, store_secs),
+        (f"SessionStore, max {args.max_sessions:,}", len(capped), capped_bytes, capped_secs),
+    ]:
+        print(f"{name:<34} {live:>10,} {size / 2**20:>9.1f} {size / max(live, 1):>10.0f} {secs:>8.2f}")
+
+    # Every session is idle once the TTL is zero, so this is a worst-case sweep
+    store.idle_ttl = 0
+    start = time.perf_counter()
+    removed = store.sweep()
+    print(f"\nSweep removed {removed:,} expired sessions in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-call sqlite3.connect vs pooled WAL connections
+Inserts N interaction rows one transaction at a time, the way the bot used to,
+then through SQLiteConnectionManager, then batched through the same manager.
+
+    python tools/bench_sqlite_pool.py --rows 100000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_db import SQLiteConnectionManager
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS user_interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        timestamp DATETIME NOT NULL,
+        action TEXT NOT NULL,
+        recipient_name TEXT,
+        mood_choice TEXT,
+        message_generated BOOLEAN DEFAULT FALSE,
+        session_data TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+INSERT = '''
+    INSERT INTO user_interactions
+    (user_id, username, first_name, last_name, timestamp, action,
+     recipient_name, mood_choice, message_generated, session_data)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def make_row(i: int):
+    return (i % 5000, f"user{i}", "Test", None, datetime.now(), 'mood_selected',
+            'Alex', 'uplift', False, None)
+
+
+def bench_per_call(db_path: str, rows: int) -> float:
+    """Open, insert, commit and close for every row (default rollback journal)"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(SCHEMA)
+    start = time.perf_counter()
+    for i in range(rows):
+        conn = sqlite3.connect(db_path)
+        conn.execute(INSERT, make_row(i))
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def bench_pooled(db_path: str, rows: int) -> float:
+    """One commit per row over the long-lived WAL writer connection"""
+    db = SQLiteConnectionManager(db_path)
+    with db.writer() as conn:
+        conn.execute(SCHEMA)
+    start = time.perf_counter()
+    for i in range(rows):
+        with db.writer() as conn:
+            conn.execute(INSERT, make_row(i))
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def bench_pooled_batched(db_path: str, rows: int, batch_size: int) -> float:
+    """executemany in batch_size transactions over the pooled writer"""
+    db = SQLiteConnectionManager(db_path)
+    with db.writer() as conn:
+        conn.execute(SCHEMA)
+    start = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        with db.writer() as conn:
+            conn.executemany(INSERT, [make_row(i) for i in range(offset, min(rows, offset + batch_size))])
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call connect vs pooled SQLite insert throughput")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows to insert per scenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per transaction in the batched run")
+    parser.add_argument("--dir", type=str, default=None, help="Directory for the scratch databases")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        results = [
+            ("per-call connect", bench_per_call(os.path.join(tmp, 'per_call.db'), args.rows)),
+            ("pooled WAL writer", bench_pooled(os.path.join(tmp, 'pooled.db'), args.rows)),
+            (f"pooled + batch {args.batch_size}",
+             bench_pooled_batched(os.path.join(tmp, 'batched.db'), args.rows, args.batch_size)),
+        ]
+
+    print(f"{'Scenario':<24} {'Seconds':>10} {'Rows/sec':>12}")
+    print("-" * 48)
+    for name, elapsed in results:
+        print(f"{name:<24} {elapsed:>10.2f} {args.rows / elapsed:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
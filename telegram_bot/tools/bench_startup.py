@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+analytics_viewer.py startup check
+Runs each lightweight subcommand under ``python -X importtime`` against a
+scratch database and reports total import time, wall time and the slowest
+imports. Exits non-zero if any of them loads a heavy library (pandas,
+matplotlib, seaborn, numpy, pyarrow) or takes longer than the import
+budget, so it can guard against regressions in CI.
+
+    python tools/bench_startup.py --budget-ms 150
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, BOT_DIR)
+
+from analytics_migrations import apply_migrations
+
+VIEWER = os.path.join(BOT_DIR, 'analytics_viewer.py')
+HEAVY_MODULES = ('pandas', 'matplotlib', 'seaborn', 'numpy', 'pyarrow')
+SUBCOMMANDS = [
+    ['--overview'],
+    ['--moods'],
+    ['--daily', '7'],
+    ['--users', '10'],
+    ['--report'],
+    ['--report', '--format', 'json'],
+    ['--export', '{tmp}/export.csv.gz'],
+]
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self us, cumulative us) for each import, in load order"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run(args: list, repeat: int) -> tuple:
+    """Imports of one run and the best wall time over ``repeat`` runs"""
+    best = float('inf')
+    imports = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', VIEWER, *args],
+                              capture_output=True, text=True)
+        best = min(best, time.perf_counter() - start)
+        if proc.returncode:
+            raise SystemExit(f"analytics_viewer.py {' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+        imports = parse_importtime(proc.stderr)
+    return imports, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analytics_viewer.py startup check")
+    parser.add_argument("--budget-ms", type=float, default=150, help="Max total import time per subcommand")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per subcommand (best wall time is kept)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, 'analytics.db')
+    conn = sqlite3.connect(db_path)
+    apply_migrations(conn)
+    conn.close()
+
+    failures = []
+    slowest = {}
+    print(f"{'subcommand':<32}{'imports ms':>11}{'wall ms':>9}  heavy modules")
+    for subcommand in SUBCOMMANDS:
+        argv = [arg.format(tmp=tmp) for arg in subcommand] + ['--db', db_path]
+        imports, wall = run(argv, args.repeat)
+        total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+        heavy = sorted({name.split('.')[0] for name, _, _ in imports} & set(HEAVY_MODULES))
+        label = ' '.join(subcommand).replace('{tmp}/', '')
+        print(f"{label:<32}{total_ms:>11.1f}{wall * 1000:>9.0f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{label} imports {', '.join(heavy)}")
+        if total_ms > args.budget_ms:
+            failures.append(f"{label} spends {total_ms:.0f} ms importing (budget {args.budget_ms:.0f} ms)")
+        for name, self_us, _ in imports:
+            slowest[name] = max(slowest.get(name, 0), self_us)
+
+    print(f"\nSlowest imports (self time):")
+    for name, self_us in sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<40}{self_us / 1000:>8.1f} ms")
+
+    if failures:
+        print("\n❌ Startup regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\n✅ No heavy imports, all within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Template rendering benchmark: per-call f-string dict vs TemplateRegistry
+The "before" path rebuilds every mood's f-strings on each call, as the old
+generate_message_with_ai did. The registry is then timed with the shipped
+templates and with pools grown to thousands of templates per mood.
+
+    python tools/bench_templates.py --calls 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_templates import TemplateRegistry
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+NAMES = ['Alex', 'Sam', 'Maria', 'Jordan', 'Priya']
+TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'message_templates.json')
+
+
+def legacy_generate(friend_name: str, mood_theme: str) -> str:
+    """The original implementation: build all twelve strings, keep one"""
+    templates = {
+        'uplift': [
+            f"Hey {friend_name}! Just wanted to remind you that your positive energy lights up every room you enter. Your resilience and strength inspire everyone around you. Keep being amazing! 🌟",
+            f"{friend_name}, you have this incredible ability to find silver linings in any situation. Your optimism is contagious and makes the world a brighter place. Thank you for being you! ✨"
+        ],
+        'congrats': [
+            f"Congratulations, {friend_name}! Your hard work and dedication have truly paid off. You've achieved something amazing and you should be incredibly proud! 🎉",
+            f"{friend_name}, what an incredible achievement! Your perseverance and talent have led you to this moment. You've inspired so many people with your journey! 🏆"
+        ],
+        'thanks': [
+            f"Thank you, {friend_name}, for being such an incredible friend. Your support, kindness, and genuine care mean the world to me. I'm so grateful to have you in my life! 🙏",
+            f"{friend_name}, I can't thank you enough for everything you do. Your thoughtfulness and generosity never cease to amaze me. You make life so much better! 💕"
+        ],
+        'motivation': [
+            f"{friend_name}, you have incredible strength within you that can overcome any challenge. Your potential is limitless, and I believe in you completely. You've got this! 💪",
+            f"Hey {friend_name}! Remember that every expert was once a beginner, and every champion was once a contender. Your journey is just beginning, and greatness awaits! 🚀"
+        ],
+        'support': [
+            f"{friend_name}, I want you to know that you're not alone in this journey. You're stronger than you realize, and you have people who care about you deeply. Take it one day at a time. 🤗",
+            f"Dear {friend_name}, remember that it's okay not to be okay sometimes. Your feelings are valid, and your courage to keep going is admirable. You're braver than you believe! 💙"
+        ],
+        'celebration': [
+            f"It's party time, {friend_name}! Your joy and enthusiasm are absolutely infectious. You know how to make every moment special and memorable. Let's celebrate life together! 🎊",
+            f"{friend_name}, you bring such vibrant energy to everything you do! Your zest for life and ability to find joy in the little things makes every day an adventure. Keep shining! ✨"
+        ]
+    }
+
+    import random
+    theme_templates = templates.get(mood_theme, templates['uplift'])
+    return random.choice(theme_templates)
+
+
+def grown_registry(per_mood: int) -> TemplateRegistry:
+    """A registry with ``per_mood`` synthetic templates for every mood"""
+    registry = TemplateRegistry(TEMPLATES_FILE)
+    registry.templates = registry.compile_all({
+        mood: [f"Template {i} for {mood}: {{name}}, you are wonderful! 🌟" for i in range(per_mood)]
+        for mood in MOODS
+    })
+    return registry
+
+
+def run(label: str, render, calls: int, baseline: float = None) -> float:
+    rng = random.Random(1)
+    requests = [(rng.choice(NAMES), rng.choice(MOODS)) for _ in range(calls)]
+    start = time.perf_counter()
+    for name, mood in requests:
+        render(name, mood)
+    rate = calls / (time.perf_counter() - start)
+    speedup = f" ({rate / baseline:.1f}x)" if baseline else ""
+    print(f"  {label:<34} {rate:>12,.0f} messages/s{speedup}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template rendering benchmark")
+    parser.add_argument("--calls", type=int, default=200000, help="Messages rendered per run")
+    parser.add_argument("--pool-sizes", type=str, default="100,1000,10000", help="Templates per mood for the grown runs")
+    args = parser.parse_args()
+
+    registry = TemplateRegistry(TEMPLATES_FILE)
+    print(f"Rendering {args.calls:,} messages")
+    baseline = run("before: f-string dict per call", legacy_generate, args.calls)
+    run(f"after: registry ({registry.count()} templates)",
+        lambda name, mood: registry.render(mood, name), args.calls, baseline)
+
+    for per_mood in (int(size) for size in args.pool_sizes.split(',')):
+        start = time.perf_counter()
+        grown = grown_registry(per_mood)
+        print(f"  (compiled {grown.count():,} templates in {(time.perf_counter() - start) * 1000:.1f} ms)")
+        run(f"after: registry ({per_mood:,} per mood)",
+            lambda name, mood: grown.render(mood, name), args.calls, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Compile a compliment catalog to the memory-mapped binary format
+Reads compliments.json (or .jsonl) and writes a .bin file the bot can map
+instead of parsing; point COMPLIMENTS_FILE at the output. The output is
+replaced atomically, so a running bot picks it up on its next reload check.
+
+    python tools/compile_catalog.py compliments.json compliments.bin
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliment_catalog import BINARY_SUFFIX, load_catalog, write_binary_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a compliment catalog to binary")
+    parser.add_argument("source", help="Catalog to read (.json or .jsonl)")
+    parser.add_argument("output", nargs='?', help="File to write (default: source with a .bin suffix)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + BINARY_SUFFIX
+    if not output.endswith(BINARY_SUFFIX):
+        parser.error(f"output must end in {BINARY_SUFFIX} for the bot to recognise it")
+
+    start = time.perf_counter()
+    catalog = load_catalog(args.source)
+    loaded = time.perf_counter()
+    size = write_binary_catalog(catalog, output)
+    written = time.perf_counter()
+
+    print(f"{len(catalog)} compliments: loaded in {loaded - start:.2f}s, "
+          f"wrote {size / 1e6:.1f} MB to {output} in {written - loaded:.2f}s")
+    print(catalog.get_stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Telegram Bot API for testing KindWords without Telegram
+Answers the methods the bot uses with plausible results and counts calls.
+With --enforce-limits it also applies Telegram-like flood limits (global and
+per chat) and answers excess calls with 429 and a retry_after.
+Point the bot at it with TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot
+
+    python tools/fake_bot_api.py --port 8081 --enforce-limits
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {
+    'id': 1000000001,
+    'is_bot': True,
+    'first_name': 'KindWords',
+    'username': 'kindwords_test_bot',
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False
+}
+
+
+class Limit:
+    """Token bucket standing in for one of Telegram's flood limits"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def hit(self) -> float:
+        """Take a token; returns 0, or seconds to wait if the limit is exceeded"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeBotAPI:
+    """Minimal Bot API server: routes /bot<token>/<method> to canned results"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8081, latency: float = 0.0,
+                 enforce_limits: bool = False, global_rate: float = 30.0, chat_rate: float = 1.0,
+                 chat_burst: int = 3, group_per_minute: int = 20, blocked_chats=()):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.enforce_limits = enforce_limits
+        self.global_limit = Limit(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_per_minute = group_per_minute
+        self._chat_limits = {}
+        self.blocked_chats = {str(chat_id) for chat_id in blocked_chats}
+        self.calls = Counter()
+        self.rejected = Counter()
+        self.delivered = Counter()  # chat_id -> messages sent there
+        self.started_at = time.monotonic()
+        self._message_ids = itertools.count(1)
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_route('*', '/bot{token}/{method}', self.handle_method)
+        self.app.router.add_get('/__stats', self.handle_stats)
+
+    async def _params(self, request: web.Request) -> dict:
+        """Read call parameters from a form, JSON body or query string"""
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    def _message(self, params: dict) -> dict:
+        """A Message object for send/edit results"""
+        chat_id = int(params.get('chat_id') or 0)
+        return {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'User'},
+            'from': BOT_USER,
+            'text': params.get('text', '')
+        }
+
+    def result(self, method: str, params: dict):
+        """Result payload for a Bot API method"""
+        if method == 'getMe':
+            return BOT_USER
+        if method in ('sendMessage', 'editMessageText'):
+            return self._message(params)
+        return True
+
+    def _check_limits(self, params: dict) -> float:
+        """Seconds the caller must wait, or 0 if the call is within limits"""
+        chat_id = params.get('chat_id')
+        if chat_id is not None:
+            limit = self._chat_limits.get(chat_id)
+            if limit is None:
+                group = str(chat_id).startswith('-') or str(chat_id).startswith('@')
+                limit = self._chat_limits[chat_id] = \
+                    Limit(self.group_per_minute / 60.0, max(1, self.group_per_minute // 3)) if group else \
+                    Limit(self.chat_rate, self.chat_burst)
+            wait = limit.hit()
+            if wait:
+                return wait
+        return self.global_limit.hit()
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        try:
+            params = await self._params(request)
+        except ConnectionResetError:
+            return web.Response(status=499)  # Client hung up before sending the body
+        self.calls[method] += 1
+
+        if self.enforce_limits and method not in ('getUpdates', 'getMe', 'setWebhook', 'deleteWebhook'):
+            wait = self._check_limits(params)
+            if wait:
+                self.rejected[method] += 1
+                retry_after = max(1, math.ceil(wait))
+                return web.json_response({
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f'Too Many Requests: retry after {retry_after}',
+                    'parameters': {'retry_after': retry_after}
+                }, status=429)
+
+        if method == 'getUpdates':
+            # Long poll that never has anything to deliver
+            await asyncio.sleep(min(float(params.get('timeout') or 0), 1.0))
+            return web.json_response({'ok': True, 'result': []})
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == 'sendMessage':
+            chat_id = str(params.get('chat_id'))
+            if chat_id in self.blocked_chats:
+                return web.json_response({
+                    'ok': False,
+                    'error_code': 403,
+                    'description': 'Forbidden: bot was blocked by the user'
+                }, status=403)
+            self.delivered[chat_id] += 1
+        return web.json_response({'ok': True, 'result': self.result(method, params)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """Call counters for test harnesses"""
+        return web.json_response({
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'calls': dict(self.calls),
+            'rejected': dict(self.rejected),
+            'chats_delivered': len(self.delivered),
+            'max_per_chat': max(self.delivered.values(), default=0)
+        })
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(api: FakeBotAPI):
+    await api.start()
+    print(f"Fake Bot API on http://{api.host}:{api.port}/bot<token>/<method> (stats at /__stats)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(json.dumps(dict(api.calls), indent=2))
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every call")
+    parser.add_argument("--enforce-limits", action="store_true", help="Answer calls over the flood limits with 429")
+    parser.add_argument("--global-rate", type=float, default=30.0, help="Calls per second across all chats")
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="Messages per second per private chat")
+    parser.add_argument("--chat-burst", type=int, default=3, help="Burst allowance per private chat")
+    parser.add_argument("--group-per-minute", type=int, default=20, help="Messages per minute per group chat")
+    args = parser.parse_args()
+
+    api = FakeBotAPI(args.host, args.port, args.latency, args.enforce_limits, args.global_rate,
+                     args.chat_rate, args.chat_burst, args.group_per_minute)
+    try:
+        asyncio.run(serve(api))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
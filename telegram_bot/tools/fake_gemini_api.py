@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Gemini generateContent API for testing KindWords
+Simulates latency, latency spikes, rate limiting and server errors so the
+bot's timeouts, retries and template fallback can be exercised offline.
+streamGenerateContent sends the message word by word as server-sent events.
+Point the bot at it with GEMINI_BASE_URL=http://127.0.0.1:8082/v1beta
+
+    python tools/fake_gemini_api.py --latency 0.3 --jitter 0.2 --error-rate 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+class FakeGeminiAPI:
+    """Answers /v1beta/models/<model>:generateContent with canned messages"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8082, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_latency: float = 30.0, chunk_delay: float = 0.05,
+                 seed: int = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.chunk_delay = chunk_delay
+        self.rng = random.Random(seed)
+        self.responses = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started_at = time.monotonic()
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post('/v1beta/models/{model}:generateContent', self.handle_generate)
+        self.app.router.add_post('/v1beta/models/{model}:streamGenerateContent', self.handle_stream)
+        self.app.router.add_get('/__stats', self.handle_stats)
+
+    def _message(self, prompt: str) -> str:
+        match = re.search(r'friend named (.+?)\. ', prompt)
+        name = match.group(1) if match else 'friend'
+        return f"{name}, you make every day brighter just by being you. Never forget how loved you are! 🌟"
+
+    @staticmethod
+    def _candidate(text: str, finished: bool = True) -> dict:
+        candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}}
+        if finished:
+            candidate['finishReason'] = 'STOP'
+        return {'candidates': [candidate]}
+
+    async def _simulate(self) -> web.Response:
+        """Wait out the simulated latency, or return an error response"""
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.responses['429'] += 1
+            return web.json_response({'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED'}},
+                                     status=429, headers={'Retry-After': '0.1'})
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            self.responses['503'] += 1
+            return web.json_response({'error': {'code': 503, 'status': 'UNAVAILABLE'}}, status=503)
+        roll -= self.error_rate
+
+        delay = self.slow_latency if roll < self.slow_rate else \
+            self.latency + self.rng.uniform(0, self.jitter)
+        await asyncio.sleep(delay)
+        return None
+
+    async def handle_generate(self, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            error = await self._simulate()
+            if error is not None:
+                return error
+
+            prompt = body['contents'][0]['parts'][0]['text']
+            self.responses['200'] += 1
+            return web.json_response(self._candidate(self._message(prompt)))
+        except asyncio.CancelledError:
+            # Client gave up (timeout) and closed the connection
+            self.responses['abandoned'] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        """Stream the message a few words per event after the first-token latency"""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            error = await self._simulate()
+            if error is not None:
+                return error
+
+            words = self._message(body['contents'][0]['parts'][0]['text']).split(' ')
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await response.prepare(request)
+            try:
+                for i in range(0, len(words), 3):
+                    chunk = ' '.join(words[i:i + 3]) + (' ' if i + 3 < len(words) else '')
+                    event = self._candidate(chunk, finished=i + 3 >= len(words))
+                    await response.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+                    await asyncio.sleep(self.chunk_delay)
+                await response.write_eof()
+            except ConnectionResetError:
+                # Client hit its deadline and hung up mid-stream
+                self.responses['abandoned'] += 1
+                return response
+            self.responses['stream'] += 1
+            return response
+        except asyncio.CancelledError:
+            self.responses['abandoned'] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """Response counters for test harnesses"""
+        return web.json_response({
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'responses': dict(self.responses),
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight
+        })
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(api: FakeGeminiAPI):
+    await api.start()
+    print(f"Fake Gemini API on http://{api.host}:{api.port}/v1beta (stats at /__stats)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(json.dumps(dict(api.responses), indent=2))
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub Gemini API")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8082, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.3, help="Base seconds per generation")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random extra seconds per generation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls that hang")
+    parser.add_argument("--slow-latency", type=float, default=30.0, help="Seconds a hanging call takes")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    api = FakeGeminiAPI(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                        args.rate_limit_rate, args.slow_rate, args.slow_latency, args.chunk_delay, args.seed)
+    try:
+        asyncio.run(serve(api))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
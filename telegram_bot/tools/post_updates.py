@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Webhook test harness: posts synthetic Telegram updates to the bot
+Each simulated user walks the /start -> /create -> name -> mood -> regenerate
+-> /stats flow. Reports ingest latency and throughput, then (optionally) the
+call counts seen by tools/fake_bot_api.py.
+
+    python tools/fake_bot_api.py &
+    TELEGRAM_BOT_TOKEN=123:test TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot \\
+        BOT_MODE=webhook WEBHOOK_URL=http://127.0.0.1:8080 python main.py &
+    python tools/post_updates.py --users 200 --fake-api http://127.0.0.1:8081
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+
+import aiohttp
+
+MOODS = ['uplift', 'congrats', 'thanks', 'motivation', 'support', 'celebration']
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict:
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+
+def _chat(user_id: int) -> dict:
+    return {'id': user_id, 'type': 'private', 'first_name': f'User{user_id}'}
+
+
+def message_update(user_id: int, text: str) -> dict:
+    """A private text message; a leading /command gets a bot_command entity"""
+    message = {
+        'message_id': next(_message_ids),
+        'date': int(time.time()),
+        'chat': _chat(user_id),
+        'from': _user(user_id),
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': next(_update_ids), 'message': message}
+
+
+def callback_update(user_id: int, data: str) -> dict:
+    """An inline keyboard button press on a previous bot message"""
+    return {
+        'update_id': next(_update_ids),
+        'callback_query': {
+            'id': f'cb{next(_update_ids)}',
+            'from': _user(user_id),
+            'chat_instance': f'ci{user_id}',
+            'data': data,
+            'message': {
+                'message_id': next(_message_ids),
+                'date': int(time.time()),
+                'chat': _chat(user_id),
+                'from': {'id': 1000000001, 'is_bot': True, 'first_name': 'KindWords'},
+                'text': '...'
+            }
+        }
+    }
+
+
+def user_flow(user_id: int, rng: random.Random) -> list:
+    """The updates one user sends, in order"""
+    return [
+        message_update(user_id, '/start'),
+        message_update(user_id, '/create'),
+        message_update(user_id, rng.choice(['Alex', 'Sam', 'Maria', 'Jordan', 'Priya'])),
+        callback_update(user_id, f'mood_{rng.choice(MOODS)}'),
+        callback_update(user_id, 'regenerate'),
+        message_update(user_id, '/stats'),
+    ]
+
+
+async def run_user(session: aiohttp.ClientSession, url: str, headers: dict, updates: list,
+                   latencies: list, errors: list, think_time: float):
+    """Post one user's updates sequentially, like a real chat"""
+    for update in updates:
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json=update, headers=headers) as response:
+                if response.status != 200:
+                    errors.append(response.status)
+        except aiohttp.ClientError as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    headers = {'X-Telegram-Bot-Api-Secret-Token': args.secret} if args.secret else {}
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(session, updates):
+        async with semaphore:
+            await run_user(session, args.url, headers, updates, latencies, errors, args.think_time)
+
+    async with aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(session, user_flow(100000 + i, rng)) for i in range(args.users)))
+        elapsed = time.perf_counter() - start
+
+        total = len(latencies)
+        latencies.sort()
+        print(f"Posted {total} updates from {args.users} users in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f} updates/s), {len(errors)} errors")
+        if latencies:
+            print(f"Ingest latency ms: p50={statistics.median(latencies) * 1000:.1f} "
+                  f"p95={latencies[int(total * 0.95) - 1] * 1000:.1f} max={latencies[-1] * 1000:.1f}")
+
+        if args.fake_api:
+            # Give the handlers a moment to drain the update queue
+            await asyncio.sleep(args.settle)
+            async with session.get(args.fake_api.rstrip('/') + '/__stats') as response:
+                stats = await response.json()
+            print(f"Fake Bot API calls: {stats['calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post synthetic Telegram updates to the webhook")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8080/telegram/webhook", help="Webhook URL")
+    parser.add_argument("--secret", type=str, default=None, help="Webhook secret token, if configured")
+    parser.add_argument("--users", type=int, default=100, help="Simulated users")
+    parser.add_argument("--concurrency", type=int, default=50, help="Users posting at the same time")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a user's updates")
+    parser.add_argument("--fake-api", type=str, default=None, help="Base URL of tools/fake_bot_api.py to report")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait before reading fake API stats")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Concurrent update processing for KindWords Telegram Bot
+Runs updates from different users in parallel while keeping each user's
+updates strictly in arrival order
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from log_pipeline import update_context
+
+logger = logging.getLogger(__name__)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Update processor with a global concurrency limit and per-user ordering
+
+    Updates from the same user wait on that user's lock before taking one of
+    the ``max_concurrent`` slots, so a user with a backlog never ties up slots
+    other users could run in. PTB's own semaphore is set to ``max_pending``
+    and only bounds how many updates can be admitted at once.
+    """
+
+    def __init__(self, max_concurrent: int = 16, max_pending: int = 10000, wait_samples: int = 1000):
+        super().__init__(max_concurrent_updates=max(max_pending, max_concurrent))
+        self.max_concurrent = max_concurrent
+        self._slots = asyncio.BoundedSemaphore(max_concurrent)
+        self._user_locks: Dict[Any, list] = {}  # key -> [lock, updates holding or waiting]
+
+        self.processed = 0
+        self.active = 0
+        self.waiting = 0
+        self.max_wait = 0.0
+        self._waits = deque(maxlen=wait_samples)
+
+    @staticmethod
+    def _ordering_key(update: object) -> Optional[Any]:
+        """Serialise by user, falling back to chat; None means no ordering"""
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return ('user', update.effective_user.id)
+            if update.effective_chat is not None:
+                return ('chat', update.effective_chat.id)
+        return None
+
+    @staticmethod
+    def _handler_name(update: object) -> Optional[str]:
+        """Short label for what the update asks for, e.g. '/start' or 'callback:get_compliment'"""
+        if not isinstance(update, Update):
+            return None
+        if update.callback_query is not None:
+            return 'callback:' + (update.callback_query.data or '')[:32]
+        message = update.effective_message
+        if message is not None and message.text:
+            if message.text.startswith('/'):
+                return message.text.split()[0].split('@')[0]
+            return 'message'
+        return 'other'
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._ordering_key(update)
+        entry = None
+        if key is not None:
+            entry = self._user_locks.get(key)
+            if entry is None:
+                entry = self._user_locks[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                async with self._slots:
+                    self._record_wait(time.monotonic() - queued_at)
+                    self.waiting -= 1
+                    queued_at = None
+                    self.active += 1
+                    context = self._update_context(update, key)
+                    token = update_context.set(context)
+                    started = time.monotonic()
+                    try:
+                        await coroutine
+                    finally:
+                        self.active -= 1
+                        self.processed += 1
+                        logger.info("Handled update %s", context['update_id'],
+                                    extra={'latency_ms': round((time.monotonic() - started) * 1000, 2)})
+                        update_context.reset(token)
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if queued_at is not None:
+                # Cancelled before it started running
+                self.waiting -= 1
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._user_locks[key]
+
+    def _update_context(self, update: object, key: Optional[Any]) -> Dict[str, Any]:
+        return {
+            'update_id': getattr(update, 'update_id', None),
+            'user_id': key[1] if key is not None and key[0] == 'user' else None,
+            'handler': self._handler_name(update)
+        }
+
+    def _record_wait(self, wait: float):
+        self._waits.append(wait)
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    async def initialize(self) -> None:
+        """Nothing to set up"""
+
+    async def shutdown(self) -> None:
+        """Nothing to tear down; in-flight updates are awaited by the application"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait time metrics for monitoring"""
+        waits = sorted(self._waits)
+        return {
+            'max_concurrent': self.max_concurrent,
+            'active': self.active,
+            'waiting': self.waiting,
+            'users_in_flight': len(self._user_locks),
+            'processed': self.processed,
+            'wait_ms_avg': round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            'wait_ms_p95': round(waits[int(len(waits) * 0.95) - 1] * 1000, 2) if waits else 0.0,
+            'wait_ms_max': round(self.max_wait * 1000, 2)
+        }
@@ -0,0 +1,103 @@
+"""
+Async HTTP server for KindWords Telegram Bot
+Receives Telegram webhook updates and serves a health endpoint from the same
+event loop as the bot, replacing the threaded Flask keep-alive server
+"""
+
+import hmac
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """aiohttp server feeding webhook updates into the application's queue
+
+    ``webhook_path`` is optional: in polling mode the server only answers
+    health checks. ``health_info`` is called for extra fields on /health.
+    """
+
+    def __init__(self, application: Application, host: str = '0.0.0.0', port: int = 8080,
+                 webhook_path: Optional[str] = None, secret_token: Optional[str] = None,
+                 health_info: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.webhook_path = webhook_path
+        self.secret_token = secret_token
+        self.health_info = health_info
+
+        self.started_at = time.monotonic()
+        self.updates_received = 0
+        self.updates_rejected = 0
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.handle_root)
+        self.app.router.add_get('/health', self.handle_health)
+        if webhook_path:
+            self.app.router.add_post(webhook_path, self.handle_update)
+
+    async def handle_root(self, request: web.Request) -> web.Response:
+        """Plain liveness response for uptime pingers"""
+        return web.Response(text="KindWords bot is running!")
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """Health check with basic runtime metrics"""
+        payload = {
+            'status': 'ok' if self.application.running else 'starting',
+            'mode': 'webhook' if self.webhook_path else 'polling',
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'updates_received': self.updates_received,
+            'updates_rejected': self.updates_rejected,
+            'update_queue_size': self.application.update_queue.qsize()
+        }
+        if self.health_info:
+            try:
+                payload.update(self.health_info())
+            except Exception as e:
+                logger.error(f"Error collecting health info: {e}")
+        return web.json_response(payload)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Accept one Telegram update and queue it for the handlers"""
+        if self.secret_token:
+            header = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+            if not hmac.compare_digest(header, self.secret_token):
+                self.updates_rejected += 1
+                return web.Response(status=403)
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (json.JSONDecodeError, ValueError, TypeError, KeyError) as e:
+            self.updates_rejected += 1
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        # Acknowledge immediately; the handlers run from the update queue
+        await self.application.update_queue.put(update)
+        self.updates_received += 1
+        return web.Response()
+
+    async def start(self):
+        """Start listening"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"HTTP server listening on {self.host}:{self.port}"
+                    + (f" (webhook at {self.webhook_path})" if self.webhook_path else ""))
+
+    async def stop(self):
+        """Stop listening and close open connections"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None